@@ -45,7 +45,16 @@ from app import Frm_Config
 from app import Frm_Inicio
 from app import Frm_Note
 from app.StationManager import StationManager
-from app.SerialWorkers import NMEA_Worker, CTD_Worker, TSG_Worker, DBS_Worker
+from app.SerialWorkers import NMEA_Mux_Worker, CTD_Worker, TSG_Worker, DBS_Worker
+from app.Adquisicion import Cola, Motor, PuenteQt, CanalNMEA, CanalColumnas, DESCARTAR, LIMITE
+from app.RingBuffer import Almacen
+from app.Alineacion import Alineacion
+from app.Framer import Timeout
+from app.Captura import Grabador
+from app.Esquema import esquemas
+from app import Metricas
+from app.Metricas import METRICAS
+from app import Diario
 
 from dotenv import load_dotenv
 
@@ -96,6 +105,17 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.station_manager = StationManager(self.cfg, self.estructura)
         self.thread = None
         self.worker = None
+        self.motor = None
+        self.cola = None
+        self.almacen = None
+        self.alineacion = None
+        self.grabador = None
+        # Metricas de la adquisicion: barra de estado, archivo rotativo y servidor local
+        self.metricas_log = None
+        self.servidor_metricas = None
+        self.resumen_metricas = ''
+        self.metricas_Timer = QTimer(self)
+        self.metricas_Timer.timeout.connect(self.actualizar_metricas)
 
         # Configuro opciones de los botones de la barra de menu
         self.btn_Salir.setShortcut('Alt+S')
@@ -124,7 +144,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                     timeout=1,
                     )
         # Escaneo los puertos serial disponibles
-        ports.scan_ports()
+        ports.scan_ports(self.cfg['Configuracion'].get('Simulador'))
         self.cfg['list_ports'] = ports.list_ports
 
         valido, msg = Key_Reg.check()
@@ -161,16 +181,21 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def init_NMEA(self):
         # Inicializo el hilo que administra el puerto Serie del NMEA
         try:
-            ser = serial.Serial(port=self.cfg['Configuracion']['NMEA']['Port'],
-                                baudrate=self.cfg['Configuracion']['NMEA']['BR'],
-                                timeout=self.cfg['Configuracion']['NMEA']['Intervalo'],
-                                )
+            ser = serial.serial_for_url(self.cfg['Configuracion']['NMEA']['Port'],
+                                        baudrate=self.cfg['Configuracion']['NMEA']['BR'],
+                                        timeout=self.cfg['Configuracion']['NMEA']['Intervalo'],
+                                        )
             ser.close()
-            self.NMEA = NMEA_Worker(ser)
+            # Un solo worker decodifica todas las sentencias del puerto (RMC, GGA, DBS, ...)
+            self.NMEA = NMEA_Mux_Worker(ser)
+            if self.grabador is not None:
+                self.NMEA.capturar(self.grabador)
+            METRICAS.registrar('NMEA', self.NMEA)
             self.thread_NMEA = QThread()
             self.NMEA.moveToThread(self.thread_NMEA)
             self.thread_NMEA.started.connect(self.NMEA.work)
-            self.NMEA.intReady.connect(self.onIntReadyNMEA)
+            # Cada valor se publica en la cola desde el hilo del worker; la ventana los recibe por el puente
+            self.NMEA.intReady.connect(self.cola.publicador('NMEA'), Qt.DirectConnection)
             self.NMEA.finished.connect(self.loop_finished)
             self.NMEA.finished.connect(self.thread_NMEA.quit)
             self.NMEA.finished.connect(self.NMEA.deleteLater)
@@ -190,6 +215,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     ########################################################################
     def onIntReadyNMEA(self, i):
         self.NMEA_Str = i
+        self.eco('NMEA', i)
         self.updateStatusBar()
 
     ########################################################################
@@ -198,20 +224,24 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def init_DBS(self):
         # Inicializo el hilo que administra el puerto Serie del dato de Batimetria
         try:
-            ser = serial.Serial(port=self.cfg['Configuracion']['Batimetria']['Port'],
-                                baudrate=self.cfg['Configuracion']['Batimetria']['BR'],
-                                timeout=self.cfg['Configuracion']['Batimetria']['Intervalo'],
-                                )
+            ser = serial.serial_for_url(self.cfg['Configuracion']['Batimetria']['Port'],
+                                        baudrate=self.cfg['Configuracion']['Batimetria']['BR'],
+                                        timeout=self.cfg['Configuracion']['Batimetria']['Intervalo'],
+                                        )
             ser.close()
             # a new worker to perform those tasks
             self.DBS = DBS_Worker(ser)
+            if self.grabador is not None:
+                self.DBS.capturar(self.grabador)
+            METRICAS.registrar('DBS', self.DBS)
             # a new thread to run our background tasks in
             self.thread_DBS = QThread()
             # move the worker into the thread, do this first before connecting the signals
             self.DBS.moveToThread(self.thread_DBS)
             # begin our worker object's loop when the thread starts running
             self.thread_DBS.started.connect(self.DBS.work)
-            self.DBS.intReady.connect(self.onIntReadyDBS)
+            # Cada valor se publica en la cola desde el hilo del worker; la ventana los recibe por el puente
+            self.DBS.intReady.connect(self.cola.publicador('DBS'), Qt.DirectConnection)
             # do something in the gui when the worker loop ends
             self.DBS.finished.connect(self.loop_finished)
             # tell the thread it's time to stop running
@@ -235,6 +265,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     ########################################################################
     def onIntReadyDBS(self, i):
         self.DBS_Str = i
+        self.eco('DBS', i)
         self.updateStatusBar()
 
     ########################################################################
@@ -244,20 +275,24 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def init_CTD(self):
         # Inicializo el hilo que administra el puerto Serie del dato de CTD
         try:
-            ser = serial.Serial(port=self.cfg['Configuracion']['CTD']['Port'],
-                                baudrate=self.cfg['Configuracion']['CTD']['BR'],
-                                timeout=self.cfg['Configuracion']['CTD']['Intervalo'] + 1
-                                )
+            ser = serial.serial_for_url(self.cfg['Configuracion']['CTD']['Port'],
+                                        baudrate=self.cfg['Configuracion']['CTD']['BR'],
+                                        timeout=self.cfg['Configuracion']['CTD']['Intervalo'] + 1
+                                        )
             ser.close()
             # a new worker to perform those tasks
-            self.CTD = CTD_Worker(ser)
+            self.CTD = CTD_Worker(ser, rapido=self.ctd_rapido())
+            if self.grabador is not None:
+                self.CTD.capturar(self.grabador)
+            METRICAS.registrar('CTD', self.CTD)
             # a new thread to run our background tasks in
             self.thread_CTD = QThread()
             # move the worker into the thread, do this first before connecting the signals
             self.CTD.moveToThread(self.thread_CTD)
             # begin our worker object's loop when the thread starts running
             self.thread_CTD.started.connect(self.CTD.work)
-            self.CTD.intReady.connect(self.onIntReadyCTD)
+            # Cada valor se publica en la cola desde el hilo del worker; la ventana los recibe por el puente
+            self.CTD.intReady.connect(self.cola.publicador('CTD'), Qt.DirectConnection)
             # do something in the gui when the worker loop ends
             self.CTD.finished.connect(self.loop_finished)
             # tell the thread it's time to stop running
@@ -280,6 +315,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     ########################################################################
     def onIntReadyCTD(self, i):
         self.CTD_str = i
+        self.eco('CTD', i)
 
     ########################################################################
     # Inicializo el hilo del TSG
@@ -287,20 +323,24 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def init_TSG(self):
         # Inicializo el hilo que administra el puerto Serie del dato de Termosalinografo
         try:
-            ser = serial.Serial(port=self.cfg['Configuracion']['TSG']['Port'],
-                                baudrate=self.cfg['Configuracion']['TSG']['BR'],
-                                )
+            ser = serial.serial_for_url(self.cfg['Configuracion']['TSG']['Port'],
+                                        baudrate=self.cfg['Configuracion']['TSG']['BR'],
+                                        )
             ser.timeout = self.cfg['Configuracion']['TSG']['Intervalo'] + 1
             ser.close()
             # a new worker to perform those tasks
             self.TSG = TSG_Worker(ser)
+            if self.grabador is not None:
+                self.TSG.capturar(self.grabador)
+            METRICAS.registrar('TSG', self.TSG)
             # a new thread to run our background tasks in
             self.thread_TSG = QThread()
             # move the worker into the thread, do this first before connecting the signals
             self.TSG.moveToThread(self.thread_TSG)
             # begin our worker object's loop when the thread starts running
             self.thread_TSG.started.connect(self.TSG.work)
-            self.TSG.intReady.connect(self.onIntReadyTSG)
+            # Cada valor se publica en la cola desde el hilo del worker; la ventana los recibe por el puente
+            self.TSG.intReady.connect(self.cola.publicador('TSG'), Qt.DirectConnection)
             # do something in the gui when the worker loop ends
             self.TSG.finished.connect(self.loop_finished)
             # tell the thread it's time to stop running
@@ -323,6 +363,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     ########################################################################
     def onIntReadyTSG(self, i):
         self.TSG_str = i
+        self.eco('TSG', i)
 
     ########################################################################
     # Inicializa las variables de datos y los Hilos
@@ -338,9 +379,23 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             'fecha': 'NaN',
         }
         self.DBS_Str = 'NaN'
+        # Historia reciente de cada instrumento con marca de tiempo
+        self.almacen = Almacen(self.cfg)
+        # Las diferencias TSG - CTD de Superficie se promedian sobre la ventana (segundos)
+        self.alineacion = Alineacion(self.almacen,
+                                     ventana=self.cfg['Configuracion'].get('Superficie', {}).get('Ventana', 10),
+                                     margen=self.cfg['Configuracion']['TSG']['Intervalo'] + 1)
+        self.init_Captura()
+        self.init_Metricas()
+        # Por defecto todos los puertos se leen desde el motor asyncio.
+        # Con "Motor": "hilos" en Configuracion se usa un QThread por instrumento.
+        if self.cfg['Configuracion'].get('Motor', 'asyncio') != 'hilos':
+            self.init_Motor()
+            return
         ########################################################################
         # Inicializo las clases de los hilos correspondientes
         ########################################################################
+        self.init_Puente(Cola(**self.conf_Cola()))
         try:
             # Activo lectura de cada dato segun el archivo config.json
             if self.cfg['Configuracion']['NMEA']['Status'] == '2':
@@ -356,17 +411,141 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 self.thread_TSG.start()
                 logging.info('Hilo TSG iniciado')
             if self.cfg['Configuracion']['Batimetria']['Status'] == '2':
-                self.init_DBS()
-                self.thread_DBS.start()
-                logging.info('Hilo DBS iniciado')
+                if self.cfg['Configuracion']['NMEA']['Status'] == '2' and \
+                        self.cfg['Configuracion']['Batimetria']['Port'] == self.cfg['Configuracion']['NMEA']['Port']:
+                    # La ecosonda comparte el puerto del GPS: la profundidad la decodifica el hilo NMEA
+                    self.NMEA.depthReady.connect(self.cola.publicador('DBS'), Qt.DirectConnection)
+                    self.DBS = self.NMEA
+                    logging.info('Batimetria leida desde el hilo NMEA')
+                else:
+                    self.init_DBS()
+                    self.thread_DBS.start()
+                    logging.info('Hilo DBS iniciado')
         except:
             logging.error('Error al inicializar los hilos')
 
+    ########################################################################
+    # Inicializo el motor de adquisicion (un solo hilo para todos los puertos)
+    ########################################################################
+    def init_Motor(self):
+        conf = self.cfg['Configuracion']
+        self.motor = Motor(**self.conf_Cola())
+        nmea = conf['NMEA']['Status'] == '2'
+        bat = conf['Batimetria']['Status'] == '2'
+        if nmea:
+            # La ecosonda puede compartir el puerto del GPS
+            comparte = bat and conf['Batimetria']['Port'] == conf['NMEA']['Port']
+            self.motor.agregar(CanalNMEA('NMEA', conf['NMEA']['Port'], conf['NMEA']['BR'],
+                                         timeout=2, profundidad=comparte))
+            bat = bat and not comparte
+        if bat:
+            self.motor.agregar(CanalNMEA('Batimetria', conf['Batimetria']['Port'], conf['Batimetria']['BR'],
+                                         timeout=3, posicion=False, profundidad=True))
+        if conf['CTD']['Status'] == '2':
+            timeout = CTD_Worker.TIMEOUT_RAPIDO if self.ctd_rapido() else 5
+            self.motor.agregar(CanalColumnas('CTD', conf['CTD']['Port'], conf['CTD']['BR'],
+                                             timeout, conf['CTD']['filas']))
+        if conf['TSG']['Status'] == '2':
+            self.motor.agregar(CanalColumnas('TSG', conf['TSG']['Port'], conf['TSG']['BR'],
+                                             conf['TSG']['Intervalo'] + 1, conf['TSG']['filas']))
+        for canal in self.motor.canales:
+            if self.grabador is not None:
+                canal.captura = self.grabador.capturador(str(canal.port))
+            METRICAS.registrar(canal.nombre, canal)
+        self.init_Puente(self.motor)
+        self.motor.start()
+        logging.info(f'Motor de adquisicion iniciado ({len(self.motor.canales)} puertos)')
+
+    def ctd_rapido(self):
+        # "Modo": "rapido" en Configuracion.CTD para la salida de 24 Hz de un 911plus
+        return self.cfg['Configuracion']['CTD'].get('Modo', 'promedio') == 'rapido'
+
+    def conf_Cola(self):
+        # Cola hacia la ventana: "Cola": {"Limite": scans, "Politica": "descartar" o "diezmar"}
+        conf = self.cfg['Configuracion'].get('Cola', {})
+        return {'limite': int(conf.get('Limite', LIMITE)), 'politica': conf.get('Politica', DESCARTAR)}
+
+    ########################################################################
+    # Captura de los bytes crudos de todos los puertos
+    ########################################################################
+    def init_Captura(self):
+        # Desactivada por defecto; "Captura": {"Status": "2"} en Configuracion la activa.
+        # Se conservan las ultimas 'Copias' capturas y, si se indica, las de los ultimos 'Dias' dias
+        conf = self.cfg['Configuracion'].get('Captura', {})
+        if conf.get('Status', '0') != '2':
+            return
+        try:
+            dias = conf.get('Dias')
+            self.grabador = Grabador(f"{self.dir_Camp}{os.sep}Varios{os.sep}Capturas",
+                                     max_bytes=int(conf.get('MB', 32)) * 2 ** 20,
+                                     max_segundos=int(conf.get('Minutos', 60)) * 60,
+                                     copias=int(conf.get('Copias', 48)),
+                                     max_dias=None if dias is None else float(dias))
+            logging.info(f'Captura de puertos en {self.grabador.ruta}')
+        except OSError as e:
+            self.grabador = None
+            logging.error(f'No se pudo iniciar la captura de puertos: {e}')
+
+    ########################################################################
+    # Metricas de salud de los puertos (app.Metricas)
+    ########################################################################
+    def init_Metricas(self):
+        # Activas por defecto; "Metricas": {"Status": "0"} en Configuracion las desactiva
+        conf = self.cfg['Configuracion'].get('Metricas', {})
+        METRICAS.limpiar()
+        if conf.get('Status', '2') != '2':
+            return
+        # Escrituras del JSON de la campaña (app.Escritor)
+        METRICAS.registrar('JSON', self.station_manager.escritor)
+        try:
+            self.metricas_log = Metricas.archivo(f"{self.dir_Camp}{os.sep}Varios{os.sep}Metricas{os.sep}metricas.jsonl",
+                                                 max_bytes=int(conf.get('MB', 1)) * 2 ** 20)
+        except OSError as e:
+            self.metricas_log = None
+            logging.error(f'No se pudo abrir el archivo de metricas: {e}')
+        if self.servidor_metricas is None and conf.get('Puerto', 8765):
+            try:
+                self.servidor_metricas = Metricas.ServidorMetricas(METRICAS, int(conf.get('Puerto', 8765)))
+                self.servidor_metricas.start()
+                logging.info(f'Metricas en http://127.0.0.1:{self.servidor_metricas.puerto}/metricas')
+            except OSError as e:
+                self.servidor_metricas = None
+                logging.error(f'No se pudo iniciar el servidor de metricas: {e}')
+        self.metricas_Timer.start(int(float(conf.get('Segundos', 1)) * 1000))
+
+    def actualizar_metricas(self):
+        instantanea = METRICAS.instantanea()
+        if self.metricas_log is not None:
+            Metricas.escribir(self.metricas_log, instantanea)
+        self.resumen_metricas = Metricas.Metricas.resumen(instantanea)
+        self.updateStatusBar()
+
+    ########################################################################
+    # Puente de los datos hacia la ventana (PuenteQt)
+    ########################################################################
+    def init_Puente(self, cola):
+        # El almacen recibe todos los valores; la ventana el ultimo de cada señal a "Refresco" Hz
+        self.cola = cola
+        METRICAS.registrar('Cola', cola)
+        self.puente = PuenteQt(cola, self.almacen, hz=self.cfg['Configuracion'].get('Refresco', 10))
+        self.puente.conectar('NMEA', self.onIntReadyNMEA)
+        self.puente.conectar('DBS', self.onIntReadyDBS)
+        self.puente.conectar('CTD', self.onIntReadyCTD)
+        self.puente.conectar('TSG', self.onIntReadyTSG)
+        self.puente.finished.connect(self.loop_finished)
+
+    def eco(self, señal, valor):
+        # Copia de los datos recibidos en la consola, solo con "Eco": "2" en Configuracion (depuracion)
+        if self.cfg['Configuracion'].get('Eco', '0') == '2':
+            print(f"Cadena de {señal}: {valor}")
+
     def updateStatusBar(self):
         # Construye la cadena de estado combinada en el statusBar
         nmea_str = f"Vel: {self.NMEA_Str.get('Velocidad', 'N/A')} knt"
         dbs_str = f"Z: {self.DBS_Str} metros"
         status_message = f"{nmea_str} | {dbs_str}"
+        if self.resumen_metricas:
+            status_message += f" | {self.resumen_metricas}"
         # Actualiza el statusBar con la cadena combinada
         self.statusBar().showMessage(status_message)
 
@@ -430,48 +609,11 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.Menu_Config.setEnabled(False)
             self.fdo = 0
             
-            # Inicialización de variables locales para mapeo (Lógica heredada mantenida por seguridad)
-            # TSG
-            self.TSG_str = {
-                'scan': 'NaN', 'lat': 'NaN', 'lon': 'NaN', 'sal': 'NaN',
-                'temp': 'NaN', 'cond': 'NaN', 'temp38': 'NaN',
-            }
-            Nom_var = self.cfg['Configuracion']['TSG']['filas']
-            for i in range(0, len(Nom_var)):
-                if 'Scan' in Nom_var[i] or 'scan' in Nom_var[i]:
-                    self.TSG_str['scan'] = i
-                elif 'Lon' in Nom_var[i] or 'lon' in Nom_var[i]:
-                    self.TSG_str['lon'] = i
-                elif 'Lat' in Nom_var[i] or 'lat' in Nom_var[i]:
-                    self.TSG_str['lat'] = i
-                elif ('Temp' in Nom_var[i] or 'temp' in Nom_var[i]) and not ('SBE38' in Nom_var[i] or 'sbe38' in Nom_var[i]):
-                    self.TSG_str['temp'] = i
-                elif 'Cond' in Nom_var[i] or 'cond' in Nom_var[i]:
-                    self.TSG_str['cond'] = i
-                elif 'Sal' in Nom_var[i] or 'sal' in Nom_var[i]:
-                    self.TSG_str['sal'] = i
-                elif ('Temp' in Nom_var[i] or 'temp' in Nom_var[i]) and ('SBE38' in Nom_var[i] or 'sbe38' in Nom_var[i]):
-                    self.TSG_str['temp38'] = i
-
-            # CTD
-            self.CTD_str = {
-                'cond': 'NaN', 'press': 'NaN', 'sal': 'NaN',
-                'scan': 'NaN', 'temp': 'NaN', 'bot': 'NaN',
-            }
-            Nom_var = self.cfg['Configuracion']['CTD']['filas']
-            for i in range(0, len(Nom_var)):
-                if 'Scan' in Nom_var[i] or 'scan' in Nom_var[i]:
-                    self.CTD_str['scan'] = i
-                elif 'Pres' in Nom_var[i] or 'pres' in Nom_var[i]:
-                    self.CTD_str['press'] = i
-                elif ('Temp' in Nom_var[i] or 'temp' in Nom_var[i]) and not ('SBE38' in Nom_var[i] or 'sbe38' in Nom_var[i]):
-                    self.CTD_str['temp'] = i
-                elif 'Cond' in Nom_var[i] or 'cond' in Nom_var[i]:
-                    self.CTD_str['cond'] = i
-                elif 'Sal' in Nom_var[i] or 'sal' in Nom_var[i]:
-                    self.CTD_str['sal'] = i
-                elif ('Bot' in Nom_var[i] or 'bot' in Nom_var[i]):
-                    self.CTD_str['bot'] = i
+            # Esquemas de columnas de CTD y TSG (app.Esquema), compilados una vez por configuracion.
+            # Hasta recibir el primer dato todas las variables quedan en 'NaN'
+            self.esquemas = esquemas(self.cfg)
+            self.TSG_str = self.esquemas['TSG'].vacia()
+            self.CTD_str = self.esquemas['CTD'].vacia()
 
             self.setAdquisicion()               # Inicio Hilos
             logging.info('Threads iniciados')
@@ -516,7 +658,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             self.btn_Cubierta.setEnabled(False)
 
     def click_btn_Superficie(self):
-        self.station_manager.W_TSGvsCTD(self.CTD_str, self.TSG_str, self.NMEA_Str)
+        self.station_manager.W_TSGvsCTD(self.CTD_str, self.TSG_str, self.NMEA_Str,
+                                        self.alineacion.comparar(Timeout.TIME()))
         if self.fdo == 0:
             self.btn_Superficie.setEnabled(False)
             # self.btn_skipover.setEnabled(False)
@@ -558,7 +701,10 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             try:
-                pass
+                # Lo que quede en el diario pasa al JSON de la campaña
+                self.station_manager.close()
+                if self.servidor_metricas is not None:
+                    self.servidor_metricas.stop()
             except NameError:
                 pass
             finally:
@@ -570,6 +716,21 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     # Detengo el trabajo de los hilos
     ########################################################################
     def stop_loop(self):
+        if self.motor is not None:
+            self.motor.stop()
+            self.motor = None
+        else:
+            self.stop_workers()
+        if self.metricas_Timer.isActive():
+            # Ultima instantanea con los contadores finales de la estacion
+            self.metricas_Timer.stop()
+            self.actualizar_metricas()
+        if self.grabador is not None:
+            # Lo que lean los hilos despues de cerrar ya no se graba
+            self.grabador.close()
+            self.grabador = None
+
+    def stop_workers(self):
         if self.cfg['Configuracion']['NMEA']['Status'] == '2':
             self.NMEA.working = False
         if self.cfg['Configuracion']['CTD']['Status'] == '2':
@@ -740,8 +901,8 @@ class env():
                             logging.critical(
                                 'Debe crear la estructura de datos antes de incorporar una campaña.')
                             sys.exit(0)
-                    with open(file_json, 'r') as archivo:
-                        estructura_json = json.load(archivo)
+                    # El JSON de la campaña con los registros que hayan quedado en su diario
+                    estructura_json = Diario.cargar(file_json)
                     return estructura_json
         except:
             pass
@@ -32,6 +32,7 @@ from app import DBS
 from app.cfg import Cfg
 from app import utils
 from app import Key_Reg
+from app import Planilla
 
 # Importo las GUI de la App
 from gui.Main_ui import *
@@ -515,7 +516,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     ########################################################################
     def onIntReadyNMEA(self, i):
         self.NMEA_Str = i
-        print(f"Cadena de NMEA: {self.NMEA_Str}")
+        if self.cfg['Configuracion'].get('Eco', '0') == '2':
+            print(f"Cadena de NMEA: {self.NMEA_Str}")
         self.statusBar().showMessage(f"Vel: {self.NMEA_Str['Velocidad']} knt")
     ########################################################################
     # Inicializo el com del CTD
@@ -564,7 +566,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         except KeyError:
             print('No se encontro variable de botella para el CTD')
 
-        print(f"Cadena de CTD: {self.CTD_str}")
+        if self.cfg['Configuracion'].get('Eco', '0') == '2':
+            print(f"Cadena de CTD: {self.CTD_str}")
 
     ########################################################################
     # Inicializo el com del TSG
@@ -605,7 +608,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     ########################################################################
     def onIntReadyTSG(self, i):
         self.TSG_str = i
-        print(f"Cadena de TSG: {self.TSG_str}")
+        if self.cfg['Configuracion'].get('Eco', '0') == '2':
+            print(f"Cadena de TSG: {self.TSG_str}")
 
     def loop_finished(self):
         self.flag = False
@@ -787,109 +791,13 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.btn_skipover.setEnabled(False)
 
     def click_btn_Exportar(self):
-        import openpyxl
-        j = 0
-        k = 0
         self.txt_EstGral.setText(self.txt_EstGral.text().zfill(4))
-        xls = openpyxl.load_workbook('Planilla_V1.xlsx')
-        planilla = xls.get_sheet_by_name('Hoja1')
-        R_File = open(self.W_Dir + os.sep + 'Est%s.txt' %
-                      self.txt_EstGral.text().zfill(4), "r")
-        dato = R_File.readlines()
-        R_File.close()
-        planilla['A2'] = self.cfg['Campaña']['SiglasBuque'].upper(
+        campania = self.cfg['Campaña']['SiglasBuque'].upper(
         )+self.cfg['Campaña']['Año']+str(int(self.cfg['Campaña']['NroCampaña'])).zfill(2)
-        flag_nmea = True
-        flag_cub = True
-        flag_sup = True
-        for i in dato:
-            i = i.replace('\n', '')
-            i = i.split(',')
-            if 'NMEA' in i:
-                if flag_nmea:
-                    planilla['F2'] = i[1]
-                    planilla['A6'] = '%.4f' % (float(i[2]))
-                    planilla['E6'] = '%.4f' % (float(i[3]))
-                    planilla['J2'] = i[4]
-                    planilla['O2'] = i[5]
-                    if not (i[6] == 'NaN'):
-                        planilla['Q6'] = str(round(float(i[6])))
-                    else:
-                        planilla['Q6'] = i[6]
-                    flag_nmea = False
-                else:
-                    planilla['I6'] = '%.4f' % (float(i[2]))
-                    planilla['M6'] = '%.4f' % (float(i[3]))
-                    planilla['T2'] = i[4]
-                    planilla['Y2'] = i[5]
-                    if not (i[6] == 'NaN'):
-                        planilla['S6'] = str(round(float(i[6])))
-                    else:
-                        planilla['S6'] = 'NaN'
-            elif 'Cub' in i:
-                if flag_cub:
-                    planilla['E9'] = i[2][0:5]
-                    planilla['H9'] = '%.1f' % (float(i[4]))
-                    planilla['L9'] = '%.3f' % (float(i[5]))
-                    planilla['P9'] = '%.3f' % (float(i[6]))
-                    planilla['S9'] = '%.3f' % (float(i[7]))
-                    flag_cub = False
-                else:
-                    planilla['E13'] = i[2][0:5]
-                    planilla['H13'] = '%.1f' % (float(i[4]))
-                    planilla['L13'] = '%.3f' % (float(i[5]))
-                    planilla['P13'] = '%.3f' % (float(i[6]))
-                    planilla['S13'] = '%.3f' % (float(i[7]))
-
-            elif 'Sup' in i:
-                if flag_sup:
-                    planilla['E10'] = i[2][0:5]
-                    planilla['H10'] = '%.1f' % (float(i[4]))
-                    planilla['L10'] = '%.3f' % (float(i[5]))
-                    planilla['P10'] = '%.3f' % (float(i[6]))
-                    planilla['S10'] = '%.3f' % (float(i[7]))
-                    planilla['W10'] = '%.3f' % (float(i[9]))
-                    planilla['Z10'] = '%.3f' % (float(i[10]))
-                    planilla['AC10'] = '%.0f' % (float(i[8]))
-                    planilla['AG10'] = i[11]
-                    # Delta Temp y Sal
-                    planilla['E27'] = '%.3f' % (float(i[12]))
-                    planilla['E28'] = '%.4f' % (float(i[13]))
-                    flag_sup = False
-                else:
-                    planilla['E12'] = i[2][0:5]
-                    planilla['H12'] = '%.1f' % (float(i[4]))
-                    planilla['L12'] = '%.3f' % (float(i[5]))
-                    planilla['P12'] = '%.3f' % (float(i[6]))
-                    planilla['S12'] = '%.3f' % (float(i[7]))
-                    planilla['W12'] = '%.3f' % (float(i[9]))
-                    planilla['Z12'] = '%.3f' % (float(i[10]))
-                    planilla['AC12'] = '%.0f' % (float(i[8]))
-                    planilla['AG12'] = i[11]
-
-            elif 'Fdo' in i:
-                planilla['E11'] = i[2][0:5]
-                planilla['H11'] = '%.1f' % (float(i[4]))
-                planilla['L11'] = '%.3f' % (float(i[5]))
-                planilla['P11'] = '%.3f' % (float(i[6]))
-                planilla['S11'] = '%.3f' % (float(i[7]))
-            elif 'Bott' in i:
-                bot = int(i[-1])
-                fila = 16 + bot
-                col = ['B', 'E', 'H', 'M']
-                if fila <= 22:
-                    planilla['B' + str(fila)] = i[2][0:5]
-                    planilla['E' + str(fila)] = '%.1f' % (float(i[4]))
-                    planilla['H' + str(fila)] = '%.3f' % (float(i[5]))
-                    planilla['M' + str(fila)] = '%.3f' % (float(i[6]))
-                else:
-                    fila = 10 + bot
-                    planilla['T' + str(fila)] = i[2][0:5]
-                    planilla['W' + str(fila)] = '%.1f' % (float(i[4]))
-                    planilla['Z' + str(fila)] = '%.3f' % (float(i[5]))
-                    planilla['AE' + str(fila)] = '%.3f' % (float(i[6]))
-        xls.save(self.W_Dir + os.sep + '%s.xlsx' %
-                 self.txt_EstGral.text().zfill(4))
+        Planilla.exportar('Planilla_V1.xlsx',
+                          self.W_Dir + os.sep + 'Est%s.txt' % self.txt_EstGral.text().zfill(4),
+                          self.W_Dir + os.sep + '%s.xlsx' % self.txt_EstGral.text().zfill(4),
+                          campania)
 
     # Abro el formulario de configuracion
     def Frm_Config_load(self, event):
@@ -0,0 +1,534 @@
+"""
+Motor de adquisicion por eventos.
+
+Un solo hilo con un bucle asyncio atiende todos los puertos serie (CTD, TSG,
+NMEA y ecosonda). Cada puerto se vigila con loop.add_reader: las lineas se arman
+a medida que llegan los bytes, sin esperas fijas ni lecturas bloqueantes. En
+Windows, donde el bucle no puede vigilar puertos serie, y en los puertos sin
+descriptor de archivo (replay://) cada puerto se sondea desde una tarea del
+mismo bucle.
+
+Los resultados pasan a la interfaz por una unica cola acotada (Cola); el
+PuenteQt la vacia en el hilo de la ventana a lo sumo 'hz' veces por segundo:
+todos los valores van al almacen y a la ventana solo el ultimo de cada señal.
+Los QThread por instrumento (Motor: hilos) publican en la misma clase de cola.
+Si la ventana no la vacia (se trabo) la cola no crece mas alla de 'limite'
+scans: descarta los mas viejos o diezma los que llegan, y cuenta cada scan
+descartado por señal.
+"""
+import asyncio
+import logging
+import sys
+import threading
+from collections import Counter, deque
+
+import serial
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from app.Framer import LineFramer, Timeout
+from app.Metricas import METRICAS
+from app.NMEA_Mux import NMEA_Mux
+from app.Muestras import Muestra
+from app.Esquema import LOTE, Lote, compilar
+from app.SerialWorkers import NMEA_Mux_Worker, CLAVES_POSICION, Scans, posicion
+
+
+class Canal(object):
+    """
+    Un puerto serie atendido por el Motor. Las subclases implementan decode y nan.
+    Los parametros a ingresar son:
+        - nombre: nombre del instrumento (señal con la que se publican los datos)
+        - port: puerto serie o URL de pyserial
+        - BR: Baud rate del puerto
+        - timeout: segundos sin datos antes de publicar NaN
+    """
+
+    def __init__(self, nombre, port, BR, timeout):
+        self.nombre = nombre
+        self.port = port
+        self.BR = BR
+        self.timeout = timeout
+        self.ser = None
+        self.framer = None
+        # Funcion que graba los bytes crudos del puerto (app.Captura)
+        self.captura = None
+        # Instante (monotonic) de la ultima linea decodificada o del ultimo aviso de timeout
+        self.ultimo = None
+        # Contadores que lee app.Metricas
+        self.lineas = 0
+        self.bytes = 0
+        self.timeouts = 0
+        self.reconexiones = 0
+        # Tarea de sondeo (solo en Windows)
+        self.tarea = None
+
+    @property
+    def is_open(self):
+        return self.ser is not None and self.ser.is_open
+
+    def open(self):
+        # timeout=0: el puerto nunca bloquea, el bucle avisa cuando hay datos
+        self.ser = serial.serial_for_url(str(self.port), self.BR, 8, timeout=0)
+        self.ser.reset_input_buffer()
+        self.framer = LineFramer(self.ser, captura=self.captura)
+        self.ultimo = Timeout.TIME()
+
+    def close(self):
+        if self.ser is not None:
+            self.ser.close()
+
+    def read(self):
+        """Lee los bytes disponibles y regresa las lineas completas."""
+        data = self.ser.read(self.ser.in_waiting or 1)
+        self.bytes += len(data)
+        return self.framer.feed(data)
+
+    def decode(self, line, t=None):
+        """Regresa la lista de (señal, valor) que produce una linea llegada en el instante t."""
+        raise NotImplementedError
+
+    def nan(self):
+        """Regresa la lista de (señal, valor) a publicar cuando el puerto no entrega datos."""
+        raise NotImplementedError
+
+
+class CanalNMEA(Canal):
+    """
+    Puerto NMEA. Publica la posicion por la señal 'NMEA' una vez por fix (RMC o
+    GGA, ver NMEA_Mux.fix_nuevo) y, si se indica profundidad, la profundidad por
+    la señal 'DBS'.
+    """
+
+    def __init__(self, nombre, port, BR, timeout=2, posicion=True, profundidad=False):
+        Canal.__init__(self, nombre, port, BR, timeout)
+        self.nmea = NMEA_Mux(port, BR, timeout)
+        self.posicion = posicion
+        self.profundidad = profundidad
+
+    @property
+    def errores(self):
+        return self.nmea.errores
+
+    def decode(self, line, t=None):
+        sentencia = self.nmea.feed(line)
+        if sentencia is None:
+            return []
+        if self.posicion and self.nmea.fix_nuevo((sentencia,)):
+            return [('NMEA', posicion(self.nmea, t))]
+        if self.profundidad and sentencia in NMEA_Mux_Worker.PROFUNDIDAD:
+            return [('DBS', self.nmea.Get_Z_Metros())]
+        return []
+
+    def nan(self):
+        valores = list()
+        if self.posicion:
+            valores.append(('NMEA', Muestra.vacia(CLAVES_POSICION)))
+        if self.profundidad:
+            valores.append(('DBS', 'NaN'))
+        return valores
+
+
+class CanalColumnas(Canal):
+    """
+    Salida ASCII de Sea-Bird (CTD o TSG): columnas separadas por espacios.
+    Todos los scans se procesan en orden; 'scans' lleva la cuenta de recibidos
+    y perdidos y 'latest' guarda el ultimo.
+    """
+
+    def __init__(self, nombre, port, BR, timeout, filas):
+        Canal.__init__(self, nombre, port, BR, timeout)
+        self.esquema = compilar(filas)
+        self.format = self.esquema.formato
+        self.scans = Scans(self.esquema)
+        self.latest = None
+        self.errores = 0
+
+    def decode(self, line, t=None):
+        try:
+            dato = self.esquema.decode(line, t)
+        except (UnicodeDecodeError, KeyError):
+            # Linea cortada o con mas columnas que las configuradas
+            self.errores += 1
+            return []
+        self.scans.contar(dato)
+        self.latest = dato
+        return [(self.nombre, dato)]
+
+    def decode_lote(self, lineas, t=None):
+        """Como decode, para muchas lineas juntas: regresa la señal con un app.Esquema.Lote."""
+        lote = self.esquema.lote(lineas, t)
+        self.errores += lote.invalidas
+        if not len(lote):
+            return []
+        self.scans.contar_lote(lote)
+        self.latest = lote.ultima
+        return [(self.nombre, lote)]
+
+    def nan(self):
+        return [(self.nombre, self.esquema.vacia())]
+
+
+# Politicas de la Cola llena
+DESCARTAR = 'descartar'
+DIEZMAR = 'diezmar'
+# Scans pendientes como maximo por defecto: unos 14 minutos de un 911plus a 24 Hz
+LIMITE = 20000
+
+
+def _scans(valor):
+    """Cantidad de scans de un valor publicado (un Lote trae varios)."""
+    return len(valor) if isinstance(valor, Lote) else 1
+
+
+def _recortar(lote, n):
+    """Lote sin sus primeras 'n' filas."""
+    return Lote(lote.esquema, lote.datos[n:], lote.invalidas, lote.t, lote.ultima)
+
+
+class Cola(object):
+    """
+    Resultados de la adquisicion como (señal, valor, instante de llegada), de
+    cualquier hilo hacia la ventana. Avisa una sola vez hasta que se vacia.
+    Los parametros a ingresar son:
+        - limite: scans pendientes como maximo (0 sin limite)
+        - politica: que hacer con la cola llena
+            DESCARTAR: se descartan los scans mas viejos
+            DIEZMAR: se deja uno de cada dos scans de la cola y de lo que llega
+              se guarda uno de cada 'diezmo' scans; el diezmo se duplica cada
+              vez que la cola se vuelve a llenar y vuelve a 1 cuando la ventana
+              la vacia. Asi la cola cubre toda la traba con menos densidad.
+    Funciones a utilizar:
+        - vaciar: retira todo lo que hay en la cola (la usa PuenteQt)
+        - publicador: funcion que publica los valores de una señal, para
+          conectar a la señal Qt de un worker con Qt.DirectConnection
+        - por_señal / descartados: scans descartados por señal y en total (app.Metricas)
+    """
+
+    def __init__(self, limite=LIMITE, politica=DESCARTAR):
+        if politica not in (DESCARTAR, DIEZMAR):
+            raise ValueError(f'Politica de cola desconocida: {politica}')
+        self.cola = deque()
+        self.limite = limite
+        self.politica = politica
+        # Scans en la cola y scans publicados desde el inicio
+        self.pendientes = 0
+        self.lineas = 0
+        self.por_señal = Counter()
+        self.diezmo = 1
+        # Scans recibidos de cada señal mientras se diezma (elige cuales se guardan)
+        self._diezmados = Counter()
+        self._lock = threading.Lock()
+        # Se llama desde el hilo que publica cuando la cola deja de estar vacia
+        self.aviso = None
+        self._avisado = False
+
+    @property
+    def descartados(self):
+        return sum(self.por_señal.values())
+
+    def vaciar(self):
+        """Regresa la lista de resultados pendientes. Se llama desde el hilo de la ventana."""
+        with self._lock:
+            self._avisado = False
+            resultados = list(self.cola)
+            self.cola.clear()
+            self.pendientes = 0
+            # La ventana se puso al dia: se vuelve a guardar todo
+            self.diezmo = 1
+            self._diezmados.clear()
+        return resultados
+
+    def _diezmar(self, señal, valor):
+        """Parte de 'valor' que se guarda con el diezmo actual, o None si no se guarda nada."""
+        visto = self._diezmados[señal]
+        if isinstance(valor, Lote):
+            n = len(valor)
+            # Filas cuyo numero de orden (contando los ya vistos) es multiplo del diezmo
+            primera = -visto % self.diezmo
+            self._diezmados[señal] += n
+            self.por_señal[señal] += n - len(range(primera, n, self.diezmo))
+            if primera >= n:
+                return None
+            return Lote(valor.esquema, valor.datos[primera::self.diezmo], valor.invalidas, valor.t, valor.ultima)
+        self._diezmados[señal] += 1
+        if visto % self.diezmo:
+            self.por_señal[señal] += 1
+            return None
+        return valor
+
+    def _publicar(self, señal, valor, t):
+        with self._lock:
+            if señal is not None:
+                # La marca de fin (señal None) nunca se descarta ni se cuenta
+                self.lineas += _scans(valor)
+                if self.limite and self.diezmo > 1:
+                    valor = self._diezmar(señal, valor)
+                    if valor is None:
+                        return
+                n = _scans(valor)
+                if self.limite and n > self.limite:
+                    # Un Lote mas grande que toda la cola: solo entran sus ultimas filas
+                    self.por_señal[señal] += n - self.limite
+                    valor, n = _recortar(valor, n - self.limite), self.limite
+                if self.limite and self.pendientes + n > self.limite:
+                    if self.politica == DIEZMAR:
+                        self._ralear()
+                        logging.warning(f'Cola llena: se guarda 1 de cada {self.diezmo} scans')
+                    self._liberar(n)
+                self.pendientes += n
+            self.cola.append((señal, valor, t))
+            avisar = not self._avisado
+            self._avisado = True
+        if avisar and self.aviso is not None:
+            self.aviso()
+
+    def _ralear(self):
+        """Deja uno de cada dos scans de cada señal en la cola y duplica el diezmo."""
+        self.diezmo *= 2
+        vistos = Counter()
+        cola = deque()
+        self.pendientes = 0
+        for señal, valor, t in self.cola:
+            if señal is None:
+                cola.append((señal, valor, t))
+                continue
+            visto = vistos[señal]
+            n = _scans(valor)
+            vistos[señal] += n
+            if isinstance(valor, Lote):
+                valor = Lote(valor.esquema, valor.datos[visto % 2::2], valor.invalidas, valor.t, valor.ultima)
+                self.por_señal[señal] += n - len(valor)
+                if not len(valor):
+                    continue
+            elif visto % 2:
+                self.por_señal[señal] += 1
+                continue
+            cola.append((señal, valor, t))
+            self.pendientes += _scans(valor)
+        self.cola = cola
+
+    def _liberar(self, n):
+        """Descarta los scans mas viejos hasta que entren 'n' mas."""
+        while self.cola and self.pendientes + n > self.limite:
+            señal, valor, t = self.cola[0]
+            if señal is None:
+                break
+            viejos = _scans(valor)
+            sobran = self.pendientes + n - self.limite
+            if isinstance(valor, Lote) and viejos > sobran:
+                # Del Lote mas viejo solo se descartan las primeras filas
+                self.cola[0] = (señal, _recortar(valor, sobran), t)
+                viejos = sobran
+            else:
+                self.cola.popleft()
+            self.pendientes -= viejos
+            self.por_señal[señal] += viejos
+
+    def publicador(self, señal):
+        return lambda valor: self._publicar(señal, valor, Timeout.TIME())
+
+
+class Motor(Cola):
+    """
+    Atiende todos los canales desde un unico hilo con un bucle asyncio.
+    Cada resultado se agrega a la cola como (señal, valor, instante de llegada);
+    'limite' y 'politica' acotan la cola como en Cola.
+    Funciones a utilizar:
+        - agregar: suma un canal antes de iniciar
+        - start / stop: inicia y detiene el hilo del bucle
+        - vaciar: retira todo lo que hay en la cola (la usa PuenteQt)
+    """
+    # Windows no permite vigilar puertos serie con add_reader
+    SONDEO = sys.platform == 'win32'
+
+    def __init__(self, sondeo=0.02, limite=LIMITE, politica=DESCARTAR):
+        Cola.__init__(self, limite, politica)
+        self.canales = list()
+        self.sondeo = sondeo
+        self._loop = None
+        self._detener = None
+        self._hilo = None
+
+    def agregar(self, canal):
+        self.canales.append(canal)
+        return canal
+
+    def start(self):
+        self._hilo = threading.Thread(target=asyncio.run, args=(self._principal(),),
+                                      name='Adquisicion', daemon=True)
+        self._hilo.start()
+
+    def stop(self, esperar=True):
+        if self._loop is not None and self._detener is not None:
+            self._loop.call_soon_threadsafe(self._detener.set)
+        if esperar and self._hilo is not None:
+            self._hilo.join()
+
+    def _leer(self, canal):
+        t = Timeout.TIME()
+        try:
+            lineas = canal.read()
+        except (serial.SerialException, OSError) as e:
+            logging.critical(f'Error de lectura en el puerto {canal.port}: {e}')
+            self._desconectar(canal)
+            return
+        if len(lineas) >= LOTE and isinstance(canal, CanalColumnas):
+            valores = canal.decode_lote(lineas, t)
+            for señal, lote in valores:
+                canal.lineas += len(lote)
+                canal.ultimo = t
+                self._publicar(señal, lote, t)
+            return
+        for line in lineas:
+            valores = canal.decode(line, t)
+            if valores:
+                canal.lineas += 1
+                canal.ultimo = t
+            for señal, valor in valores:
+                self._publicar(señal, valor, t)
+
+    @staticmethod
+    def _descriptor(canal):
+        """Descriptor de archivo del puerto, o None si no tiene (URL como replay://)."""
+        try:
+            return canal.ser.fileno()
+        except (AttributeError, OSError):
+            # io.UnsupportedOperation es un OSError
+            return None
+
+    def _conectar(self, canal):
+        canal.open()
+        descriptor = self._descriptor(canal)
+        if self.SONDEO or descriptor is None:
+            canal.tarea = self._loop.create_task(self._sondear(canal))
+        else:
+            canal.tarea = None
+            self._loop.add_reader(descriptor, self._leer, canal)
+
+    def _desconectar(self, canal):
+        if canal.is_open and canal.tarea is None:
+            self._loop.remove_reader(canal.ser.fileno())
+        canal.close()
+
+    async def _sondear(self, canal):
+        while canal.is_open:
+            try:
+                hay_datos = canal.ser.in_waiting
+            except (serial.SerialException, OSError) as e:
+                logging.critical(f'Error de lectura en el puerto {canal.port}: {e}')
+                self._desconectar(canal)
+                return
+            if hay_datos:
+                self._leer(canal)
+            await asyncio.sleep(self.sondeo)
+
+    async def _vigilar(self):
+        """Publica NaN en los canales sin datos y reabre los puertos con error."""
+        while not self._detener.is_set():
+            ahora = Timeout.TIME()
+            for canal in self.canales:
+                if canal.ultimo is None or ahora - canal.ultimo < canal.timeout:
+                    continue
+                canal.ultimo = ahora
+                if canal.is_open:
+                    canal.timeouts += 1
+                    logging.warning(f"Timeout al intentar leer el puerto serie {canal.port}.")
+                    for señal, valor in canal.nan():
+                        self._publicar(señal, valor, ahora)
+                    continue
+                try:
+                    self._conectar(canal)
+                    canal.reconexiones += 1
+                except (serial.SerialException, OSError) as e:
+                    logging.critical(f'No se pudo reabrir el puerto {canal.port}: {e}')
+                    for señal, valor in canal.nan():
+                        self._publicar(señal, valor, ahora)
+            try:
+                await asyncio.wait_for(self._detener.wait(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _principal(self):
+        self._loop = asyncio.get_running_loop()
+        self._detener = asyncio.Event()
+        for canal in self.canales:
+            try:
+                self._conectar(canal)
+            except (serial.SerialException, OSError) as e:
+                logging.critical(f'No se pudo abrir el puerto {canal.port}: {e}')
+                canal.ultimo = Timeout.TIME()
+        await self._vigilar()
+        for canal in self.canales:
+            self._desconectar(canal)
+            perdidos = f", {canal.scans.perdidos} scans perdidos" if hasattr(canal, 'scans') else ''
+            logging.info(f"Puerto {canal.port}: {canal.lineas} lineas, {canal.reconexiones} reconexiones{perdidos}")
+        if self.descartados:
+            logging.warning(f"Scans descartados por la cola llena: {dict(self.por_señal)}")
+        self._publicar(None, None, Timeout.TIME())
+
+
+class PuenteQt(QObject):
+    """
+    Lleva los resultados de una Cola (el Motor o los workers) al hilo de la
+    ventana. No sondea: la cola avisa con una señal Qt (en cola) cuando agrega
+    datos y el puente entrega, para cada señal, solo el ultimo valor recibido,
+    a lo sumo 'hz' veces por segundo; los datos que llegan entre dos entregas
+    esperan a la siguiente. Si se indica un almacen (app.RingBuffer.Almacen) se
+    le agregan todos los valores, no solo el ultimo. De un app.Esquema.Lote la
+    ventana recibe solo su ultima Muestra.
+    """
+    finished = pyqtSignal()
+    _aviso = pyqtSignal()
+
+    def __init__(self, motor, almacen=None, hz=10):
+        super(PuenteQt, self).__init__()
+        self.motor = motor
+        self.almacen = almacen
+        self.destinos = dict()
+        self.periodo = 1.0 / hz if hz else 0.0
+        # Instante (monotonic) a partir del cual se puede volver a entregar
+        self._proxima = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.vaciar)
+        # Segundos entre la llegada del ultimo dato y su entrega a la ventana
+        self.latencia = 0.0
+        self.latencia_max = 0.0
+        self._aviso.connect(self._avisado)
+        motor.aviso = self._aviso.emit
+
+    def conectar(self, señal, funcion):
+        self.destinos[señal] = funcion
+
+    def _avisado(self):
+        if self._timer.isActive():
+            return
+        espera = self._proxima - Timeout.TIME()
+        if espera <= 0:
+            self.vaciar()
+        else:
+            self._timer.start(int(espera * 1000) + 1)
+
+    def vaciar(self):
+        self._proxima = Timeout.TIME() + self.periodo
+        ultimos = dict()
+        for señal, valor, t in self.motor.vaciar():
+            if isinstance(valor, Lote):
+                if self.almacen is not None:
+                    self.almacen.extender(señal, valor.datos, t)
+                ultimos[señal] = (valor.ultima, t)
+                continue
+            ultimos[señal] = (valor, t)
+            if self.almacen is not None and señal is not None:
+                self.almacen.agregar(señal, valor, t)
+        ahora = Timeout.TIME()
+        for señal, (valor, t) in ultimos.items():
+            if señal is None:
+                self.finished.emit()
+                continue
+            self.latencia = ahora - t
+            self.latencia_max = max(self.latencia_max, self.latencia)
+            METRICAS.observar(f'latencia.{señal}', self.latencia)
+            funcion = self.destinos.get(señal)
+            if funcion is not None:
+                funcion(valor)
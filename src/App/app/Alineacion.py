@@ -0,0 +1,94 @@
+"""
+Alineacion temporal de TSG y CTD para las comparaciones de Superficie.
+
+El TSG entrega un dato cada 'Intervalo' segundos mientras el CTD entrega varios
+por segundo, por lo que los ultimos valores de cada uno pueden estar separados
+varios segundos. Aca ambas series se llevan a una linea de tiempo comun (la
+union de los instantes de llegada de los dos instrumentos dentro de la ventana)
+por interpolacion lineal con np.interp, y las diferencias se promedian sobre la
+ventana.
+"""
+import numpy as np
+
+
+def _serie(buffer, columna, t_ini, t_fin):
+    """Instantes y valores validos de una columna del buffer entre t_ini y t_fin."""
+    t, _, datos = buffer.window(t_ini, t_fin)
+    valores = datos[:, buffer.columnas.index(columna)]
+    validos = np.isfinite(valores)
+    return t[validos], valores[validos]
+
+
+def _distancia(t, muestras):
+    """Para cada instante de t, segundos hasta la muestra real mas cercana."""
+    pos = np.searchsorted(muestras, t)
+    izquierda = muestras[np.clip(pos - 1, 0, len(muestras) - 1)]
+    derecha = muestras[np.clip(pos, 0, len(muestras) - 1)]
+    return np.minimum(np.abs(t - izquierda), np.abs(t - derecha))
+
+
+class Alineacion(object):
+    """
+    Compara temperatura y salinidad de TSG y CTD alineadas en el tiempo.
+    Los parametros a ingresar son:
+        - almacen: app.RingBuffer.Almacen con los buffers y los esquemas de 'CTD' y 'TSG'
+        - ventana: segundos sobre los que se promedian las diferencias (10 por defecto)
+        - margen: segundos extra a cada lado de la ventana para tener muestras
+          con que interpolar; conviene que supere el Intervalo del TSG (por
+          defecto igual a la ventana)
+    Funciones a utilizar:
+        - comparar: diferencias TSG - CTD y error de alineacion
+    """
+
+    def __init__(self, almacen, ventana=10.0, margen=None):
+        self.almacen = almacen
+        self.ventana = ventana
+        self.margen = ventana if margen is None else margen
+        self.variables = dict()
+        for nombre in ('CTD', 'TSG'):
+            # Columnas de temperatura (sin la del SBE38) y salinidad segun el esquema del instrumento
+            esquema = almacen.esquemas[nombre]
+            self.variables[nombre] = {
+                'T': esquema.nombre('temp'),
+                'S': esquema.nombre('sal'),
+            }
+
+    def comparar(self, t=None):
+        """
+        Regresa un diccionario con deltaT y deltaS (TSG - CTD, promedio de la
+        ventana que termina en el instante monotonic t, por defecto el ultimo
+        dato recibido), errorAlineacion (segundos maximos entre un punto de la
+        linea de tiempo comun y la muestra real mas cercana), la cantidad de
+        puntos y la ventana usada. Los valores sin datos quedan en 'NaN'.
+        """
+        ctd, tsg = self.almacen['CTD'], self.almacen['TSG']
+        if t is None:
+            ultimos = [b.latest()['t_mono'] for b in (ctd, tsg) if len(b)]
+            t = max(ultimos) if ultimos else 0.0
+        t_ini = t - self.ventana
+        resultado = {'ventana': self.ventana}
+        error = 0.0
+        puntos = 0
+        for delta, variable in (('deltaT', 'T'), ('deltaS', 'S')):
+            col_ctd = self.variables['CTD'][variable]
+            col_tsg = self.variables['TSG'][variable]
+            if col_ctd is None or col_tsg is None:
+                resultado[delta] = 'NaN'
+                continue
+            tc, vc = _serie(ctd, col_ctd, t_ini - self.margen, t + self.margen)
+            ts, vs = _serie(tsg, col_tsg, t_ini - self.margen, t + self.margen)
+            if not len(tc) or not len(ts):
+                resultado[delta] = 'NaN'
+                continue
+            # Linea de tiempo comun: todos los instantes de ambos instrumentos dentro de la ventana
+            comun = np.union1d(tc[(tc >= t_ini) & (tc <= t)], ts[(ts >= t_ini) & (ts <= t)])
+            if not len(comun):
+                # Ningun dato dentro de la ventana: comparo en su final
+                comun = np.array([t])
+            diferencia = np.interp(comun, ts, vs) - np.interp(comun, tc, vc)
+            resultado[delta] = str(round(float(diferencia.mean()), 4))
+            error = max(error, float(_distancia(comun, tc).max()), float(_distancia(comun, ts).max()))
+            puntos = max(puntos, len(comun))
+        resultado['errorAlineacion'] = str(round(error, 3)) if puntos else 'NaN'
+        resultado['puntos'] = puntos
+        return resultado
@@ -0,0 +1,205 @@
+import copy
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+from app.NMEA import NMEA
+from app.Framer import Timeout
+from app.Sentencias import split_sentence
+
+# Velocidades a probar, de la mas comun a la menos comun en los instrumentos de a bordo
+BAUDIOS = (4800, 9600, 19200, 38400, 115200, 1200, 600)
+# Sentencias que solo transporta una ecosonda
+PROFUNDIDAD = {'DBS', 'DBT'}
+POSICION = {'RMC', 'GGA'}
+# Paridad de config.json -> pyserial
+PARIDADES = {'None': serial.PARITY_NONE, 'Even': serial.PARITY_EVEN, 'Odd': serial.PARITY_ODD,
+             'Mark': serial.PARITY_MARK, 'Space': serial.PARITY_SPACE}
+
+
+class Autodeteccion(NMEA):
+    """
+    Busca en todos los puertos serie del sistema el GPS, la ecosonda, el CTD y el TSG.
+    Cada puerto se prueba en paralelo y, dentro de cada puerto, se recorren
+    velocidad y paridad hasta reconocer el formato de las lineas:
+        - NMEA: sentencias con checksum valido (Batimetria si solo llegan DBS/DBT)
+        - CTD / TSG: columnas numericas separadas por espacios, tantas como
+          'filas' tenga la seccion en Configuracion (alcanza una sola linea si
+          todas sus columnas son numeros)
+    Primero se prueban la velocidad y paridad de cada seccion de la
+    configuracion, esperando en cada una el 'Intervalo' de la seccion mas un
+    segundo (el TSG puede mandar un dato cada 30 s). Despues se recorren las
+    velocidades de BAUDIOS con las paridades configuradas, repartiendo
+    'presupuesto' segundos entre todas.
+    Los parametros a ingresar son:
+        - cfg: diccionario de configuracion (config.json)
+        - presupuesto: segundos para recorrer las velocidades no configuradas (10 por defecto)
+        - baudios: velocidades a probar
+    Funciones a utilizar:
+        - detectar: prueba los puertos y deja el resultado en 'puertos'
+        - config: copia de cfg con los puertos y velocidades encontrados, lista para guardar
+    """
+
+    def __init__(self, cfg, presupuesto=10, baudios=BAUDIOS):
+        NMEA.__init__(self, sts=None)
+        self.cfg = cfg
+        self.presupuesto = presupuesto
+        # (BR, paridad) -> segundos de espera, primero lo configurado y sin repetir
+        self.pruebas = dict()
+        paridades = list()
+        for seccion in cfg['Configuracion'].values():
+            if not isinstance(seccion, dict) or not str(seccion.get('BR', '')).isdigit():
+                continue
+            paridad = PARIDADES.get(str(seccion.get('Parity', 'None')), serial.PARITY_NONE)
+            if paridad not in paridades:
+                paridades.append(paridad)
+            intervalo = seccion.get('Intervalo', 0)
+            espera = (intervalo if isinstance(intervalo, (int, float)) else 0) + 1
+            prueba = (int(seccion['BR']), paridad)
+            self.pruebas[prueba] = max(espera, self.pruebas.get(prueba, 0))
+        resto = [(BR, paridad) for BR in baudios for paridad in paridades or [serial.PARITY_NONE]
+                 if (BR, paridad) not in self.pruebas]
+        for prueba in resto:
+            self.pruebas[prueba] = presupuesto / len(resto)
+        self.baudios = tuple(dict.fromkeys(BR for BR, _ in self.pruebas))
+        self.columnas = {
+            seccion: len(cfg['Configuracion'][seccion]['filas']) for seccion in ('CTD', 'TSG')
+        }
+        self.puertos = dict()
+
+    @staticmethod
+    def _numerico(token):
+        try:
+            float(token)
+            return True
+        except ValueError:
+            return False
+
+    def clasificar(self, lineas, duracion):
+        """
+        Reconoce el instrumento a partir de las lineas leidas durante 'duracion' segundos.
+        Regresa (seccion, sentencias, lineas por segundo) o None si no se reconoce.
+        """
+        lineas = [line for line in lineas if line.strip()]
+        if not lineas:
+            return None
+        tasa = len(lineas) / duracion
+        # NMEA
+        sentencias = set()
+        validas = 0
+        for line in lineas:
+            partes = split_sentence(line)
+            if partes is not None:
+                validas += 1
+                sentencias.add(partes[1])
+        # Es NMEA si al menos la mitad de las lineas tienen checksum valido
+        # (una sola linea valida alcanza si fue la unica que llego)
+        if validas and validas * 2 >= len(lineas):
+            seccion = 'Batimetria' if sentencias and sentencias <= PROFUNDIDAD else 'NMEA'
+            return seccion, sentencias, tasa
+        # ASCII de Sea-Bird: columnas separadas por espacios, en su mayoria numericas.
+        # Con una sola linea (instrumento lento) se exige que todas lo sean
+        anchos = Counter()
+        for line in lineas:
+            try:
+                tokens = line.decode('ASCII').split()
+            except UnicodeDecodeError:
+                continue
+            numericos = sum(map(self._numerico, tokens))
+            if len(lineas) == 1:
+                numerica = numericos == len(tokens)
+            else:
+                numerica = numericos * 2 > len(tokens)
+            if tokens and numerica:
+                anchos[len(tokens)] += 1
+        if not anchos:
+            return None
+        ancho, cantidad = anchos.most_common(1)[0]
+        if cantidad * 2 < len(lineas):
+            return None
+        candidatas = [seccion for seccion, n in self.columnas.items() if n == ancho]
+        if not candidatas:
+            return None
+        return candidatas[0], candidatas, tasa
+
+    @property
+    def duracion(self):
+        """Segundos que puede demorar la busqueda (todas las pruebas de un puerto)."""
+        return sum(self.pruebas.values())
+
+    def probe_baudios(self, port, fin):
+        """
+        Prueba velocidad y paridad en orden hasta reconocer el instrumento o vencer 'fin'.
+        Regresa (BR, paridad, (seccion, sentencias, tasa)) o None.
+        """
+        for (BR, paridad), espera in self.pruebas.items():
+            tiempo = min(espera, fin.time_left())
+            if tiempo < 0.2:
+                break
+            lineas = self.sample(port, tiempo, BR, paridad)
+            if lineas is None:
+                # El puerto no existe o esta en uso
+                return None
+            resultado = self.clasificar(lineas, tiempo)
+            if resultado is not None:
+                return BR, paridad, resultado
+        return None
+
+    def detectar(self):
+        """
+        Prueba todos los puertos en paralelo sin superar el presupuesto de tiempo.
+        Regresa el diccionario puerto -> (seccion, BR, sentencias, tasa).
+        """
+        # Los puertos del simulador solo si la configuracion lo indica (Configuracion.Simulador)
+        self.scan_ports(self.cfg['Configuracion'].get('Simulador'))
+        self.puertos = dict()
+        self.paridades = dict()
+        fin = Timeout(self.duracion)
+        if self.list_ports:
+            with ThreadPoolExecutor(max_workers=len(self.list_ports)) as pool:
+                resultados = pool.map(lambda port: self.probe_baudios(port, fin), self.list_ports)
+                for port, resultado in zip(self.list_ports, resultados):
+                    if resultado is not None:
+                        BR, paridad, (seccion, sentencias, tasa) = resultado
+                        self.puertos[port] = (seccion, BR, sentencias, tasa)
+                        self.paridades[port] = paridad
+        return self.puertos
+
+    def asignar(self):
+        """Asigna a cada seccion de Configuracion el puerto detectado."""
+        asignados = dict()
+        # CTD y TSG pueden tener la misma cantidad de columnas: el CTD es el de mayor tasa
+        tabla = [(port, r) for port, r in self.puertos.items() if r[0] in ('CTD', 'TSG')]
+        tabla.sort(key=lambda item: item[1][3], reverse=True)
+        for port, (seccion, BR, candidatas, tasa) in tabla:
+            for seccion in candidatas:
+                if seccion not in asignados:
+                    asignados[seccion] = (port, BR)
+                    break
+        nmea = [(port, r) for port, r in self.puertos.items() if r[0] in ('NMEA', 'Batimetria')]
+        for port, (seccion, BR, sentencias, tasa) in nmea:
+            if not sentencias.isdisjoint(POSICION) and 'NMEA' not in asignados:
+                asignados['NMEA'] = (port, BR)
+        for port, (seccion, BR, sentencias, tasa) in nmea:
+            if seccion == 'Batimetria':
+                asignados['Batimetria'] = (port, BR)
+        if 'Batimetria' not in asignados:
+            # La profundidad puede venir por el mismo puerto que el GPS
+            for port, (seccion, BR, sentencias, tasa) in nmea:
+                if not sentencias.isdisjoint(PROFUNDIDAD):
+                    asignados['Batimetria'] = (port, BR)
+                    break
+        return asignados
+
+    def config(self):
+        """Copia de cfg con puerto, velocidad, paridad y estado de cada instrumento detectado."""
+        cfg = copy.deepcopy(self.cfg)
+        nombres = {paridad: nombre for nombre, paridad in PARIDADES.items()}
+        for seccion, (port, BR) in self.asignar().items():
+            cfg['Configuracion'][seccion]['Port'] = port
+            cfg['Configuracion'][seccion]['BR'] = str(BR)
+            if 'Parity' in cfg['Configuracion'][seccion] or self.paridades[port] != serial.PARITY_NONE:
+                cfg['Configuracion'][seccion]['Parity'] = nombres[self.paridades[port]]
+            cfg['Configuracion'][seccion]['Status'] = '2'
+        return cfg
@@ -0,0 +1,448 @@
+"""
+Campaña en SQLite (almacenamiento opcional de StationManager).
+
+La estructura de la campaña (un diccionario con 'Estaciones' -> utils.Estacion())
+se guarda en tablas indexadas por estacion y por hora:
+    - campania: las claves de primer nivel que no son 'Estaciones' (Expedicion, ...)
+    - estaciones: una fila por estacion con el orden de sus claves, las claves
+      que no tienen tabla propia (resto) y la hora de inicio y fin
+    - posiciones: Posicion, FechaHora y Batimetria de cada punto (Inicio, Fin)
+    - muestras: datos de CTD de Cubierta, Fondo y Botellas
+    - superficie: comparaciones TSG vs CTD
+Cada fila guarda su contenido original en JSON (datos) y ademas, en columnas
+propias, los valores que se usan para buscar (presion, scan, latitud, hora,
+deltaT, ...). Exportar arma de nuevo la misma estructura, con el mismo orden de
+claves, asi importar y exportar un JSON de campaña no cambia nada.
+
+Los cambios llegan en el mismo formato que el diario (app.Diario): una lista
+de (ruta, valor). Un dato de CTD, una botella o una fila de superficie es una
+sola fila que se inserta o reemplaza por su clave primaria, en O(log n), sin
+leer el resto de la campaña.
+
+Uso (desde src/App):
+    python -m app.BaseDatos importar VA202406.json VA202406.sqlite
+    python -m app.BaseDatos exportar VA202406.sqlite VA202406.json
+    python -m app.BaseDatos verificar VA202406.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from app.Esquema import canonico
+from app import Fragmentos
+
+EXTENSION = '.sqlite'
+# Secciones de la estacion con una fila por dato
+MUESTRAS = ('Cubierta', 'Fondo', 'Botellas')
+SUPERFICIE = 'Superficie'
+# Secciones de la estacion con un dato por punto (Inicio, Fin)
+PUNTOS = ('Posicion', 'FechaHora', 'Batimetria')
+
+TABLAS = """
+CREATE TABLE IF NOT EXISTS campania (clave TEXT PRIMARY KEY, orden INTEGER, valor TEXT);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT);
+CREATE TABLE IF NOT EXISTS estaciones (
+    nro TEXT PRIMARY KEY, orden INTEGER, claves TEXT, resto TEXT, t_inicio TEXT, t_fin TEXT);
+CREATE INDEX IF NOT EXISTS estaciones_orden ON estaciones (orden);
+CREATE INDEX IF NOT EXISTS estaciones_t ON estaciones (t_inicio);
+CREATE TABLE IF NOT EXISTS posiciones (
+    nro TEXT, punto TEXT, orden INTEGER, latitud REAL, longitud REAL, t TEXT, datos TEXT,
+    PRIMARY KEY (nro, punto));
+CREATE INDEX IF NOT EXISTS posiciones_t ON posiciones (t);
+CREATE TABLE IF NOT EXISTS muestras (
+    nro TEXT, seccion TEXT, clave TEXT, orden INTEGER, scan REAL, presion REAL, datos TEXT,
+    PRIMARY KEY (nro, seccion, clave));
+CREATE INDEX IF NOT EXISTS muestras_orden ON muestras (seccion, nro, orden);
+CREATE INDEX IF NOT EXISTS muestras_presion ON muestras (seccion, presion);
+CREATE TABLE IF NOT EXISTS superficie (
+    nro TEXT, clave TEXT, orden INTEGER, hora TEXT, delta_t REAL, delta_s REAL, datos TEXT,
+    PRIMARY KEY (nro, clave));
+CREATE INDEX IF NOT EXISTS superficie_orden ON superficie (nro, orden);
+CREATE INDEX IF NOT EXISTS superficie_hora ON superficie (hora);
+"""
+
+
+def ruta_base(ruta_json):
+    """Base de un JSON de campaña (VA202406.json -> VA202406.sqlite)."""
+    return os.path.splitext(ruta_json)[0] + EXTENSION
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _instante(fecha_hora):
+    """'YYYY-MM-DD HH:MM:SS' de {'FechaGMT': 'DDMMYY', 'HoraGMT': 'HH:MM:SS'}, o None."""
+    try:
+        fecha, hora = fecha_hora['FechaGMT'], fecha_hora['HoraGMT']
+    except (KeyError, TypeError):
+        return None
+    if not isinstance(fecha, str) or len(fecha) != 6 or not fecha.isdigit() or not isinstance(hora, str):
+        return None
+    return f'20{fecha[4:]}-{fecha[2:4]}-{fecha[:2]} {hora}'
+
+
+def _columna(dato, canon):
+    """Valor numerico de la variable de nombre canonico 'canon' en un dato de CTD."""
+    if not isinstance(dato, dict):
+        return None
+    for clave, valor in dato.items():
+        if canonico(clave)[0] == canon:
+            return _numero(valor)
+    return None
+
+
+def _partir(estacion):
+    """
+    Separa una estacion en (claves, resto, puntos, muestras, superficie). Las
+    secciones que no tienen la forma esperada (no son diccionarios) quedan en
+    el resto tal cual.
+    """
+    claves = list(estacion)
+    resto = dict()
+    grupos = list()
+    muestras = list()
+    superficie = list()
+    for clave, valor in estacion.items():
+        if clave in PUNTOS and isinstance(valor, dict):
+            grupos.append(clave)
+        elif clave in MUESTRAS and isinstance(valor, dict):
+            muestras.extend((clave, k, v) for k, v in valor.items())
+        elif clave == SUPERFICIE and isinstance(valor, dict):
+            superficie.extend(valor.items())
+        else:
+            resto[clave] = valor
+    puntos = dict()
+    for grupo in grupos:
+        for punto, valor in estacion[grupo].items():
+            puntos.setdefault(punto, dict())[grupo] = valor
+    return claves, resto, puntos, muestras, superficie
+
+
+class BaseDatos(object):
+    """
+    Campaña guardada en un archivo SQLite.
+    Los parametros a ingresar son:
+        - ruta: archivo de la base (se crea si no existe)
+    Funciones a utilizar:
+        - importar / exportar: estructura completa de la campaña (como el JSON)
+        - aplicar: cambios [(ruta, valor), ...] en el formato de app.Diario
+        - estacion: una estacion armada como en el JSON
+        - estaciones / muestras / superficie: consultas por hora, seccion o presion
+        - vacia: True si la base todavia no tiene una campaña
+        - close: cierra la base
+    Se puede usar desde varios hilos (cada operacion toma un lock).
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self.con = sqlite3.connect(ruta, check_same_thread=False)
+        # WAL: cada cambio se agrega al final del registro de la base y se asegura en disco al confirmarlo
+        self.con.execute('PRAGMA journal_mode=WAL')
+        self.con.execute('PRAGMA synchronous=FULL')
+        self.con.executescript(TABLAS)
+
+    def close(self):
+        with self._lock:
+            self.con.close()
+
+    def vacia(self):
+        with self._lock:
+            return self.con.execute('SELECT COUNT(*) FROM campania').fetchone()[0] == 0
+
+    def meta(self, clave, valor=None):
+        """Lee (o guarda, si se indica valor) un dato propio de la base."""
+        with self._lock:
+            if valor is None:
+                fila = self.con.execute('SELECT valor FROM meta WHERE clave = ?', (clave,)).fetchone()
+                return None if fila is None else json.loads(fila[0])
+            with self.con:
+                self.con.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (clave, json.dumps(valor)))
+
+    ############################################################################
+    # Escritura
+    ############################################################################
+    def importar(self, estructura):
+        """Reemplaza todo el contenido de la base por 'estructura'."""
+        with self._lock, self.con:
+            for tabla in ('campania', 'estaciones', 'posiciones', 'muestras', 'superficie'):
+                self.con.execute(f'DELETE FROM {tabla}')
+            for orden, (clave, valor) in enumerate(estructura.items()):
+                # 'Estaciones' solo marca su lugar entre las claves de primer nivel
+                self.con.execute('INSERT INTO campania VALUES (?, ?, ?)',
+                                 (clave, orden, None if clave == 'Estaciones' else json.dumps(valor)))
+            for orden, (nro, estacion) in enumerate(estructura.get('Estaciones', {}).items()):
+                self._escribir_estacion(nro, estacion, orden)
+
+    def _escribir_estacion(self, nro, estacion, orden):
+        for tabla in ('posiciones', 'muestras', 'superficie'):
+            self.con.execute(f'DELETE FROM {tabla} WHERE nro = ?', (nro,))
+        if not isinstance(estacion, dict):
+            # Una estacion que no es un diccionario se guarda entera como resto
+            self.con.execute('INSERT OR REPLACE INTO estaciones VALUES (?, ?, NULL, ?, NULL, NULL)',
+                             (nro, orden, json.dumps(estacion)))
+            return
+        claves, resto, puntos, muestras, superficie = _partir(estacion)
+        fecha_hora = estacion.get('FechaHora') if isinstance(estacion.get('FechaHora'), dict) else {}
+        self.con.execute('INSERT OR REPLACE INTO estaciones VALUES (?, ?, ?, ?, ?, ?)',
+                         (nro, orden, json.dumps(claves), json.dumps(resto),
+                          _instante(fecha_hora.get('Inicio')), _instante(fecha_hora.get('Fin'))))
+        for i, (punto, datos) in enumerate(puntos.items()):
+            self._escribir_punto(nro, punto, i, datos)
+        for i, (seccion, clave, dato) in enumerate(muestras):
+            self._escribir_muestra(nro, seccion, clave, i, dato)
+        for i, (clave, registro) in enumerate(superficie):
+            self._escribir_superficie(nro, clave, i, registro)
+
+    def _escribir_punto(self, nro, punto, orden, datos):
+        posicion = datos.get('Posicion') if isinstance(datos.get('Posicion'), dict) else {}
+        self.con.execute('INSERT OR REPLACE INTO posiciones VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (nro, punto, orden, _numero(posicion.get('Latitud')), _numero(posicion.get('Longitud')),
+                          _instante(datos.get('FechaHora')), json.dumps(datos)))
+
+    def _escribir_muestra(self, nro, seccion, clave, orden, dato):
+        self.con.execute('INSERT OR REPLACE INTO muestras VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (nro, seccion, str(clave), orden, _columna(dato, 'scan'), _columna(dato, 'press'),
+                          json.dumps(dato)))
+
+    def _escribir_superficie(self, nro, clave, orden, registro):
+        datos = registro if isinstance(registro, dict) else {}
+        hora = datos.get('Hora')
+        self.con.execute('INSERT OR REPLACE INTO superficie VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (nro, str(clave), orden, hora if isinstance(hora, str) else None,
+                          _numero(datos.get('deltaT')), _numero(datos.get('deltaS')), json.dumps(registro)))
+
+    def _orden(self, tabla, donde, parametros):
+        """Orden de una fila nueva: uno mas que la ultima de su grupo (por el indice, O(log n))."""
+        fila = self.con.execute(f'SELECT MAX(orden) FROM {tabla} WHERE {donde}', parametros).fetchone()
+        return 0 if fila[0] is None else fila[0] + 1
+
+    def _orden_de(self, tabla, donde, parametros, nuevo):
+        """Orden que ya tiene la fila (se conserva al reemplazarla) o el de una fila nueva."""
+        fila = self.con.execute(f'SELECT orden FROM {tabla} WHERE {donde}', parametros).fetchone()
+        return fila[0] if fila is not None else nuevo()
+
+    def _fila_estacion(self, nro):
+        fila = self.con.execute('SELECT claves, resto FROM estaciones WHERE nro = ?', (nro,)).fetchone()
+        if fila is None or fila[0] is None:
+            return None
+        return json.loads(fila[0]), json.loads(fila[1])
+
+    def aplicar(self, cambios):
+        """Aplica los cambios [(ruta, valor), ...] de un registro, en una sola transaccion."""
+        with self._lock, self.con:
+            for ruta, valor in cambios:
+                ruta = tuple(ruta)
+                if ruta[0] != 'Estaciones':
+                    self._cambiar_campania(ruta, valor)
+                elif len(ruta) == 1:
+                    # Todas las estaciones
+                    self.con.execute('DELETE FROM estaciones')
+                    for tabla in ('posiciones', 'muestras', 'superficie'):
+                        self.con.execute(f'DELETE FROM {tabla}')
+                    for orden, (nro, estacion) in enumerate(valor.items()):
+                        self._escribir_estacion(nro, estacion, orden)
+                else:
+                    self._cambiar_estacion(ruta[1], ruta[2:], valor)
+
+    def _cambiar_campania(self, ruta, valor):
+        fila = self.con.execute('SELECT valor FROM campania WHERE clave = ?', (ruta[0],)).fetchone()
+        if len(ruta) > 1:
+            actual = json.loads(fila[0]) if fila is not None and fila[0] is not None else dict()
+            destino = actual
+            for clave in ruta[1:-1]:
+                destino = destino.setdefault(clave, dict())
+            destino[ruta[-1]] = valor
+            valor = actual
+        orden = self._orden_de('campania', 'clave = ?', (ruta[0],), lambda: self._orden('campania', '1', ()))
+        self.con.execute('INSERT OR REPLACE INTO campania VALUES (?, ?, ?)', (ruta[0], orden, json.dumps(valor)))
+
+    def _cambiar_estacion(self, nro, ruta, valor):
+        orden = self._orden_de('estaciones', 'nro = ?', (nro,), lambda: self._orden('estaciones', '1', ()))
+        if not ruta:
+            self._escribir_estacion(nro, valor, orden)
+            return
+        fila = self._fila_estacion(nro)
+        if fila is not None and len(ruta) == 2 and ruta[0] in fila[0] and ruta[0] not in fila[1]:
+            # La seccion tiene tabla propia: solo se inserta o reemplaza una fila
+            seccion, clave = ruta
+            if seccion in MUESTRAS:
+                orden_fila = self._orden_de('muestras', 'nro = ? AND seccion = ? AND clave = ?', (nro, seccion, str(clave)),
+                                            lambda: self._orden('muestras', 'seccion = ? AND nro = ?', (seccion, nro)))
+                self._escribir_muestra(nro, seccion, clave, orden_fila, valor)
+                return
+            if seccion == SUPERFICIE:
+                orden_fila = self._orden_de('superficie', 'nro = ? AND clave = ?', (nro, clave),
+                                            lambda: self._orden('superficie', 'nro = ?', (nro,)))
+                self._escribir_superficie(nro, clave, orden_fila, valor)
+                return
+            if seccion in PUNTOS:
+                actual = self.con.execute('SELECT orden, datos FROM posiciones WHERE nro = ? AND punto = ?',
+                                          (nro, clave)).fetchone()
+                if actual is None:
+                    datos = dict()
+                    orden_fila = self._orden('posiciones', 'nro = ?', (nro,))
+                else:
+                    orden_fila, datos = actual[0], json.loads(actual[1])
+                datos[seccion] = valor
+                self._escribir_punto(nro, clave, orden_fila, datos)
+                if seccion == 'FechaHora' and clave in ('Inicio', 'Fin'):
+                    self.con.execute(f"UPDATE estaciones SET t_{clave.lower()} = ? WHERE nro = ?",
+                                     (_instante(valor), nro))
+                return
+        if fila is not None and len(ruta) == 1 and ruta[0] not in PUNTOS + MUESTRAS + (SUPERFICIE,):
+            # Una clave del resto (Skipover, Comentarios, ...)
+            claves, resto = fila
+            if ruta[0] not in claves:
+                claves.append(ruta[0])
+            resto[ruta[0]] = valor
+            self.con.execute('UPDATE estaciones SET claves = ?, resto = ? WHERE nro = ?',
+                             (json.dumps(claves), json.dumps(resto), nro))
+            return
+        # Cualquier otro cambio: se arma la estacion, se cambia y se vuelve a escribir
+        estacion = self._estacion(nro)
+        if estacion is None:
+            estacion = dict()
+        destino = estacion
+        for clave in ruta[:-1]:
+            destino = destino.setdefault(clave, dict())
+        destino[ruta[-1]] = valor
+        self._escribir_estacion(nro, estacion, orden)
+
+    ############################################################################
+    # Lectura
+    ############################################################################
+    def _armar(self, claves, resto, puntos, muestras, superficie):
+        """Estacion a partir de sus filas (cada lista ya ordenada por 'orden')."""
+        estacion = dict()
+        for clave in claves:
+            if clave in resto:
+                estacion[clave] = resto[clave]
+            elif clave in PUNTOS:
+                estacion[clave] = {punto: datos[clave] for punto, datos in puntos if clave in datos}
+            elif clave in MUESTRAS:
+                estacion[clave] = {k: dato for seccion, k, dato in muestras if seccion == clave}
+            elif clave == SUPERFICIE:
+                estacion[clave] = dict(superficie)
+        return estacion
+
+    def _estacion(self, nro):
+        fila = self.con.execute('SELECT claves, resto FROM estaciones WHERE nro = ?', (nro,)).fetchone()
+        if fila is None:
+            return None
+        if fila[0] is None:
+            return json.loads(fila[1])
+        puntos = [(p, json.loads(d)) for p, d in self.con.execute(
+            'SELECT punto, datos FROM posiciones WHERE nro = ? ORDER BY orden', (nro,))]
+        muestras = [(s, k, json.loads(d)) for s, k, d in self.con.execute(
+            'SELECT seccion, clave, datos FROM muestras WHERE nro = ? ORDER BY orden', (nro,))]
+        superficie = [(k, json.loads(d)) for k, d in self.con.execute(
+            'SELECT clave, datos FROM superficie WHERE nro = ? ORDER BY orden', (nro,))]
+        return self._armar(json.loads(fila[0]), json.loads(fila[1]), puntos, muestras, superficie)
+
+    def estacion(self, nro):
+        """Una estacion como en el JSON, o None si no existe."""
+        with self._lock:
+            return self._estacion(nro)
+
+    def exportar(self):
+        """Estructura completa de la campaña, igual al JSON importado con los cambios aplicados."""
+        with self._lock:
+            puntos, muestras, superficie = dict(), dict(), dict()
+            for nro, p, d in self.con.execute('SELECT nro, punto, datos FROM posiciones ORDER BY nro, orden'):
+                puntos.setdefault(nro, list()).append((p, json.loads(d)))
+            for nro, s, k, d in self.con.execute('SELECT nro, seccion, clave, datos FROM muestras ORDER BY nro, orden'):
+                muestras.setdefault(nro, list()).append((s, k, json.loads(d)))
+            for nro, k, d in self.con.execute('SELECT nro, clave, datos FROM superficie ORDER BY nro, orden'):
+                superficie.setdefault(nro, list()).append((k, json.loads(d)))
+            estaciones = dict()
+            for nro, claves, resto in self.con.execute('SELECT nro, claves, resto FROM estaciones ORDER BY orden'):
+                if claves is None:
+                    estaciones[nro] = json.loads(resto)
+                    continue
+                estaciones[nro] = self._armar(json.loads(claves), json.loads(resto), puntos.get(nro, ()),
+                                              muestras.get(nro, ()), superficie.get(nro, ()))
+            estructura = dict()
+            for clave, valor in self.con.execute('SELECT clave, valor FROM campania ORDER BY orden'):
+                estructura[clave] = estaciones if clave == 'Estaciones' else json.loads(valor)
+            if 'Estaciones' not in estructura and estaciones:
+                estructura['Estaciones'] = estaciones
+            return estructura
+
+    def estaciones(self, desde=None, hasta=None):
+        """Numeros de las estaciones que empezaron entre 'desde' y 'hasta' ('YYYY-MM-DD HH:MM:SS')."""
+        with self._lock:
+            return [nro for nro, in self.con.execute(
+                'SELECT nro FROM estaciones WHERE t_inicio >= ? AND t_inicio <= ? ORDER BY t_inicio',
+                (desde or '', hasta or '9999'))]
+
+    def muestras(self, seccion, nro=None, presion_min=None, presion_max=None):
+        """(nro, clave, dato) de una seccion (Cubierta, Fondo, Botellas) de todas las estaciones o de una."""
+        consulta = 'SELECT nro, clave, datos FROM muestras WHERE seccion = ?'
+        parametros = [seccion]
+        if nro is not None:
+            consulta += ' AND nro = ?'
+            parametros.append(nro)
+        if presion_min is not None:
+            consulta += ' AND presion >= ?'
+            parametros.append(presion_min)
+        if presion_max is not None:
+            consulta += ' AND presion <= ?'
+            parametros.append(presion_max)
+        with self._lock:
+            return [(n, k, json.loads(d)) for n, k, d in self.con.execute(consulta + ' ORDER BY nro, orden', parametros)]
+
+    def superficie(self, nro=None):
+        """(nro, clave, registro) de las comparaciones TSG vs CTD de todas las estaciones o de una."""
+        consulta = 'SELECT nro, clave, datos FROM superficie'
+        parametros = ()
+        if nro is not None:
+            consulta += ' WHERE nro = ?'
+            parametros = (nro,)
+        with self._lock:
+            return [(n, k, json.loads(d)) for n, k, d in self.con.execute(consulta + ' ORDER BY nro, orden', parametros)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    sub = parser.add_subparsers(dest='orden', required=True)
+    importar = sub.add_parser('importar', help='crea la base a partir del JSON de la campaña')
+    importar.add_argument('json')
+    importar.add_argument('base', nargs='?')
+    exportar = sub.add_parser('exportar', help='escribe el JSON de la campaña a partir de la base')
+    exportar.add_argument('base')
+    exportar.add_argument('json')
+    verificar = sub.add_parser('verificar', help='importa y exporta en memoria y compara con el JSON')
+    verificar.add_argument('json')
+    args = parser.parse_args(argv)
+
+    if args.orden == 'importar':
+        estructura = Fragmentos.leer(args.json)
+        base = BaseDatos(args.base or ruta_base(args.json))
+        base.importar(estructura)
+        print(f"{len(estructura.get('Estaciones', {}))} estaciones importadas en {base.ruta}")
+        base.close()
+    elif args.orden == 'exportar':
+        base = BaseDatos(args.base)
+        with open(args.json, 'w') as archivo:
+            json.dump(base.exportar(), archivo, indent=4)
+        base.close()
+    else:
+        estructura = Fragmentos.leer(args.json)
+        base = BaseDatos(':memory:')
+        base.importar(estructura)
+        exportado = base.exportar()
+        iguales = json.dumps(exportado, indent=4) == json.dumps(estructura, indent=4)
+        print(f"{args.json}: {'sin cambios' if iguales else 'DISTINTO'} al importar y exportar")
+        sys.exit(0 if iguales else 1)
+
+
+if __name__ == '__main__':
+    main()
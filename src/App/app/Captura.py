@@ -0,0 +1,218 @@
+"""
+Captura de los bytes crudos de los puertos serie.
+
+Cada bloque leido de un puerto se agrega, tal cual llego, a un archivo binario
+de solo escritura al final junto con el puerto, el instante monotonic y la hora
+de la PC. Los archivos rotan por tamaño o por tiempo y los que se cierran se
+comprimen con gzip en un hilo aparte, para no demorar la lectura. En el mismo
+hilo se borran las capturas mas viejas: se conservan a lo sumo 'copias'
+archivos cerrados y, si se indica, solo los de los ultimos 'max_dias' dias.
+
+Formato de archivo:
+    MAGIA (8 bytes) y luego registros REGISTRO + contenido:
+        - tipo PUERTO: el contenido es el nombre del puerto (utf-8) con su id
+        - tipo DATOS: el contenido son los bytes leidos del puerto con ese id
+Al abrir cada archivo se repite la tabla de puertos, asi cada archivo se puede
+leer por separado.
+"""
+import datetime
+import gzip
+import logging
+import os
+import queue
+import shutil
+import struct
+import threading
+import time
+
+MAGIA = b'SIPOCAP\x01'
+# tipo, id de puerto, monotonic, hora de la PC (time.time), largo del contenido
+REGISTRO = struct.Struct('<BHddI')
+PUERTO = 0
+DATOS = 1
+EXTENSION = '.cap'
+
+
+class Grabador(object):
+    """
+    Graba los bytes que llegan a los puertos serie en archivos rotativos.
+    Los parametros a ingresar son:
+        - directorio: carpeta donde se guardan las capturas
+        - prefijo: comienzo del nombre de cada archivo
+        - max_bytes: tamaño a partir del cual se rota el archivo (32 MB por defecto)
+        - max_segundos: tiempo a partir del cual se rota el archivo (1 hora por defecto)
+        - comprimir: comprime con gzip los archivos que se cierran
+        - copias: archivos cerrados que se conservan en el directorio (48 por
+          defecto, None para no borrar ninguno)
+        - max_dias: antiguedad maxima de los archivos cerrados (None por defecto)
+    Funciones a utilizar:
+        - capturador: funcion que graba los bloques de un puerto (se asigna a LineFramer.captura)
+        - escribir: graba un bloque de un puerto
+        - close: cierra el archivo actual y espera que termine la compresion
+    """
+
+    def __init__(self, directorio, prefijo='captura', max_bytes=32 * 2 ** 20, max_segundos=3600, comprimir=True,
+                 copias=48, max_dias=None):
+        self.directorio = directorio
+        self.prefijo = prefijo
+        self.max_bytes = max_bytes
+        self.max_segundos = max_segundos
+        self.comprimir = comprimir
+        self.copias = copias
+        self.max_dias = max_dias
+        self.borrados = 0
+        self.puertos = dict()
+        # Estadisticas
+        self.bloques = 0
+        self.bytes = 0
+        self.archivos = list()
+        self._lock = threading.Lock()
+        self._archivo = None
+        self._tamaño = 0
+        self._apertura = 0.0
+        self._numero = 0
+        self._cola = queue.Queue()
+        self._compresor = threading.Thread(target=self._comprimir, name='Captura', daemon=True)
+        if not os.path.exists(directorio):
+            os.makedirs(directorio)
+        self._compresor.start()
+        with self._lock:
+            self._abrir()
+
+    @property
+    def ruta(self):
+        """Archivo en el que se esta grabando."""
+        return self._archivo.name if self._archivo is not None else None
+
+    def capturador(self, port):
+        """Regresa la funcion que graba los bloques recibidos por 'port'."""
+        with self._lock:
+            if port not in self.puertos:
+                self.puertos[port] = len(self.puertos)
+                if self._archivo is not None:
+                    self._registro(PUERTO, self.puertos[port], port.encode('utf-8'))
+        id_puerto = self.puertos[port]
+        return lambda data: self.escribir(id_puerto, data)
+
+    def escribir(self, id_puerto, data):
+        t_mono = time.monotonic()
+        t = time.time()
+        with self._lock:
+            if self._archivo is None:
+                # Ya cerrado: un worker que todavia no termino
+                return
+            self._archivo.write(REGISTRO.pack(DATOS, id_puerto, t_mono, t, len(data)))
+            self._archivo.write(data)
+            self._tamaño += REGISTRO.size + len(data)
+            self.bloques += 1
+            self.bytes += len(data)
+            if self._tamaño >= self.max_bytes or t_mono - self._apertura >= self.max_segundos:
+                self._cerrar()
+                self._abrir()
+
+    def close(self):
+        with self._lock:
+            if self._archivo is not None:
+                self._cerrar()
+        self._cola.put(None)
+        self._compresor.join()
+
+    def _registro(self, tipo, id_puerto, contenido):
+        self._archivo.write(REGISTRO.pack(tipo, id_puerto, time.monotonic(), time.time(), len(contenido)))
+        self._archivo.write(contenido)
+        self._tamaño += REGISTRO.size + len(contenido)
+
+    def _abrir(self):
+        self._numero += 1
+        nombre = f"{self.prefijo}_{datetime.datetime.now():%Y%m%d_%H%M%S}_{self._numero:04d}{EXTENSION}"
+        self._archivo = open(os.path.join(self.directorio, nombre), 'ab')
+        self._archivo.write(MAGIA)
+        self._tamaño = len(MAGIA)
+        self._apertura = time.monotonic()
+        for port, id_puerto in self.puertos.items():
+            self._registro(PUERTO, id_puerto, port.encode('utf-8'))
+
+    def _cerrar(self):
+        ruta = self._archivo.name
+        self._archivo.close()
+        self._archivo = None
+        self.archivos.append(ruta)
+        self._cola.put(ruta)
+
+    def _comprimir(self):
+        while True:
+            ruta = self._cola.get()
+            if ruta is None:
+                return
+            if self.comprimir:
+                self._gzip(ruta)
+            self._depurar()
+
+    def _gzip(self, ruta):
+        if not os.path.exists(ruta):
+            # Ya borrado por _depurar
+            return
+        try:
+            with open(ruta, 'rb') as origen, gzip.open(ruta + '.gz.tmp', 'wb', compresslevel=6) as destino:
+                shutil.copyfileobj(origen, destino)
+            os.replace(ruta + '.gz.tmp', ruta + '.gz')
+            os.remove(ruta)
+            self.archivos[self.archivos.index(ruta)] = ruta + '.gz'
+        except (OSError, ValueError) as e:
+            logging.error(f'No se pudo comprimir la captura {ruta}: {e}')
+
+    def _depurar(self):
+        """Borra las capturas cerradas que exceden 'copias' o 'max_dias' (las mas viejas primero)."""
+        if self.copias is None and self.max_dias is None:
+            return
+        with self._lock:
+            actual = self.ruta
+        cerrados = list()
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if nombre.startswith(self.prefijo + '_') and nombre.endswith((EXTENSION, EXTENSION + '.gz')) \
+                    and ruta != actual:
+                try:
+                    # El nombre lleva la fecha de apertura y el numero: ordena de la mas nueva a la mas vieja
+                    cerrados.append((nombre.replace('.gz', ''), os.path.getmtime(ruta), ruta))
+                except OSError:
+                    pass
+        cerrados.sort(reverse=True)
+        limite = time.time() - self.max_dias * 86400 if self.max_dias is not None else None
+        for i, (_, modificado, ruta) in enumerate(cerrados):
+            if (self.copias is None or i < self.copias) and (limite is None or modificado >= limite):
+                continue
+            try:
+                os.remove(ruta)
+            except OSError as e:
+                logging.error(f'No se pudo borrar la captura {ruta}: {e}')
+                continue
+            self.borrados += 1
+            with self._lock:
+                if ruta in self.archivos:
+                    self.archivos.remove(ruta)
+
+
+def leer(ruta):
+    """
+    Recorre un archivo de captura (comprimido o no) y regresa, por cada bloque,
+    (puerto, monotonic, hora de la PC, bytes). Un registro final incompleto
+    (corte de energia) se ignora.
+    """
+    abrir = gzip.open if ruta.endswith('.gz') else open
+    puertos = dict()
+    with abrir(ruta, 'rb') as archivo:
+        if archivo.read(len(MAGIA)) != MAGIA:
+            raise ValueError(f'{ruta} no es un archivo de captura')
+        while True:
+            cabecera = archivo.read(REGISTRO.size)
+            if len(cabecera) < REGISTRO.size:
+                return
+            tipo, id_puerto, t_mono, t, largo = REGISTRO.unpack(cabecera)
+            contenido = archivo.read(largo)
+            if len(contenido) < largo:
+                return
+            if tipo == PUERTO:
+                puertos[id_puerto] = contenido.decode('utf-8')
+            elif tipo == DATOS:
+                yield puertos.get(id_puerto, str(id_puerto)), t_mono, t, contenido
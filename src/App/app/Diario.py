@@ -0,0 +1,185 @@
+"""
+Diario de la campaña (JSON Lines, solo escritura al final).
+
+En lugar de reescribir todo el JSON de la campaña en cada evento (Cubierta,
+Superficie, Fondo, botella, skipover, comentario) cada evento agrega al diario
+un registro chico con los cambios que hizo, y se asegura en disco (fsync)
+antes de seguir. El costo de un evento no depende del tamaño de la campaña.
+
+Cada 'cada' registros, al terminar una estacion y al cerrar, el diario se
+compacta: el tramo de registros actual pasa al archivo del tramo anterior
+(cerrar_tramo), la estructura completa se escribe en el JSON de la campaña en
+segundo plano (app.Escritor) y, una vez escrita, el tramo anterior se borra
+(tramo_guardado). Los registros que llegan mientras tanto van a un tramo nuevo.
+Si el programa se corta, al volver a abrir la campaña los registros que
+quedaron en los dos tramos se aplican sobre el JSON (cargar / recuperar).
+Aplicar un registro dos veces da el mismo resultado, asi un corte entre el
+reemplazo del JSON y el borrado del tramo no pierde ni duplica nada.
+
+Formato de cada linea:
+    {"n": numero de registro, "t": hora de la PC, "cambios": [[ruta, valor], ...]}
+donde ruta es la lista de claves desde la raiz de la estructura
+(["Estaciones", "0001", "Botellas", "3"]) y valor lo que se guarda ahi.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from app import Fragmentos
+
+EXTENSION = '.diario.jsonl'
+# Tramo ya compactado cuyo JSON todavia no termino de escribirse
+ANTERIOR = '.diario.anterior.jsonl'
+
+
+def ruta_diario(ruta_json):
+    """Archivo del diario de un JSON de campaña (VA202406.json -> VA202406.diario.jsonl)."""
+    return os.path.splitext(ruta_json)[0] + EXTENSION
+
+
+def ruta_anterior(ruta_json):
+    return os.path.splitext(ruta_json)[0] + ANTERIOR
+
+
+def aplicar(estructura, cambios):
+    """Aplica sobre 'estructura' los cambios [(ruta, valor), ...] de un registro."""
+    for ruta, valor in cambios:
+        destino = estructura
+        for clave in ruta[:-1]:
+            destino = destino.setdefault(clave, dict())
+        destino[ruta[-1]] = valor
+
+
+def leer(ruta):
+    """
+    Regresa los registros del diario en orden. Una ultima linea incompleta (el
+    programa se corto mientras la escribia) se ignora.
+    """
+    registros = list()
+    try:
+        archivo = open(ruta, 'rb')
+    except FileNotFoundError:
+        return registros
+    with archivo:
+        for i, linea in enumerate(archivo, 1):
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                logging.warning(f'Diario {ruta}: linea {i} incompleta, se ignora el resto')
+                break
+    return registros
+
+
+def recuperar(ruta_json, estructura):
+    """Aplica a 'estructura' los registros pendientes del diario. Regresa cuantos aplico."""
+    registros = leer(ruta_anterior(ruta_json)) + leer(ruta_diario(ruta_json))
+    for registro in registros:
+        aplicar(estructura, registro['cambios'])
+    if registros:
+        logging.info(f'Diario: {len(registros)} registros recuperados sobre {ruta_json}')
+    return len(registros)
+
+
+def cargar(ruta_json):
+    """
+    Estructura de la campaña: el JSON (o sus estaciones, app.Fragmentos) con los
+    registros pendientes del diario aplicados.
+    """
+    estructura = Fragmentos.leer(ruta_json)
+    recuperar(ruta_json, estructura)
+    return estructura
+
+
+class Diario(object):
+    """
+    Diario de un JSON de campaña.
+    Los parametros a ingresar son:
+        - ruta_json: JSON de la campaña
+        - cada: registros a partir de los cuales conviene compactar
+    Funciones a utilizar:
+        - registrar: agrega un registro con sus cambios (y lo asegura en disco)
+        - pendiente: True si ya hay 'cada' registros sin compactar
+        - cerrar_tramo / tramo_guardado: compactacion (ver el comienzo del modulo)
+        - close: cierra el archivo del diario
+    """
+
+    def __init__(self, ruta_json, cada=200):
+        self.ruta_json = ruta_json
+        self.ruta = ruta_diario(ruta_json)
+        self.anterior = ruta_anterior(ruta_json)
+        self.cada = cada
+        # Numero del ultimo tramo cerrado (tramo_guardado solo borra si no se cerro otro)
+        self.tramo = 0
+        self._lock = threading.Lock()
+        self._reparar()
+        registros = leer(self.ruta)
+        # Registros en el diario desde la ultima compactacion y numero del ultimo
+        self.registros = len(registros)
+        self.n = registros[-1]['n'] if registros else 0
+        self._archivo = None
+
+    def _reparar(self):
+        """Corta una ultima linea incompleta, asi el proximo registro empieza en una linea nueva."""
+        for ruta in (self.anterior, self.ruta):
+            try:
+                with open(ruta, 'rb+') as archivo:
+                    datos = archivo.read()
+                    if datos and not datos.endswith(b'\n'):
+                        archivo.truncate(datos.rfind(b'\n') + 1)
+                        logging.warning(f'Diario {ruta}: se descarto un registro incompleto')
+            except FileNotFoundError:
+                pass
+
+    def _abrir(self):
+        if self._archivo is None:
+            self._archivo = open(self.ruta, 'ab')
+        return self._archivo
+
+    def registrar(self, cambios):
+        """Agrega un registro con los cambios [(ruta, valor), ...]."""
+        self.n += 1
+        linea = json.dumps({'n': self.n, 't': time.time(), 'cambios': [[list(ruta), valor] for ruta, valor in cambios]})
+        archivo = self._abrir()
+        archivo.write(linea.encode() + b'\n')
+        archivo.flush()
+        os.fsync(archivo.fileno())
+        self.registros += 1
+
+    @property
+    def pendiente(self):
+        return self.registros >= self.cada
+
+    def cerrar_tramo(self):
+        """
+        Pasa los registros actuales al tramo anterior y empieza un tramo vacio.
+        Regresa el numero de tramo, para tramo_guardado cuando el JSON con todos
+        esos cambios este escrito.
+        """
+        with self._lock:
+            self.close()
+            if os.path.exists(self.ruta):
+                if os.path.exists(self.anterior):
+                    # El JSON del tramo anterior todavia no se escribio: se juntan
+                    with open(self.ruta, 'rb') as origen, open(self.anterior, 'ab') as destino:
+                        destino.write(origen.read())
+                        destino.flush()
+                        os.fsync(destino.fileno())
+                    os.remove(self.ruta)
+                else:
+                    os.replace(self.ruta, self.anterior)
+            self.registros = 0
+            self.tramo += 1
+            return self.tramo
+
+    def tramo_guardado(self, tramo):
+        """El JSON con los cambios hasta 'tramo' ya esta en disco: se borra el tramo anterior."""
+        with self._lock:
+            if tramo == self.tramo and os.path.exists(self.anterior):
+                os.remove(self.anterior)
+
+    def close(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
@@ -0,0 +1,158 @@
+"""
+Escritura del JSON de la campaña en segundo plano.
+
+La ventana no escribe el archivo: le pasa al Escritor una copia de lo que hay
+que guardar y sigue. Un hilo propio espera 'retardo' segundos sin pedidos
+nuevos (a lo sumo 'maximo' desde el primero) y escribe solo el ultimo pedido,
+asi varios guardados seguidos se juntan en una escritura. Cada escritura va a
+un archivo temporal, se asegura en disco (fsync) y reemplaza al anterior con
+os.replace: un corte a mitad de camino deja el archivo viejo entero, nunca uno
+truncado. Un disco lento (USB, red) demora al hilo, no a la ventana.
+
+Los pedidos de archivos distintos se escriben juntos, en el orden del ultimo
+pedido de cada uno (la campaña por estaciones pide cada estacion y despues el
+manifiesto, que asi siempre se escribe al final). Las funciones 'despues' se
+llaman cuando todos los archivos del grupo quedaron escritos.
+"""
+import logging
+import os
+import threading
+
+from app.Framer import Timeout
+from app.Metricas import METRICAS
+from app import Serializador
+
+
+def escribir_json(ruta, datos, formato='json'):
+    """
+    Escribe 'datos' en 'ruta', en un formato de app.Serializador, sin dejar
+    nunca un archivo a medio escribir. Regresa los bytes escritos.
+    """
+    temporal = f'{ruta}.tmp'
+    with open(temporal, 'wb') as archivo:
+        Serializador.escribir(archivo, datos, formato)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+        tamaño = archivo.tell()
+    os.replace(temporal, ruta)
+    try:
+        # El reemplazo tambien tiene que llegar al disco (en Windows no se puede abrir un directorio)
+        directorio = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    except OSError:
+        return tamaño
+    try:
+        os.fsync(directorio)
+    except OSError:
+        pass
+    finally:
+        os.close(directorio)
+    return tamaño
+
+
+class Escritor(object):
+    """
+    Hilo que escribe archivos JSON juntando pedidos seguidos.
+    Los parametros a ingresar son:
+        - retardo: segundos sin pedidos nuevos antes de escribir
+        - maximo: segundos como maximo entre el primer pedido y la escritura
+        - formato: formato de los archivos (app.Serializador)
+    Funciones a utilizar:
+        - guardar: pide escribir 'datos' en 'ruta'; 'despues' se llama luego de escribir
+          todo lo pendiente
+        - flush: espera a que se escriba lo pendiente
+        - close: escribe lo pendiente y termina el hilo
+    Contadores (app.Metricas): lineas (escrituras), bytes y errores; el tiempo
+    de cada escritura se observa en el histograma 'escritura'.
+    """
+
+    def __init__(self, retardo=0.5, maximo=5.0, formato='json'):
+        self.retardo = retardo
+        self.maximo = maximo
+        self.formato = formato
+        self.pedidos = 0
+        self.lineas = 0
+        self.bytes = 0
+        self.errores = 0
+        # Ultimo pedido sin escribir de cada archivo: ruta -> (datos, despues)
+        self._pendientes = dict()
+        self._primero = None
+        self._ultimo = None
+        self._escribiendo = False
+        self._vaciar = False
+        self._cerrar = False
+        self._cond = threading.Condition()
+        self._hilo = threading.Thread(target=self._trabajar, name='Escritor', daemon=True)
+        self._hilo.start()
+
+    def guardar(self, ruta, datos, despues=None):
+        """'datos' no se debe modificar despues de pedir la escritura (pasar una copia)."""
+        with self._cond:
+            if self._cerrar:
+                raise RuntimeError('Escritor cerrado')
+            ahora = Timeout.TIME()
+            if not self._pendientes:
+                self._primero = ahora
+            # Un pedido nuevo de un archivo reemplaza al anterior y pasa al final
+            anterior = self._pendientes.pop(ruta, None)
+            if anterior is not None and anterior[1] is not None and despues is None:
+                despues = anterior[1]
+            self._pendientes[ruta] = (datos, despues)
+            self._ultimo = ahora
+            self.pedidos += 1
+            self._cond.notify_all()
+
+    def _esperar_vacio(self):
+        self._vaciar = True
+        self._cond.notify_all()
+        while self._pendientes or self._escribiendo:
+            self._cond.wait()
+        self._vaciar = False
+
+    def flush(self):
+        with self._cond:
+            self._esperar_vacio()
+
+    def close(self):
+        with self._cond:
+            self._esperar_vacio()
+            self._cerrar = True
+            self._cond.notify_all()
+        self._hilo.join()
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                while not self._pendientes and not self._cerrar:
+                    self._cond.wait()
+                if not self._pendientes:
+                    return
+                while not self._vaciar and not self._cerrar:
+                    espera = min(self._ultimo + self.retardo, self._primero + self.maximo) - Timeout.TIME()
+                    if espera <= 0:
+                        break
+                    self._cond.wait(espera)
+                pendientes = self._pendientes
+                self._pendientes = dict()
+                self._escribiendo = True
+            inicio = Timeout.TIME()
+            completo = True
+            for ruta, (datos, _) in pendientes.items():
+                try:
+                    self.bytes += escribir_json(ruta, datos, self.formato)
+                    self.lineas += 1
+                except Exception as e:
+                    self.errores += 1
+                    completo = False
+                    logging.error(f'No se pudo escribir {ruta}: {e}')
+            METRICAS.observar('escritura', Timeout.TIME() - inicio)
+            # Si algun archivo no se pudo escribir, nada se da por guardado
+            for ruta, (_, despues) in pendientes.items():
+                if completo and despues is not None:
+                    try:
+                        despues()
+                    except Exception as e:
+                        self.errores += 1
+                        logging.error(f'Error luego de escribir {ruta}: {e}')
+            with self._cond:
+                self._escribiendo = False
+                self._cond.notify_all()
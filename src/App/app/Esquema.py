@@ -0,0 +1,239 @@
+"""
+Esquema de columnas de los instrumentos con salida ASCII de Sea-Bird (CTD y TSG).
+
+Cada fila de 'filas' en config.json describe una columna: la primera palabra es
+el nombre de la variable (el que se guarda en el JSON) y el resto, si lo hay,
+las unidades ("Temp [ITS-90, deg C]"). Al compilar el esquema se resuelve una
+sola vez, para cada columna, el nombre canonico (scan, press, temp, cond, sal,
+bot, lat, lon, temp38, ...), el indice, el tipo y las unidades. Los workers, el
+motor, el almacen y StationManager buscan las columnas por nombre canonico en
+lugar de comparar textos en cada estacion.
+
+Cuando se juntan muchas lineas (la ventana se demoro o se reproduce una
+captura) se decodifican en lote: la cantidad de columnas de cada fila se
+valida sobre todas las lineas unidas en un solo arreglo de bytes y las filas
+validas se convierten con una sola llamada de numpy.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from app.Muestras import Muestra, BUENA, DUDOSA
+
+# Desde cuantas lineas juntas conviene decodificar en lote
+LOTE = 32
+
+# Bytes que separan columnas
+_BLANCOS = np.zeros(256, dtype=bool)
+_BLANCOS[[9, 10, 11, 12, 13, 32]] = True
+
+# (nombre canonico, textos que debe contener, textos que no debe contener, tipo, unidades).
+# Se prueban en orden y gana la primera regla que coincide (sin distinguir mayusculas).
+REGLAS = (
+    ('scan', ('scan',), (), 'i8', ''),
+    ('press', ('pres',), (), 'f8', 'dbar'),
+    ('lon', ('lon',), (), 'f8', 'deg'),
+    ('lat', ('lat',), (), 'f8', 'deg'),
+    ('temp38', ('temp', 'sbe38'), (), 'f8', 'ITS-90, deg C'),
+    ('temp', ('temp',), (), 'f8', 'ITS-90, deg C'),
+    ('cond', ('cond',), (), 'f8', 'S/m'),
+    ('sal', ('sal',), (), 'f8', 'PSU'),
+    ('bot', ('bot',), (), 'i8', ''),
+    ('dens', ('dens',), (), 'f8', 'kg/m^3'),
+    ('julian', ('julian',), (), 'f8', 'dias'),
+    ('oxigeno', ('oxygen',), (), 'f8', ''),
+    ('svel', ('soundvel',), (), 'f8', 'm/s'),
+)
+
+
+def canonico(nombre):
+    """Regresa (nombre canonico, tipo, unidades por defecto) del nombre de una columna."""
+    minuscula = nombre.lower()
+    for canon, incluir, excluir, tipo, unidades in REGLAS:
+        if all(t in minuscula for t in incluir) and not any(t in minuscula for t in excluir):
+            return canon, tipo, unidades
+    return minuscula, 'f8', ''
+
+
+class Columna(object):
+    """Una columna del esquema."""
+    __slots__ = ('nombre', 'canonico', 'indice', 'tipo', 'unidades')
+
+    def __init__(self, nombre, canonico, indice, tipo, unidades):
+        self.nombre = nombre
+        self.canonico = canonico
+        self.indice = indice
+        self.tipo = tipo
+        self.unidades = unidades
+
+    def __repr__(self):
+        return f'Columna({self.indice}, {self.nombre!r} -> {self.canonico}, {self.tipo}, {self.unidades!r})'
+
+
+class Esquema(object):
+    """
+    Columnas de un instrumento compiladas a partir de las 'filas' de config.json.
+    Los parametros a ingresar son:
+        - filas: lista de textos, uno por columna, en el orden en que llegan
+    Funciones a utilizar:
+        - claves: tupla con el nombre de cada columna (las claves de las Muestras)
+        - formato: diccionario indice -> nombre (el formato que usaban los workers)
+        - indice / nombre: columna de un nombre canonico (None si el instrumento no la tiene)
+        - decode: convierte una linea en una Muestra
+        - dtype: tipo de numpy con una columna por variable
+    """
+
+    def __init__(self, filas):
+        self.filas = tuple(filas)
+        self.columnas = list()
+        for i, fila in enumerate(self.filas):
+            nombre, _, resto = fila.strip().partition(' ')
+            canon, tipo, unidades = canonico(nombre)
+            resto = resto.strip().strip('[]()').strip()
+            self.columnas.append(Columna(nombre, canon, i, tipo, resto or unidades))
+        self.claves = tuple(columna.nombre for columna in self.columnas)
+        self.formato = {columna.indice: columna.nombre for columna in self.columnas}
+        self._canonicos = dict()
+        for columna in self.columnas:
+            # Si dos columnas tienen el mismo nombre canonico vale la primera
+            self._canonicos.setdefault(columna.canonico, columna)
+        self.dtype = np.dtype([(columna.nombre, columna.tipo) for columna in self._unicas()])
+
+    def _unicas(self):
+        vistas = set()
+        for columna in self.columnas:
+            if columna.nombre not in vistas:
+                vistas.add(columna.nombre)
+                yield columna
+
+    def __len__(self):
+        return len(self.columnas)
+
+    def __repr__(self):
+        return f'Esquema({list(self.columnas)!r})'
+
+    def columna(self, canonico):
+        return self._canonicos.get(canonico)
+
+    def indice(self, canonico):
+        columna = self._canonicos.get(canonico)
+        return None if columna is None else columna.indice
+
+    def nombre(self, canonico):
+        columna = self._canonicos.get(canonico)
+        return None if columna is None else columna.nombre
+
+    def decode(self, line, t=None):
+        """
+        Separa una linea ASCII en una Muestra con las claves del esquema. Lanza
+        UnicodeDecodeError si la linea no es ASCII y KeyError si trae mas
+        columnas que las configuradas.
+        """
+        tokens = line.decode('ASCII').split()
+        if len(tokens) > len(self.claves):
+            raise KeyError(len(tokens) - 1)
+        return Muestra(self.claves, tokens, t)
+
+    def vacia(self, t=None):
+        return Muestra.vacia(self.claves, t)
+
+    def decode_lote(self, lineas):
+        """
+        Convierte una lista de lineas en un arreglo (lineas, columnas) de float64.
+        Regresa (datos, validas): las filas con mas columnas que las configuradas
+        o con bytes que no son ASCII quedan en NaN y en False en 'validas'. Como
+        en decode, una fila con menos columnas se acepta con las que faltan en
+        NaN, y un valor que no es un numero queda en NaN sin invalidar la fila
+        (en los dos casos la fila es DUDOSA, ver Lote.calidad).
+        """
+        n = len(lineas)
+        columnas = len(self.claves)
+        datos = np.full((n, columnas), np.nan)
+        if not n:
+            return datos, np.zeros(0, dtype=bool)
+        texto = b'\n'.join(lineas)
+        buf = np.frombuffer(texto, dtype=np.uint8)
+        # Fila de cada byte (el separador agregado cuenta en la fila anterior)
+        largos = np.fromiter((len(linea) + 1 for linea in lineas), dtype=np.int64, count=n)
+        fila = np.repeat(np.arange(n), largos)[:len(buf)]
+        blanco = _BLANCOS[buf]
+        # Una palabra empieza en un byte no blanco precedido por un blanco o por el inicio
+        inicio = ~blanco
+        inicio[1:] &= blanco[:-1]
+        palabras = np.bincount(fila[inicio], minlength=n)
+        no_ascii = np.bincount(fila[buf >= 128], minlength=n)
+        validas = (palabras <= columnas) & (no_ascii == 0)
+        completas = validas & (palabras == columnas)
+        # Las filas cortas (pocas) se separan de a una, como en decode
+        for i in np.flatnonzero(validas & ~completas):
+            numeros = self.decode(lineas[i]).numeros
+            datos[i, :len(numeros)] = numeros
+        cantidad = int(completas.sum())
+        if not cantidad:
+            return datos, validas
+        if cantidad < n:
+            lineas = [linea for linea, completa in zip(lineas, completas) if completa]
+        try:
+            # Una sola conversion (en C) de todas las filas completas
+            datos[completas] = np.loadtxt(lineas, ndmin=2, comments=None, encoding='ASCII')
+        except ValueError:
+            # Algun valor no numerico: las filas se convierten de a una
+            datos[completas] = [Muestra(self.claves, linea.decode('ASCII').split()).numeros for linea in lineas]
+        return datos, validas
+
+    def lote(self, lineas, t=None):
+        """Lote con los datos de 'lineas' y la Muestra de la ultima fila valida."""
+        datos, validas = self.decode_lote(lineas)
+        validos = np.flatnonzero(validas)
+        ultima = self.decode(lineas[validos[-1]], t) if len(validos) else None
+        return Lote(self, datos[validas], len(lineas) - len(validos), t, ultima)
+
+
+class Lote(object):
+    """
+    Scans decodificados juntos (Esquema.lote).
+        - datos: arreglo (scans validos, columnas) de float64
+        - invalidas: lineas descartadas (mas columnas que el esquema o no ASCII)
+        - t: instante de llegada comun a todas las lineas
+        - ultima: Muestra del ultimo scan valido (la que ve la ventana), o None
+    Funciones a utilizar:
+        - columna: valores de una columna por nombre canonico
+        - calidad: marca de calidad de cada scan, como Muestra.calidad
+    """
+    __slots__ = ('esquema', 'datos', 'invalidas', 't', 'ultima')
+
+    def __init__(self, esquema, datos, invalidas, t, ultima):
+        self.esquema = esquema
+        self.datos = datos
+        self.invalidas = invalidas
+        self.t = t
+        self.ultima = ultima
+
+    def __len__(self):
+        return len(self.datos)
+
+    def columna(self, canonico):
+        """Valores de una columna por nombre canonico, o None si el esquema no la tiene."""
+        indice = self.esquema.indice(canonico)
+        return None if indice is None else self.datos[:, indice]
+
+    @property
+    def calidad(self):
+        """BUENA o DUDOSA por scan: DUDOSA si le falta una columna o algun valor no es un numero."""
+        return np.where(np.isnan(self.datos).any(axis=1), DUDOSA, BUENA)
+
+
+@lru_cache(maxsize=32)
+def _compilar(filas):
+    return Esquema(filas)
+
+
+def compilar(filas):
+    """Esquema de 'filas'. Se compila una vez por cada configuracion distinta y se comparte."""
+    return _compilar(tuple(filas))
+
+
+def esquemas(cfg):
+    """Esquemas de CTD y TSG de un diccionario de configuracion."""
+    conf = cfg['Configuracion']
+    return {seccion: compilar(conf[seccion]['filas']) for seccion in ('CTD', 'TSG')}
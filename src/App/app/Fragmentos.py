@@ -0,0 +1,154 @@
+"""
+Campaña guardada por estaciones: un archivo por estacion y un manifiesto.
+
+El JSON de la campaña (el que se busca, se elige en Frm_Inicio y se pasa a
+StationManager) pasa a ser un manifiesto chico: tiene las mismas claves que un
+JSON de campaña (Expedicion, Instrumento, Archivos, Estaciones), pero en
+'Estaciones' cada estacion es solo una entrada del indice:
+    {"Archivo": "Estaciones/0001.json", "FechaHora": {...}, "Posicion": {...}}
+con el archivo de la estacion (relativo al manifiesto) y la fecha y posicion de
+inicio. Cada estacion completa esta en su archivo, en la carpeta Estaciones
+junto al manifiesto.
+
+Al guardar, StationManager reescribe solo los archivos de las estaciones que
+cambiaron y el manifiesto, no la campaña entera. Frm_Inicio lee solo el
+manifiesto para listar y mostrar una campaña.
+
+Uso (desde src/App), para pasar campañas de un solo JSON a estaciones:
+    python -m app.Fragmentos partir VA202406.json [otro.json ...]
+    python -m app.Fragmentos juntar VA202406.json VA202406_completo.json
+Al partir, el JSON original queda como VA202406.json.bak.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+
+from app import Serializador
+from app.Escritor import escribir_json
+
+CARPETA = 'Estaciones'
+# Copia del JSON de un solo archivo al partirlo (no termina en .json, asi no aparece como campaña)
+RESPALDO = '.bak'
+
+
+def carpeta(ruta_json):
+    """Carpeta de los archivos de las estaciones de una campaña."""
+    return os.path.join(os.path.dirname(os.path.abspath(ruta_json)), CARPETA)
+
+
+def archivo(nro):
+    """Archivo de una estacion, relativo al manifiesto (siempre con '/')."""
+    return f'{CARPETA}/{str(nro).zfill(4)}.json'
+
+
+def ruta_estacion(ruta_json, nro):
+    return os.path.join(carpeta(ruta_json), os.path.basename(archivo(nro)))
+
+
+def es_manifiesto(datos):
+    """True si 'datos' es un manifiesto (las estaciones son entradas del indice)."""
+    estaciones = datos.get('Estaciones') if isinstance(datos, dict) else None
+    if not isinstance(estaciones, dict) or not estaciones:
+        return False
+    return all(isinstance(v, dict) and 'Archivo' in v and 'NroEstacion' not in v for v in estaciones.values())
+
+
+def fragmentado(ruta_json):
+    """True si el archivo de la campaña es un manifiesto."""
+    try:
+        return es_manifiesto(Serializador.leer(ruta_json))
+    except (OSError, ValueError):
+        return False
+
+
+def entrada(nro, estacion):
+    """Entrada del indice del manifiesto para una estacion."""
+    registro = {'Archivo': archivo(nro)}
+    if isinstance(estacion, dict):
+        for grupo in ('FechaHora', 'Posicion'):
+            if isinstance(estacion.get(grupo), dict) and 'Inicio' in estacion[grupo]:
+                registro[grupo] = estacion[grupo]['Inicio']
+    return registro
+
+
+def manifiesto(estructura):
+    """Manifiesto de la estructura completa de una campaña."""
+    datos = dict(estructura)
+    datos['Estaciones'] = {nro: entrada(nro, estacion) for nro, estacion in estructura.get('Estaciones', {}).items()}
+    return datos
+
+
+def leer(ruta_json):
+    """
+    Estructura completa de la campaña, este guardada en un solo JSON o por
+    estaciones (en ese caso se leen todos los archivos de las estaciones).
+    """
+    estructura = Serializador.leer(ruta_json)
+    if not es_manifiesto(estructura):
+        return estructura
+    base = os.path.dirname(os.path.abspath(ruta_json))
+    estaciones = dict()
+    for nro, registro in estructura['Estaciones'].items():
+        try:
+            estaciones[nro] = Serializador.leer(os.path.join(base, registro['Archivo']))
+        except (OSError, ValueError) as e:
+            logging.error(f"Campaña {ruta_json}: no se pudo leer la estacion {nro}: {e}")
+    estructura['Estaciones'] = estaciones
+    return estructura
+
+
+def escribir(ruta_json, estructura, formato='json'):
+    """Escribe la campaña por estaciones: todas las estaciones y despues el manifiesto."""
+    os.makedirs(carpeta(ruta_json), exist_ok=True)
+    for nro, estacion in estructura.get('Estaciones', {}).items():
+        escribir_json(ruta_estacion(ruta_json, nro), estacion, formato)
+    escribir_json(ruta_json, manifiesto(estructura), formato)
+
+
+def partir(ruta_json, formato='json'):
+    """
+    Pasa una campaña de un solo JSON a estaciones, con los registros pendientes
+    de su diario. Regresa la cantidad de estaciones, o None si ya estaba partida.
+    """
+    # El diario se aplica sobre la estructura completa
+    from app import Diario
+    if fragmentado(ruta_json):
+        return None
+    estructura = Diario.cargar(ruta_json)
+    shutil.copy2(ruta_json, ruta_json + RESPALDO)
+    escribir(ruta_json, estructura, formato)
+    # Los registros del diario ya estan en los archivos de las estaciones
+    for ruta in (Diario.ruta_anterior(ruta_json), Diario.ruta_diario(ruta_json)):
+        if os.path.exists(ruta):
+            os.remove(ruta)
+    return len(estructura.get('Estaciones', {}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    sub = parser.add_subparsers(dest='orden', required=True)
+    partes = sub.add_parser('partir', help='pasa campañas de un solo JSON a un archivo por estacion')
+    partes.add_argument('json', nargs='+')
+    partes.add_argument('--formato', choices=Serializador.FORMATOS, default='json',
+                        help='formato de los archivos nuevos (app.Serializador)')
+    juntar = sub.add_parser('juntar', help='escribe una campaña por estaciones en un solo JSON')
+    juntar.add_argument('json')
+    juntar.add_argument('salida')
+    args = parser.parse_args(argv)
+
+    if args.orden == 'juntar':
+        with open(args.salida, 'w') as f:
+            json.dump(leer(args.json), f, indent=4)
+        return
+    for ruta in args.json:
+        estaciones = partir(ruta, Serializador.formato(args.formato))
+        if estaciones is None:
+            print(f'{ruta}: ya esta guardada por estaciones')
+        else:
+            print(f'{ruta}: {estaciones} estaciones en {carpeta(ruta)} (original en {ruta + RESPALDO})')
+
+
+if __name__ == '__main__':
+    main()
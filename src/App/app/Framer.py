@@ -0,0 +1,196 @@
+import time
+from collections import deque
+
+try:
+    unicode
+except (NameError, AttributeError):
+    unicode = str       # for Python 3, pylint: disable=redefined-builtin,invalid-name
+
+# all Python versions prior 3.x convert ``str([17])`` to '[17]' instead of '\x11'
+# so a simple ``bytes(sequence)`` doesn't work for all versions
+
+
+def to_bytes(seq):
+    """convert a sequence to a bytes type"""
+    if isinstance(seq, bytes):
+        return seq
+    elif isinstance(seq, bytearray):
+        return bytes(seq)
+    elif isinstance(seq, memoryview):
+        return seq.tobytes()
+    elif isinstance(seq, unicode):
+        raise TypeError(
+            'unicode strings are not supported, please encode to bytes: {!r}'.format(seq))
+    else:
+        # handle list of integers and bytes (one or more items) for Python 2 and 3
+        return bytes(bytearray(seq))
+
+
+LF = to_bytes([10])
+
+
+class Timeout(object):
+    """\
+    Abstraction for timeout operations. Using time.monotonic() if available
+    or time.time() in all other cases.
+
+    The class can also be initialized with 0 or None, in order to support
+    non-blocking and fully blocking I/O operations. The attributes
+    is_non_blocking and is_infinite are set accordingly.
+    """
+    if hasattr(time, 'monotonic'):
+        # Timeout implementation with time.monotonic(). This function is only
+        # supported by Python 3.3 and above. It returns a time in seconds
+        # (float) just as time.time(), but is not affected by system clock
+        # adjustments.
+        TIME = time.monotonic
+    else:
+        # Timeout implementation with time.time(). This is compatible with all
+        # Python versions but has issues if the clock is adjusted while the
+        # timeout is running.
+        TIME = time.time
+
+    def __init__(self, duration):
+        """Initialize a timeout with given duration"""
+        self.is_infinite = (duration is None)
+        self.is_non_blocking = (duration == 0)
+        self.duration = duration
+        if duration is not None:
+            self.target_time = self.TIME() + duration
+        else:
+            self.target_time = None
+
+    def expired(self):
+        """Return a boolean, telling if the timeout has expired"""
+        return self.target_time is not None and self.time_left() <= 0
+
+    def time_left(self):
+        """Return how many seconds are left until the timeout expires"""
+        if self.is_non_blocking:
+            return 0
+        elif self.is_infinite:
+            return None
+        else:
+            delta = self.target_time - self.TIME()
+            if delta > self.duration:
+                # clock jumped, recalculate
+                self.target_time = self.TIME() + self.duration
+                return self.duration
+            else:
+                return max(0, delta)
+
+    def restart(self, duration):
+        """\
+        Restart a timeout, only supported if a timeout was already set up
+        before.
+        """
+        self.duration = duration
+        self.target_time = self.TIME() + duration
+
+
+class LineFramer(object):
+    """
+    Arma lineas completas a partir de un puerto serie leyendo de a bloques.
+    En lugar de leer byte a byte, lee todo lo que haya en el buffer del puerto
+    (in_waiting) y separa por el terminador, guardando el resto incompleto para
+    la siguiente lectura.
+    Los parametros a ingresar son:
+        - ser: objeto con la interfaz de serial.Serial (read, in_waiting, timeout)
+        - expected: terminador de linea (LF por defecto)
+        - max_line: largo maximo de una linea sin terminador antes de descartarla
+        - captura: funcion a la que se pasa cada bloque recibido, tal cual llego
+          (ver app.Captura.Grabador.capturador)
+    """
+
+    def __init__(self, ser, expected=LF, max_line=4096, captura=None):
+        self.ser = ser
+        self.expected = expected
+        self.max_line = max_line
+        self.captura = captura
+        # Bytes recibidos desde que se creo (app.Metricas)
+        self.bytes = 0
+        self._buffer = bytearray()
+        self._lines = deque()
+
+    def reset(self):
+        """Descarta el resto incompleto y las lineas pendientes."""
+        del self._buffer[:]
+        self._lines.clear()
+
+    def pending(self):
+        """Cantidad de lineas completas que aun no fueron entregadas."""
+        return len(self._lines)
+
+    def feed(self, data):
+        """
+        Agrega un bloque de bytes al buffer y devuelve la lista de lineas
+        completas (incluyendo el terminador) que se pudieron armar.
+        """
+        if self.captura is not None and data:
+            self.captura(data)
+        self.bytes += len(data)
+        self._buffer += data
+        lenterm = len(self.expected)
+        lines = list()
+        start = 0
+        while True:
+            end = self._buffer.find(self.expected, start)
+            if end < 0:
+                break
+            end += lenterm
+            lines.append(bytes(self._buffer[start:end]))
+            start = end
+        if start:
+            del self._buffer[:start]
+        if len(self._buffer) > self.max_line:
+            # Basura sin terminador, la descarto para no crecer sin limite
+            del self._buffer[:]
+        return lines
+
+    def read_chunk(self):
+        """
+        Lee todos los bytes disponibles en el puerto. Si no hay ninguno espera
+        hasta el timeout del puerto por al menos un byte.
+        """
+        size = self.ser.in_waiting
+        return self.ser.read(size if size > 0 else 1)
+
+    def read_lines(self):
+        """
+        Devuelve todas las lineas completas disponibles, bloqueando como maximo
+        el timeout del puerto. Lanza TimeoutError si no llega ningun byte.
+        """
+        if self._lines:
+            lines = list(self._lines)
+            self._lines.clear()
+            return lines
+        chunk = self.read_chunk()
+        if not chunk:
+            raise TimeoutError
+        return self.feed(chunk)
+
+    def readline(self, size=None):
+        """
+        Devuelve una linea completa (con terminador). Reemplaza al Read_until
+        byte a byte. Lanza TimeoutError si el puerto no entrega datos o si se
+        vence el timeout total sin completar una linea.
+        """
+        timeout = Timeout(self.ser.timeout)
+        while not self._lines:
+            chunk = self.read_chunk()
+            if not chunk:
+                raise TimeoutError
+            self._lines.extend(self.feed(chunk))
+            if size is not None and not self._lines and len(self._buffer) >= size:
+                line = bytes(self._buffer[:size])
+                del self._buffer[:size]
+                return line
+            if not self._lines and timeout.expired():
+                raise TimeoutError
+        return self._lines.popleft()
+
+    def __iter__(self):
+        """Itera indefinidamente sobre las lineas que llegan al puerto."""
+        while True:
+            for line in self.read_lines():
+                yield line
@@ -3,6 +3,7 @@
 # import time
 # import wmi
 # import configparser
+import logging
 from threading import Thread
 # import re
 # import json
@@ -10,6 +11,7 @@ from threading import Thread
 # import RMC
 
 from app.cfg import Cfg
+from app.Autodeteccion import Autodeteccion
 from gui.Frm_Config_ui import *
 from PyQt5.QtWidgets import QApplication, QMessageBox, QMainWindow, QAction, QInputDialog, QLineEdit, QFileDialog, QDialog, QTableWidgetItem
 from PyQt5.QtCore import *
@@ -25,6 +27,9 @@ __version__ = 'V1.01'
 
 class Frm_Config(QDialog, Ui_Frm_Config):
     # Aca heredo la clase de la ventana, si no hay nada simplemente aparece una ventana vacia
+    # Resultado de la autodeteccion, se emite desde el hilo de busqueda
+    detectado = pyqtSignal(object)
+
     def __init__(self, *args, **kwargs):
         self.__load_cfg()
         QDialog.__init__(self, *args, **kwargs)
@@ -36,6 +41,8 @@ class Frm_Config(QDialog, Ui_Frm_Config):
         # Eventos botones
         self.btn_Guardar.clicked.connect(self.click_btn_Guardar)
         self.btn_Salir.clicked.connect(self.closeEvent)
+        self.btn_Detectar.clicked.connect(self.click_btn_Detectar)
+        self.detectado.connect(self.carga_detectado)
 
         self.dirpick_Estructura.clicked.connect(self.dirpickEstructura)
         self.dirpick_SeaSaveini.clicked.connect(self.dirpick_SeaSaveIni)
@@ -191,6 +198,60 @@ class Frm_Config(QDialog, Ui_Frm_Config):
         self.close()
         return self.cfg
 
+    def click_btn_Detectar(self, event):
+        # La busqueda demora varios segundos, la hago fuera del hilo de la ventana
+        self.btn_Detectar.setEnabled(False)
+        self.btn_Detectar.setText('Buscando...')
+        Thread(target=self.detectar, daemon=True).start()
+
+    def detectar(self):
+        cfg = None
+        try:
+            busqueda = Autodeteccion(self.cfg)
+            busqueda.detectar()
+            cfg = busqueda.config()
+        except Exception as e:
+            logging.error(f'Error al detectar los instrumentos: {e}')
+        finally:
+            # Siempre se avisa a la ventana, que vuelve a habilitar el boton (None si fallo)
+            self.detectado.emit(cfg)
+
+    def carga_detectado(self, cfg):
+        self.btn_Detectar.setText('Detectar')
+        self.btn_Detectar.setEnabled(True)
+        if cfg is None:
+            QMessageBox.warning(self, 'Detectar', 'No se pudo completar la busqueda de instrumentos')
+            return
+        # Solo se actualizan los controles, la configuracion se guarda con Guardar
+        controles = (
+            ('NMEA', self.chk_GPS, self.cbox_GPS_COM, self.cbox_GPS_BR),
+            ('CTD', self.chk_CTD, self.cbox_CTD_COM, self.cbox_CTD_BR),
+            ('TSG', self.chk_TSG, self.cbox_TSG_COM, self.cbox_TSG_BR),
+            ('Batimetria', self.chk_BAT, self.cbox_BAT_COM, self.cbox_BAT_BR),
+        )
+        encontrados = list()
+        for seccion, chk, cbox_COM, cbox_BR in controles:
+            nuevo = cfg['Configuracion'][seccion]
+            actual = self.cfg['Configuracion'][seccion]
+            if nuevo['Port'] == actual['Port'] and nuevo['BR'] == str(actual['BR']) and \
+                    nuevo['Status'] == actual['Status'] and nuevo.get('Parity') == actual.get('Parity'):
+                continue
+            if 'Parity' in nuevo:
+                # La paridad no tiene control en la ventana: se guarda directo con Guardar
+                actual['Parity'] = nuevo['Parity']
+            if cbox_COM.findText(nuevo['Port']) < 0:
+                cbox_COM.addItem(nuevo['Port'])
+            cbox_COM.setCurrentText(nuevo['Port'])
+            if cbox_BR.findText(nuevo['BR']) < 0:
+                cbox_BR.addItem(nuevo['BR'])
+            cbox_BR.setCurrentText(nuevo['BR'])
+            chk.setChecked(True)
+            encontrados.append(f"{seccion}: {nuevo['Port']} a {nuevo['BR']} ({nuevo.get('Parity', 'None')})")
+        if encontrados:
+            QMessageBox.information(self, 'Detectar', 'Instrumentos encontrados:\n' + '\n'.join(encontrados))
+        else:
+            QMessageBox.information(self, 'Detectar', 'No se encontraron instrumentos nuevos')
+
     def dirpickEstructura(self, event):
         pass
 
@@ -1,13 +1,12 @@
-import glob
 import os
-import json
 import subprocess
 
 from decouple import config
 from dotenv import load_dotenv
 
 from app.cfg import Cfg
-from app.utils import validate_import_json
+from app.utils import buscar_campanias
+from app import Diario, Fragmentos, Serializador
 
 from gui.Frm_Inicio_ui import *
 
@@ -99,25 +98,8 @@ class Frm_Inicio(QDialog, Ui_Frm_Inicio):
     def cargar_campanias(self):
         # Buscara todas las campanias que esten dentro de la estructura de carpetas
         # Directorio base para iniciar la búsqueda
-        directorio_base = os.getenv('OF_DATA_DIR')
-        # Patrón para buscar archivos JSON en todas las subcarpetas
-        patron_json = os.path.join(directorio_base, '**', '*.json')
-        # Obtener la lista de archivos JSON
-        self._archivos_json = glob.glob(patron_json, recursive=True)
-        # Excluir la carpeta 'varios' de los resultados
-        self._archivos_json = [archivo for archivo in self._archivos_json if ('Varios' or 'varios' ) not in archivo]
-        self._archivos_json = [archivo for archivo in self._archivos_json if ('CNV' or 'cnv' ) not in archivo]
-        self._archivos_json = [archivo for archivo in self._archivos_json if ('HEX' or 'hex' ) not in archivo]
-        # Elimino cualquier archivo json que no tenga la estructura de un import
-        for file in self._archivos_json:
-            with open(file, 'r') as f:  
-                json_file = json.load(f)
-            valido = validate_import_json(json_file)
-            if not valido:
-                self._archivos_json.remove(file)
-        
+        self._archivos_json = buscar_campanias(os.getenv('OF_DATA_DIR'))
         self.cbox_Cargar.clear()
-        self._archivos_json = list(reversed(self._archivos_json))
         for i in self._archivos_json:
             i = os.path.basename(i)
             i = i.replace('.json','')
@@ -156,8 +138,11 @@ class Frm_Inicio(QDialog, Ui_Frm_Inicio):
         else:
             self.btn_Cargar.setEnabled(True)
             self.tree_json.clear()
-            with open(selected_file, 'r') as f:  
-                data = json.load(f)
+            data = Serializador.leer(selected_file)
+            # Una campaña por estaciones se muestra con su manifiesto, sin leer las estaciones
+            if not Fragmentos.es_manifiesto(data):
+                # Con los registros que hayan quedado en el diario de la campaña
+                Diario.recuperar(selected_file, data)
             self.populate_tree_widget(data)
         
 
@@ -254,8 +239,7 @@ class Frm_Inicio(QDialog, Ui_Frm_Inicio):
             self._selected_file = self.open_file_dialog()
 
         try:
-            with open(self._selected_file, 'r') as f:  
-                json_file = json.load(f) 
+            json_file = Serializador.leer(self._selected_file)
             self._cfg['Campania']['Siglasbuque'] = json_file['Expedicion']['Buque']
             self._cfg['Campania']['Anio'] = json_file['Expedicion']['Anio']
             self._cfg['Campania']['Nrocampania'] = json_file['Expedicion']['Numero']
@@ -0,0 +1,224 @@
+"""
+Metricas de salud de la adquisicion.
+
+Cada fuente (un Canal del motor o un worker) lleva sus propios contadores como
+atributos enteros: lineas, bytes, errores (lineas que no se pudieron
+decodificar), timeouts, reconexiones y descartados (scans que la cola hacia la
+ventana tuvo que tirar por estar llena). Los contadores los incrementa el hilo de
+lectura y el registro solo los lee al armar una instantanea, asi la lectura no
+paga ningun costo extra. Las velocidades (lineas/s, bytes/s) se calculan
+entre dos instantaneas consecutivas.
+
+Los tiempos (latencia señal -> ventana, registro en el diario de la campaña,
+escritura del JSON en segundo plano) se registran con observar() en
+histogramas de los ultimos valores.
+
+La instantanea se muestra en la barra de estado, se escribe una por linea
+(JSON) en un archivo rotativo y se sirve en http://127.0.0.1:<puerto>/metricas.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.Framer import Timeout
+
+# Contadores que se buscan en cada fuente (los que falten valen 0)
+CONTADORES = ('lineas', 'bytes', 'errores', 'timeouts', 'reconexiones', 'descartados')
+# Contadores de los que se informa ademas la velocidad por segundo
+VELOCIDADES = ('lineas', 'bytes')
+
+
+class Histograma(object):
+    """
+    Guarda los ultimos 'ventana' valores observados y el total acumulado.
+    Los percentiles se calculan sobre la ventana, el maximo sobre todo el registro.
+    """
+
+    def __init__(self, ventana=1024):
+        self.valores = deque(maxlen=ventana)
+        self.n = 0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        self.valores.append(valor)
+        self.n += 1
+        if valor > self.maximo:
+            self.maximo = valor
+
+    def resumen(self):
+        valores = sorted(self.valores)
+        if not valores:
+            return {'n': self.n}
+        return {
+            'n': self.n,
+            'p50': valores[len(valores) // 2],
+            'p99': valores[min(len(valores) - 1, int(len(valores) * 0.99))],
+            'max': self.maximo,
+        }
+
+
+class Metricas(object):
+    """
+    Registro de fuentes y de histogramas.
+    Funciones a utilizar:
+        - registrar / limpiar: agrega una fuente con contadores o quita todas
+        - observar: agrega un valor (segundos) al histograma 'nombre'
+        - instantanea: diccionario con contadores, velocidades e histogramas
+        - resumen: texto corto para la barra de estado
+    """
+
+    def __init__(self, ventana=1024):
+        self.ventana = ventana
+        self.fuentes = dict()
+        self.histogramas = dict()
+        # Ultima lectura de los contadores de cada fuente como (instante, valores)
+        self._anterior = dict()
+        self._lock = threading.Lock()
+        # Ultima instantanea armada (la que sirve ServidorMetricas)
+        self.ultima = None
+
+    def registrar(self, nombre, fuente):
+        with self._lock:
+            self.fuentes[nombre] = fuente
+            self._anterior.pop(nombre, None)
+
+    def limpiar(self):
+        """Quita las fuentes; los histogramas se conservan."""
+        with self._lock:
+            self.fuentes.clear()
+            self._anterior.clear()
+
+    def observar(self, nombre, valor):
+        try:
+            histograma = self.histogramas[nombre]
+        except KeyError:
+            histograma = self.histogramas.setdefault(nombre, Histograma(self.ventana))
+        histograma.observar(valor)
+
+    def instantanea(self):
+        ahora = Timeout.TIME()
+        fuentes = dict()
+        with self._lock:
+            for nombre, fuente in self.fuentes.items():
+                valores = {contador: getattr(fuente, contador, 0) for contador in CONTADORES}
+                scans = getattr(fuente, 'scans', None)
+                if scans is not None:
+                    valores['perdidos'] = scans.perdidos
+                por_señal = getattr(fuente, 'por_señal', None)
+                if por_señal:
+                    valores['descartados_por_señal'] = dict(por_señal)
+                t, anteriores = self._anterior.get(nombre, (None, None))
+                for contador in VELOCIDADES:
+                    velocidad = 0.0
+                    if t is not None and ahora > t:
+                        # Un contador que vuelve atras (puerto reabierto) cuenta desde cero
+                        delta = valores[contador] - anteriores[contador]
+                        velocidad = (delta if delta >= 0 else valores[contador]) / (ahora - t)
+                    valores[contador + '_s'] = round(velocidad, 2)
+                self._anterior[nombre] = (ahora, valores)
+                fuentes[nombre] = valores
+        histogramas = {nombre: histograma.resumen() for nombre, histograma in list(self.histogramas.items())}
+        self.ultima = {'hora': time.time(), 'fuentes': fuentes, 'histogramas': histogramas}
+        return self.ultima
+
+    @staticmethod
+    def resumen(instantanea):
+        """Texto para la barra de estado: lineas/s de cada fuente y alertas."""
+        partes = list()
+        for nombre, valores in instantanea['fuentes'].items():
+            texto = f"{nombre} {valores['lineas_s']:.1f}/s"
+            alertas = [f"{valores[contador]} {contador}" for contador in ('timeouts', 'errores', 'perdidos', 'descartados')
+                       if valores.get(contador)]
+            if alertas:
+                texto += f" ({', '.join(alertas)})"
+            partes.append(texto)
+        latencias = [h['p99'] for nombre, h in instantanea['histogramas'].items()
+                     if nombre.startswith('latencia') and 'p99' in h]
+        if latencias:
+            partes.append(f"lat {max(latencias) * 1000:.0f} ms")
+        guardado = instantanea['histogramas'].get('guardado', {})
+        if 'p99' in guardado:
+            partes.append(f"json {guardado['p99'] * 1000:.0f} ms")
+        escritura = instantanea['histogramas'].get('escritura', {})
+        if 'p99' in escritura:
+            partes.append(f"escritura {escritura['p99'] * 1000:.0f} ms")
+        return ' | '.join(partes)
+
+
+# Registro unico de la aplicacion
+METRICAS = Metricas()
+
+
+def archivo(ruta, max_bytes=2 ** 20, copias=5):
+    """
+    Logger que escribe cada instantanea como una linea JSON en 'ruta', rotando
+    al llegar a max_bytes y conservando 'copias' archivos anteriores.
+    """
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    logger = logging.getLogger(f'SIPO.metricas.{ruta}')
+    logger.setLevel(logging.INFO)
+    # Las metricas no van al log principal
+    logger.propagate = False
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(ruta, maxBytes=max_bytes, backupCount=copias)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+    return logger
+
+
+def escribir(logger, instantanea):
+    logger.info(json.dumps(instantanea))
+
+
+class ServidorMetricas(object):
+    """
+    Servidor HTTP local (solo 127.0.0.1) con la ultima instantanea en JSON.
+    Los parametros a ingresar son:
+        - metricas: registro de metricas (METRICAS por defecto)
+        - puerto: puerto TCP (0 elige uno libre, ver 'puerto' luego de start)
+    Se sirve la ultima instantanea armada por quien la actualiza periodicamente.
+    Funciones a utilizar:
+        - start / stop: inicia y detiene el hilo del servidor
+    """
+
+    def __init__(self, metricas=METRICAS, puerto=8765):
+        self.metricas = metricas
+        self.puerto = puerto
+        self._servidor = None
+        self._hilo = None
+
+    def start(self):
+        metricas = self.metricas
+
+        class Pedido(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metricas'):
+                    self.send_error(404)
+                    return
+                # La ultima instantanea de la ventana, asi las velocidades no dependen de los pedidos
+                cuerpo = json.dumps(metricas.ultima or metricas.instantanea(), indent=1).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, format, *args):
+                logging.debug('Metricas: ' + format % args)
+
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', self.puerto), Pedido)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name='Metricas', daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
@@ -0,0 +1,109 @@
+"""
+Muestras tipadas de los instrumentos.
+
+Una Muestra guarda los textos tal como llegaron del instrumento (tokens) y sus
+valores numericos, convertidos una sola vez al recibirla, junto con el instante
+de llegada (monotonic) y una marca de calidad. Se usa como un diccionario de
+solo lectura variable -> texto, asi el resto del programa y el JSON de la
+campaña siguen viendo lo mismo que antes; los numeros se leen con numero() o
+con el arreglo 'numeros' (en el orden de 'claves').
+
+Las claves se comparten entre todas las muestras de un mismo instrumento (una
+tupla por formato), por lo que cada muestra solo ocupa sus dos listas.
+"""
+import math
+from collections.abc import Mapping
+
+from app.Framer import Timeout
+
+NAN = float('nan')
+
+# Marcas de calidad
+BUENA = 0
+# Faltan columnas o alguna no es numerica
+DUDOSA = 1
+# El instrumento no entrego datos (timeout): todos los valores son NaN
+SIN_DATOS = 2
+
+
+def _numero(token):
+    try:
+        return float(token)
+    except (TypeError, ValueError):
+        return NAN
+
+
+class Muestra(Mapping):
+    """
+    Muestra de un instrumento.
+    Los parametros a ingresar son:
+        - claves: tupla con el nombre de cada variable
+        - tokens: textos recibidos, en el orden de 'claves'
+        - t: instante de llegada (monotonic); por defecto el actual
+        - numeros: valores numericos ya convertidos (si no se indican se convierten los tokens)
+        - calidad: BUENA, DUDOSA o SIN_DATOS (por defecto se deduce de los numeros)
+    Funciones a utilizar:
+        - numero: valor numerico de una variable (NaN si no existe o no es un numero)
+        - a_dict: diccionario variable -> texto, para guardar en el JSON
+    """
+    __slots__ = ('claves', 'tokens', 'numeros', 't', 'calidad')
+
+    def __init__(self, claves, tokens, t=None, numeros=None, calidad=None):
+        self.claves = claves
+        self.tokens = tokens
+        self.numeros = [_numero(token) for token in tokens] if numeros is None else numeros
+        self.t = Timeout.TIME() if t is None else t
+        if calidad is None:
+            calidad = BUENA if len(tokens) == len(claves) and not any(map(math.isnan, self.numeros)) else DUDOSA
+        self.calidad = calidad
+
+    @classmethod
+    def vacia(cls, claves, t=None):
+        """Muestra sin datos: todas las variables en 'NaN'."""
+        return cls(claves, ['NaN'] * len(claves), t, [NAN] * len(claves), SIN_DATOS)
+
+    def _indice(self, clave):
+        try:
+            i = self.claves.index(clave)
+        except ValueError:
+            raise KeyError(clave)
+        if i >= len(self.tokens):
+            raise KeyError(clave)
+        return i
+
+    def __getitem__(self, clave):
+        return self.tokens[self._indice(clave)]
+
+    def __iter__(self):
+        return iter(self.claves[:len(self.tokens)])
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __repr__(self):
+        return f'Muestra({self.a_dict()!r}, calidad={self.calidad})'
+
+    def numero(self, clave):
+        try:
+            return self.numeros[self._indice(clave)]
+        except KeyError:
+            return NAN
+
+    def a_dict(self):
+        return dict(zip(self.claves, self.tokens))
+
+
+def numero(dato, clave):
+    """Valor numerico de 'clave' en una Muestra o en un diccionario de textos (NaN si no hay)."""
+    if isinstance(dato, Muestra):
+        return dato.numero(clave)
+    return _numero(dato.get(clave)) if dato is not None else NAN
+
+
+def a_json(dato):
+    """Copia guardable en el JSON de la campaña (las Muestras pasan a diccionario de textos)."""
+    if isinstance(dato, Muestra):
+        return dato.a_dict()
+    if isinstance(dato, dict):
+        return {clave: a_json(valor) for clave, valor in dato.items()}
+    return dato
@@ -1,95 +1,17 @@
 import serial
+import serial.tools.list_ports
 import json
 import re
 import os
+import glob
 import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    unicode
-except (NameError, AttributeError):
-    unicode = str       # for Python 3, pylint: disable=redefined-builtin,invalid-name
-
-# all Python versions prior 3.x convert ``str([17])`` to '[17]' instead of '\x11'
-# so a simple ``bytes(sequence)`` doesn't work for all versions
-
-
-def to_bytes(seq):
-    """convert a sequence to a bytes type"""
-    if isinstance(seq, bytes):
-        return seq
-    elif isinstance(seq, bytearray):
-        return bytes(seq)
-    elif isinstance(seq, memoryview):
-        return seq.tobytes()
-    elif isinstance(seq, unicode):
-        raise TypeError(
-            'unicode strings are not supported, please encode to bytes: {!r}'.format(seq))
-    else:
-        # handle list of integers and bytes (one or more items) for Python 2 and 3
-        return bytes(bytearray(seq))
-
-
-LF = to_bytes([10])
-
-
-class Timeout(object):
-    """\
-    Abstraction for timeout operations. Using time.monotonic() if available
-    or time.time() in all other cases.
-
-    The class can also be initialized with 0 or None, in order to support
-    non-blocking and fully blocking I/O operations. The attributes
-    is_non_blocking and is_infinite are set accordingly.
-    """
-    if hasattr(time, 'monotonic'):
-        # Timeout implementation with time.monotonic(). This function is only
-        # supported by Python 3.3 and above. It returns a time in seconds
-        # (float) just as time.time(), but is not affected by system clock
-        # adjustments.
-        TIME = time.monotonic
-    else:
-        # Timeout implementation with time.time(). This is compatible with all
-        # Python versions but has issues if the clock is adjusted while the
-        # timeout is running.
-        TIME = time.time
-
-    def __init__(self, duration):
-        """Initialize a timeout with given duration"""
-        self.is_infinite = (duration is None)
-        self.is_non_blocking = (duration == 0)
-        self.duration = duration
-        if duration is not None:
-            self.target_time = self.TIME() + duration
-        else:
-            self.target_time = None
-
-    def expired(self):
-        """Return a boolean, telling if the timeout has expired"""
-        return self.target_time is not None and self.time_left() <= 0
-
-    def time_left(self):
-        """Return how many seconds are left until the timeout expires"""
-        if self.is_non_blocking:
-            return 0
-        elif self.is_infinite:
-            return None
-        else:
-            delta = self.target_time - self.TIME()
-            if delta > self.duration:
-                # clock jumped, recalculate
-                self.target_time = self.TIME() + self.duration
-                return self.duration
-            else:
-                return max(0, delta)
-
-    def restart(self, duration):
-        """\
-        Restart a timeout, only supported if a timeout was already set up
-        before.
-        """
-        self.duration = duration
-        self.target_time = self.TIME() + duration
+from app.Framer import LineFramer, LF, Timeout, to_bytes
+from app.Sentencias import split_sentence, DECODIFICADORES
+# Registra en pyserial las URL replay:// (reproduccion de capturas)
+from app import protocolos  # noqa: F401
 
 
 class NMEA(object):
@@ -101,85 +23,199 @@ class NMEA(object):
         - BR: Baud rate del puerto (4800 por defecto)
         - timeout: tiempo de espera del puerto (2 segundos por defecto)
         - sts: sentencia de NMEA a decodificar (RMC por defecto)
-        - nmeajson: archivo de expresiones regulares de sentencias NMEA (archivo NMEA.json por defecto)
+        - expreg_nmea: expresion regular opcional. Si no se indica, la sentencia se decodifica
+          separando campos y validando el checksum (ver app.Sentencias)
+        - persistent: mantiene el puerto abierto entre lecturas (False por defecto). En este modo
+          no se vacia el buffer entre sentencias y el puerto solo se reabre si ocurre un error.
     Funciones a utilizar:
-        - detect: busca en los puertos series que contengan sentencia de NMEA (usa "sts" para buscar)
+        - scan_ports: lista los puertos serie presentes en el sistema
+        - detect: busca en paralelo los puertos series que contengan sentencia de NMEA (usa "sts" para buscar)
+        - open/close: abre y cierra el puerto en modo persistente
+        - Get_Rate: sentencias por segundo decodificadas
     """
     __autor__ = 'Alvaro Cubiella'
     __version__ = 'V1.0'
 
-    def __init__(self, port='COM1', BR=4800, timeout=2, sts='RMC', expreg_nmea=None):
+    def __init__(self, port='COM1', BR=4800, timeout=2, sts='RMC', expreg_nmea=None, persistent=False):
         self.port = port
         self.BR = BR
         self.timeout = timeout
         self.sts = sts
         self.expreg_nmea = expreg_nmea
+        self.persistent = persistent
+        # El patron se compila una sola vez; sin patron se usa el decodificador por campos
+        self._patron = re.compile(expreg_nmea) if expreg_nmea else None
+        self._decodificador = DECODIFICADORES.get(sts)
+        self.NMEA_data = None
+        self.NMEA_campos = None
+        self._comm_NMEA = None
+        self._framer = None
+        # Funcion que graba los bytes crudos del puerto (app.Captura)
+        self.captura = None
+        # Instrumentacion de la lectura
+        self.sentencias = 0
+        self.reconexiones = 0
+        # Lineas con checksum o campos invalidos
+        self.errores = 0
+        # Bytes recibidos por los puertos ya cerrados (ver la propiedad bytes)
+        self._bytes = 0
+        self._t_inicio = None
         # self.listport = self.detect()      # Detecta los puertos con la sentencia seleccionada
 
-    def scan_ports(self):
-        self.__listPort = list()
-        for i in range(0, 50):
-            try:
-                comm_NMEA = serial.Serial(
-                    'COM'+str(i), self.BR, 8, timeout=0.5)
-                comm_NMEA.close()
-                self.__listPort.append('COM' + str(i))
-            except:
-                pass
+    def scan_ports(self, simulador=None):
+        """
+        Enumera los puertos serie del sistema con serial.tools.list_ports. Los
+        pseudo-terminales no se prueban nunca (leerlos se llevaria lo que se
+        escribe en otras consolas), salvo los enlaces del directorio 'simulador'
+        (app.Simulador --enlaces), si se indica.
+        """
+        self.__listPort = [p.device for p in serial.tools.list_ports.comports()]
+        if simulador:
+            for enlace in sorted(glob.glob(os.path.join(simulador, '*'))):
+                if os.path.exists(enlace) and enlace not in self.__listPort:
+                    self.__listPort.append(enlace)
         self.list_ports = self.__listPort
 
-    def detect(self):
+    def sample(self, port, timeout=1, BR=None, parity=serial.PARITY_NONE):
+        """
+        Abre el puerto y junta las lineas que llegan durante 'timeout' segundos.
+        Regresa la lista de lineas (bytes) o None si el puerto no se pudo abrir.
+        """
+        lineas = list()
+        fin = Timeout(timeout)
+        try:
+            comm_NMEA = serial.serial_for_url(str(port), BR or self.BR, 8, parity, timeout=min(0.1, timeout))
+        except (serial.SerialException, OSError, ValueError):
+            return None
+        try:
+            comm_NMEA.reset_input_buffer()  # Borro buffer del puerto serie
+            framer = LineFramer(comm_NMEA)
+            while not fin.expired():
+                try:
+                    lineas.extend(framer.read_lines())
+                except TimeoutError:
+                    continue
+        except (serial.SerialException, OSError):
+            pass
+        finally:
+            comm_NMEA.close()
+        return lineas
+
+    def probe(self, port, timeout=1, BR=None):
+        """
+        Regresa el conjunto de sentencias NMEA (con checksum valido) que llegan al
+        puerto durante 'timeout' segundos, o None si no se pudo abrir.
+        """
+        lineas = self.sample(port, timeout, BR)
+        if lineas is None:
+            return None
+        sentencias = set()
+        for line in lineas:
+            partes = split_sentence(line)
+            if partes is not None:
+                sentencias.add(partes[1])
+        return sentencias
+
+    def detect(self, timeout=1):
         """ Recorreo los puertos disponibles con sentencias NMEA.
-        Devuelte una tupla con los numeros de puertos con NMEA,
-        de lo contrario regresa una tupla vacia.
+        Todos los puertos se prueban en paralelo, por lo que la busqueda demora un
+        solo timeout sin importar la cantidad de puertos. Deja en port_sentences
+        las sentencias que transporta cada puerto.
+        Devuelte una tupla con los numeros de puertos con la sentencia "sts" (o con
+        cualquier sentencia si sts es None), de lo contrario regresa una tupla vacia.
         """
         self.scan_ports()
-        self.__nmea_port = list()
-        for port in self.__listPort:
-            try:
-                comm_NMEA = serial.Serial(str(port), self.BR, 8, timeout=1)
-                comm_NMEA.portstr
-                comm_NMEA.reset_input_buffer()  # Borro buffer del puerto serie
-#                dato = comm_NMEA.read_until().decode('ASCII')
-# Uso para probar en consola
-                dato = comm_NMEA.read(500)
-                if self.sts in str(dato):
-                    self.__nmea_port.append(port)
-                comm_NMEA.close()
-            except serial.SerialException:
-                pass
-        if len(self.__nmea_port) == 0:
-            return tuple()
+        self.port_sentences = dict()
+        if self.__listPort:
+            with ThreadPoolExecutor(max_workers=len(self.__listPort)) as pool:
+                resultados = pool.map(lambda port: self.probe(port, timeout), self.__listPort)
+                for port, sentencias in zip(self.__listPort, resultados):
+                    if sentencias:
+                        self.port_sentences[port] = sentencias
+        self.__nmea_port = [port for port, sentencias in self.port_sentences.items()
+                            if self.sts is None or self.sts in sentencias]
+        return tuple(self.__nmea_port)
+
+    @property
+    def is_open(self):
+        return self._comm_NMEA is not None and self._comm_NMEA.is_open
+
+    def open(self):
+        """Abre el puerto serie. En modo persistente queda abierto hasta llamar a close."""
+        self._comm_NMEA = serial.serial_for_url(
+            str(self.port), self.BR, 8, timeout=self.timeout)
+        self._comm_NMEA.reset_input_buffer()  # Borro buffer del puerto serie
+        if self._framer is not None:
+            self._bytes += self._framer.bytes
+        self._framer = LineFramer(self._comm_NMEA, captura=self.captura)
+        if self._t_inicio is None:
+            self._t_inicio = Timeout.TIME()
+
+    def close(self):
+        if self._comm_NMEA is not None:
+            self._comm_NMEA.close()
+
+    @property
+    def bytes(self):
+        """Bytes recibidos desde la primera apertura del puerto."""
+        return self._bytes + (self._framer.bytes if self._framer is not None else 0)
+
+    def Get_Rate(self):
+        """Regresa las sentencias por segundo decodificadas desde la primera lectura."""
+        if self._t_inicio is None:
+            return 0.0
+        transcurrido = Timeout.TIME() - self._t_inicio
+        if transcurrido <= 0:
+            return 0.0
+        return self.sentencias / transcurrido
+
+    def Decode(self, line):
+        """
+        Decodifica una linea leida del puerto. Regresa los valores de la sentencia
+        seleccionada o None si la linea no corresponde o es invalida.
+        """
+        if self._patron is not None:
+            return self._patron.search(line.decode('ASCII', errors='replace'))
+        partes = split_sentence(line)
+        if partes is None:
+            self.errores += 1
+            return None
+        if partes[1] != self.sts or self._decodificador is None:
+            return None
+        valores = self._decodificador(partes[2])
+        if valores is None:
+            self.errores += 1
         else:
-            return tuple(self.__nmea_port)
+            self.NMEA_campos = partes[2]
+        return valores
 
     def Read(self):
         """
         Busca la sentencia seleccionada en el puerto serie ingresado y devuelve los respectivos valores.
         """
-        patron = re.compile(self.expreg_nmea)
         dato = None
 #        if self.listport.count(str(self.port)) == 0:
 #            raise IOError()
         try:
-            self._comm_NMEA = serial.Serial(
-                str(self.port), self.BR, 8, timeout=self.timeout)
-            self._comm_NMEA.portstr
-            self._comm_NMEA.reset_input_buffer()  # Borro buffer del puerto serie
-            self._comm_NMEA.reset_input_buffer()  # Borro buffer del puerto serie
-            # dato = comm_NMEA.read_until().decode('ASCII')
-            dato = self.Read_until().decode('ASCII')
-            while re.search(patron, dato) is None:
-                #                comm_NMEA.reset_input_buffer()               #Borro buffer del puerto serie
-                # datos = self._comm_NMEA.Read_until().decode('ASCII')
-                dato = self.Read_until().decode('ASCII')
-            dato = re.search(patron, dato)
-            self._comm_NMEA.close()
+            if not (self.persistent and self.is_open):
+                if self.persistent and self._comm_NMEA is not None:
+                    self.reconexiones += 1
+                self.open()
+                if not self.persistent:
+                    self._comm_NMEA.reset_input_buffer()  # Borro buffer del puerto serie
+            dato = self.Decode(self.Read_until())
+            while dato is None:
+                dato = self.Decode(self.Read_until())
+            self.sentencias += 1
+            if not self.persistent:
+                self._comm_NMEA.close()
         except TimeoutError:
-            self._comm_NMEA.close()
+            if not self.persistent:
+                self._comm_NMEA.close()
             raise TimeoutError
         except serial.SerialException:
-            # -- Error al abrir el puerto serie
+            # -- Error al abrir el puerto serie. En modo persistente se reconecta en la proxima lectura
+            self.close()
             print('Ocurrio un error al intentar de abrir el puerto serie seleccionado.\r\n \
                     No se pudo completar la operacion. Puerto %s' % (str(self.port)))
         self.NMEA_data = dato
@@ -190,19 +226,7 @@ class NMEA(object):
         Read until an expected sequence is found ('\n' by default), the size
         is exceeded or until timeout occurs.
         """
-        lenterm = len(expected)
-        line = bytearray()
-        timeout = Timeout(self.timeout)
-        while True:
-            c = self._comm_NMEA.read(1)
-            if c:
-                line += c
-                if line[-lenterm:] == expected:
-                    break
-                if size is not None and len(line) >= size:
-                    break
-            else:
-                raise TimeoutError
-            if timeout.expired():
-                break
-        return bytes(line)
+        if self._framer is None or self._framer.ser is not self._comm_NMEA:
+            self._framer = LineFramer(self._comm_NMEA, expected, captura=self.captura)
+        self._framer.expected = expected
+        return self._framer.readline(size)
@@ -0,0 +1,194 @@
+import datetime
+import logging
+
+import serial
+
+from app.NMEA import NMEA
+from app.Framer import Timeout
+from app.Sentencias import split_sentence, formato_hora, formato_fecha, DECODIFICADORES
+
+
+class NMEA_Mux(NMEA):
+    """
+    Lee una sola vez el puerto NMEA y decodifica todas las sentencias conocidas
+    (RMC, GGA, VTG, ZDA, HDT, DBS, DBT) que llegan por el mismo puerto.
+    Cada linea se despacha a su decodificador por talker + sentencia y el
+    resultado se combina en un unico estado de navegacion.
+    Los parametros a ingresar son:
+        - port: número del puerto serie (COM1 por defecto)
+        - BR: Baud rate del puerto (4800 por defecto)
+        - timeout: tiempo de espera del puerto (2 segundos por defecto)
+        - vencimiento: segundos que un valor sigue valido sin volver a llegar
+          (10 segundos por defecto, None para no vencer nunca)
+    Si el GPS pierde el fix (RMC con estado 'V' o GGA con calidad 0) se borra
+    la posicion, asi no se sigue informando la ultima como buena.
+    Funciones a utilizar:
+        - Read: lee las lineas disponibles y actualiza el estado
+        - feed: decodifica una linea ya leida
+        - fix_nuevo: True si hay que publicar la posicion (una vez por fix)
+        - Get_State: copia del estado de navegacion combinado
+    """
+
+    # Claves que se borran al perder el fix
+    POSICION = ('lat', 'lon')
+    # Sentencias con hora y posicion del mismo instante: solo estas publican la posicion.
+    # Las demas (VTG, ZDA, HDT) se combinan en el estado sin publicar
+    FIX = ('RMC', 'GGA')
+
+    def __init__(self, port='COM1', BR=4800, timeout=2, vencimiento=10):
+        NMEA.__init__(self, port, BR, timeout, sts=None, persistent=True)
+        self.state = dict()
+        self.vencimiento = vencimiento
+        # Ultimo instante (monotonic) en que se decodifico cada sentencia
+        self.actualizado = dict()
+        # Ultimo instante (monotonic) en que llego cada clave del estado
+        self._llegada = dict()
+        # Hora GPS de la ultima posicion publicada
+        self._publicada = None
+        # Direccion completa (ej: 'GPRMC') -> decodificador, None si no se conoce
+        self._despacho = dict()
+        self.descartadas = 0
+
+    def _despachar(self, talker, sentencia):
+        direccion = talker + sentencia
+        try:
+            return self._despacho[direccion]
+        except KeyError:
+            decodificador = DECODIFICADORES.get(sentencia)
+            self._despacho[direccion] = decodificador
+            return decodificador
+
+    def feed(self, line):
+        """
+        Decodifica una linea y la combina en el estado de navegacion.
+        Regresa el identificador de la sentencia o None si no se reconocio.
+        """
+        partes = split_sentence(line)
+        if partes is None:
+            self.descartadas += 1
+            self.errores += 1
+            return None
+        talker, sentencia, campos = partes
+        decodificador = self._despachar(talker, sentencia)
+        if decodificador is None:
+            self.descartadas += 1
+            return None
+        valores = decodificador(campos)
+        if valores is None:
+            self.descartadas += 1
+            self.errores += 1
+            return None
+        ahora = Timeout.TIME()
+        if valores.get('estado') == 'V' or valores.get('calidad') == 0:
+            # Sin fix: la posicion de la sentencia no vale y la anterior tampoco
+            for clave in self.POSICION:
+                valores.pop(clave, None)
+                self.state.pop(clave, None)
+        for clave, valor in valores.items():
+            if valor is not None:
+                self.state[clave] = valor
+                self._llegada[clave] = ahora
+        self.actualizado[sentencia] = ahora
+        return sentencia
+
+    def fix_nuevo(self, sentencias):
+        """
+        True si entre las 'sentencias' decodificadas hay una RMC o GGA de un
+        instante que todavia no se publico (RMC y GGA del mismo segundo
+        publican una sola vez).
+        """
+        if all(sentencia not in self.FIX for sentencia in sentencias):
+            return False
+        hora = self._valor('hora')
+        if hora is not None and hora == self._publicada:
+            return False
+        self._publicada = hora
+        return True
+
+    def _valor(self, clave):
+        """Valor de 'clave' en el estado, o None si no llego o ya vencio."""
+        valor = self.state.get(clave)
+        if valor is not None and self.vencimiento is not None \
+                and Timeout.TIME() - self._llegada[clave] > self.vencimiento:
+            del self.state[clave]
+            return None
+        return valor
+
+    def Read(self):
+        """
+        Lee todas las lineas disponibles en el puerto y actualiza el estado.
+        Regresa el conjunto de sentencias decodificadas en la lectura.
+        """
+        if not self.is_open:
+            if self._comm_NMEA is not None:
+                self.reconexiones += 1
+            try:
+                self.open()
+            except serial.SerialException as e:
+                self._comm_NMEA = None
+                logging.critical(f'No se pudo abrir el puerto NMEA {self.port}: {e}')
+                raise
+        try:
+            lines = self._framer.read_lines()
+        except serial.SerialException:
+            self.close()
+            raise
+        leidas = set()
+        for line in lines:
+            sentencia = self.feed(line)
+            if sentencia is not None:
+                leidas.add(sentencia)
+                self.sentencias += 1
+        return leidas
+
+    def Get_State(self):
+        """Regresa una copia del estado de navegacion combinado (sin los valores vencidos)."""
+        for clave in list(self.state):
+            self._valor(clave)
+        return dict(self.state)
+
+    def Get_DateTime(self):
+        """Regresa la fecha y hora GPS como datetime.datetime o None."""
+        fecha = self._valor('fecha')
+        hora = self._valor('hora')
+        if fecha is None or hora is None:
+            return None
+        return datetime.datetime(fecha.year, fecha.month, fecha.day) + datetime.timedelta(seconds=hora)
+
+    # Accesores con el mismo formato que RMC y DBS
+    def Get_Time(self, sep=':'):
+        return formato_hora(self._valor('hora'), sep)
+
+    def Get_Date(self, sep='/'):
+        return formato_fecha(self._valor('fecha'), sep)
+
+    def Get_Latitud_Grados(self):
+        lat = self._valor('lat')
+        return None if lat is None else str(round(lat, 6))
+
+    def Get_Longitud_Grados(self):
+        lon = self._valor('lon')
+        return None if lon is None else str(round(lon, 6))
+
+    def _grados_minutos(self, valor, hemisferios):
+        if valor is None:
+            return None
+        grados = int(abs(valor))
+        minutos = (abs(valor) - grados) * 60
+        return f"{grados} {minutos:07.4f} {hemisferios[0] if valor < 0 else hemisferios[1]}"
+
+    def Get_Lat_GradosMinutos(self):
+        return self._grados_minutos(self._valor('lat'), 'SN')
+
+    def Get_Lon_GradosMinutos(self):
+        return self._grados_minutos(self._valor('lon'), 'WE')
+
+    def Get_Speed(self):
+        velocidad = self._valor('velocidad')
+        return None if velocidad is None else str(velocidad)
+
+    def Get_Z_Metros(self):
+        prof = self._valor('profundidad')
+        if prof is None:
+            prof = self._valor('profundidad_transductor')
+        return 'NaN' if prof is None else str(prof)
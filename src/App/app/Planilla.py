@@ -0,0 +1,117 @@
+"""
+Exportacion de una estacion a la planilla de Excel (Planilla_V1.xlsx).
+
+Lee el archivo de texto de la estacion (EstNNNN.txt, una linea por evento:
+NMEA, Cub, Sup, Fdo y Bott) y llena las celdas de la hoja 'Hoja1' de la
+plantilla. Lo usan click_btn_Exportar y el caso 'exportar' de bench.suite.
+"""
+
+
+def llenar(planilla, dato, campania):
+    """
+    Llena las celdas de la hoja con las lineas de la estacion.
+    Los parametros a ingresar son:
+        - planilla: hoja 'Hoja1' de la plantilla
+        - dato: lineas del archivo EstNNNN.txt
+        - campania: siglas del buque + año + numero de campaña (celda A2)
+    """
+    planilla['A2'] = campania
+    flag_nmea = True
+    flag_cub = True
+    flag_sup = True
+    for i in dato:
+        i = i.replace('\n', '')
+        i = i.split(',')
+        if 'NMEA' in i:
+            if flag_nmea:
+                planilla['F2'] = i[1]
+                planilla['A6'] = '%.4f' % (float(i[2]))
+                planilla['E6'] = '%.4f' % (float(i[3]))
+                planilla['J2'] = i[4]
+                planilla['O2'] = i[5]
+                if not (i[6] == 'NaN'):
+                    planilla['Q6'] = str(round(float(i[6])))
+                else:
+                    planilla['Q6'] = i[6]
+                flag_nmea = False
+            else:
+                planilla['I6'] = '%.4f' % (float(i[2]))
+                planilla['M6'] = '%.4f' % (float(i[3]))
+                planilla['T2'] = i[4]
+                planilla['Y2'] = i[5]
+                if not (i[6] == 'NaN'):
+                    planilla['S6'] = str(round(float(i[6])))
+                else:
+                    planilla['S6'] = 'NaN'
+        elif 'Cub' in i:
+            if flag_cub:
+                planilla['E9'] = i[2][0:5]
+                planilla['H9'] = '%.1f' % (float(i[4]))
+                planilla['L9'] = '%.3f' % (float(i[5]))
+                planilla['P9'] = '%.3f' % (float(i[6]))
+                planilla['S9'] = '%.3f' % (float(i[7]))
+                flag_cub = False
+            else:
+                planilla['E13'] = i[2][0:5]
+                planilla['H13'] = '%.1f' % (float(i[4]))
+                planilla['L13'] = '%.3f' % (float(i[5]))
+                planilla['P13'] = '%.3f' % (float(i[6]))
+                planilla['S13'] = '%.3f' % (float(i[7]))
+
+        elif 'Sup' in i:
+            if flag_sup:
+                planilla['E10'] = i[2][0:5]
+                planilla['H10'] = '%.1f' % (float(i[4]))
+                planilla['L10'] = '%.3f' % (float(i[5]))
+                planilla['P10'] = '%.3f' % (float(i[6]))
+                planilla['S10'] = '%.3f' % (float(i[7]))
+                planilla['W10'] = '%.3f' % (float(i[9]))
+                planilla['Z10'] = '%.3f' % (float(i[10]))
+                planilla['AC10'] = '%.0f' % (float(i[8]))
+                planilla['AG10'] = i[11]
+                # Delta Temp y Sal
+                planilla['E27'] = '%.3f' % (float(i[12]))
+                planilla['E28'] = '%.4f' % (float(i[13]))
+                flag_sup = False
+            else:
+                planilla['E12'] = i[2][0:5]
+                planilla['H12'] = '%.1f' % (float(i[4]))
+                planilla['L12'] = '%.3f' % (float(i[5]))
+                planilla['P12'] = '%.3f' % (float(i[6]))
+                planilla['S12'] = '%.3f' % (float(i[7]))
+                planilla['W12'] = '%.3f' % (float(i[9]))
+                planilla['Z12'] = '%.3f' % (float(i[10]))
+                planilla['AC12'] = '%.0f' % (float(i[8]))
+                planilla['AG12'] = i[11]
+
+        elif 'Fdo' in i:
+            planilla['E11'] = i[2][0:5]
+            planilla['H11'] = '%.1f' % (float(i[4]))
+            planilla['L11'] = '%.3f' % (float(i[5]))
+            planilla['P11'] = '%.3f' % (float(i[6]))
+            planilla['S11'] = '%.3f' % (float(i[7]))
+        elif 'Bott' in i:
+            bot = int(i[-1])
+            fila = 16 + bot
+            if fila <= 22:
+                planilla['B' + str(fila)] = i[2][0:5]
+                planilla['E' + str(fila)] = '%.1f' % (float(i[4]))
+                planilla['H' + str(fila)] = '%.3f' % (float(i[5]))
+                planilla['M' + str(fila)] = '%.3f' % (float(i[6]))
+            else:
+                fila = 10 + bot
+                planilla['T' + str(fila)] = i[2][0:5]
+                planilla['W' + str(fila)] = '%.1f' % (float(i[4]))
+                planilla['Z' + str(fila)] = '%.3f' % (float(i[5]))
+                planilla['AE' + str(fila)] = '%.3f' % (float(i[6]))
+
+
+def exportar(plantilla, archivo_est, destino, campania):
+    """Carga la plantilla, la llena con el archivo de la estacion y la guarda en 'destino'."""
+    import openpyxl
+    xls = openpyxl.load_workbook(plantilla)
+    planilla = xls['Hoja1']
+    with open(archivo_est, 'r') as R_File:
+        dato = R_File.readlines()
+    llenar(planilla, dato, campania)
+    xls.save(destino)
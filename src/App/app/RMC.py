@@ -9,32 +9,24 @@
 # Licence:     <your licence>
 #-------------------------------------------------------------------------------
 from app.NMEA import NMEA
+from app.Sentencias import formato_hora, formato_fecha
 import datetime
 
 class RMC(NMEA):
-    def __init__(self, port = 'COM1', BR = 4800, timeout = 2, sts = 'RMC'):
-        #expreg_nmea = "\\$??(?P<sentencia>.*?)[\\,|\\, ](?P<hour>\\d{1,2})(?P<min>\\d{1,2})(?P<sec>\\d{1,2})" +\
-        #"\\.(?P<msec>\\d{1,3})[\\,|\\, ](?P<status>.*?)[\\,|\\, ](?P<Lat>\\d{1,2})(?P<Lat_min>\\d{1,2}[\\.|\\,]"+\
-        #"\\d{1,6})[\\,|\\, ](?P<Lat_cuadrante>[N|n|S|s])[\\,|\\, ](?P<Lon>\\d{1,3})(?P<Lon_min>\\d{1,2}[\\.|\\,]"+\
-        #"\\d{1,6})[\\,|\\, ](?P<Lon_cuadrante>[W|w|E|e])[\\,|\\, ](?P<Speed>\\d{1,3}\\.\\d{1,2})[\\,|\\, ](?P<Dir>"+\
-        #"\\d{1,3}\\.\\d{1,2})[\\,|\\, ](?P<dia>\\d{1,2})(?P<Mes>\\d{1,2})(?P<Año>\\d{1,4})[\\,|\\, ](?P<value>.*?)\\r?\\n"
-
-        expreg_nmea = "\\$??(?P<sentencia>.*?)[\\,|\\, ](?P<hour>\\d{1,2})(?P<min>\\d{1,2})(?P<sec>\\d{1,2})" +\
-        "[\\.(?P<msec>\\d{1,3})|\\][\\,|\\, ](?P<status>.*?)[\\,|\\, ](?P<Lat>\\d{1,2})(?P<Lat_min>\\d{1,2}[\\.|\\,]"+\
-        "\\d{1,6})[\\,|\\, ](?P<Lat_cuadrante>[N|n|S|s])[\\,|\\, ](?P<Lon>\\d{1,3})(?P<Lon_min>\\d{1,2}[\\.|\\,]"+\
-        "\\d{1,6})[\\,|\\, ](?P<Lon_cuadrante>[W|w|E|e])[\\,|\\, ](?P<Speed>\\d{1,3}\\.\\d{1,2})[\\,|\\, ](?P<Dir>"+\
-        "\\d{1,3}\\.\\d{1,2})[\\,|\\, ](?P<dia>\\d{1,2})(?P<Mes>\\d{1,2})(?P<Año>\\d{1,4})[\\,|\\, ](?P<value>.*?)\\r?\\n"
-
-        NMEA.__init__(self, port, BR, timeout, sts, expreg_nmea)
+    """
+    Sentencia RMC. Se decodifica separando campos y validando el checksum;
+    latitud, longitud y hora se convierten a numeros una sola vez al leer.
+    """
+    def __init__(self, port = 'COM1', BR = 4800, timeout = 2, sts = 'RMC', persistent = False):
+        NMEA.__init__(self, port, BR, timeout, sts, None, persistent)
 
     def Get_Time(self, sep=':'):
         """ Regresa la hora de NMEA HH:MM:SS
         -sep = separador para formato de hora. Por defecto ':'
         """
         try:
-            time = self.NMEA_data['hour'].zfill(2)+str(sep)+self.NMEA_data['min'].zfill(2)+str(sep)+self.NMEA_data['sec'].zfill(2)
-            return (time)
-        except AttributeError:
+            return formato_hora(self.NMEA_data['hora'], sep)
+        except TypeError:
             return None
 
     def Get_Date(self, sep='/'):
@@ -42,16 +34,16 @@ class RMC(NMEA):
         -sep = separador para formato de fecha. Por defecto '/'
         """
         try:
-            date = self.NMEA_data['dia'].zfill(2)+str(sep)+self.NMEA_data['Mes'].zfill(2)+str(sep)+self.NMEA_data['Año'].zfill(2)
-            return (date)
-        except AttributeError:
+            return formato_fecha(self.NMEA_data['fecha'], sep)
+        except TypeError:
             return None
 
     def Get_DateTime(self):
         """ Regresa la fecha y hora de NMEA como clase datetime.datetime, luego dar el formato desea"""
         try:
-            fechahora = datetime.datetime(int('20'+self.NMEA_data['Año']),int(self.NMEA_data['Mes']),int(self.NMEA_data['dia']),int(self.NMEA_data['hour']),\
-            int(self.NMEA_data['min']),int(self.NMEA_data['sec']))
+            fecha = self.NMEA_data['fecha']
+            fechahora = datetime.datetime(fecha.year, fecha.month, fecha.day) +\
+                datetime.timedelta(seconds=int(self.NMEA_data['hora']))
             return (fechahora)
         except:
             return None
@@ -59,47 +51,36 @@ class RMC(NMEA):
     def Get_Latitud_Grados(self):
         """Regresa el valor de latitud expresado en grados y decimas de grado DD.DDDD"""
         try:
-            lat = round(float(self.NMEA_data['Lat']) + float(self.NMEA_data['Lat_min'])/60, 6)
-            if 's' in self.NMEA_data['Lat_cuadrante'].lower():
-                return str(lat * -1)
-            else:
-                return str(lat)
-        except AttributeError:
+            return str(round(self.NMEA_data['lat'], 6))
+        except TypeError:
             return None
 
     def Get_Longitud_Grados(self):
         """Regresa el valor de longitud expresado en grados y decimas de grado DDD.DDDD"""
         try:
-            lon = round(float(self.NMEA_data['Lon']) + float(self.NMEA_data['Lon_min'])/60, 6)
-            if 'w' in self.NMEA_data['Lon_cuadrante'].lower():
-                return str(lon * -1)
-            else:
-                return str(lon)
-        except AttributeError:
+            return str(round(self.NMEA_data['lon'], 6))
+        except TypeError:
             return None
 
     def Get_Lat_GradosMinutos(self):
         """Regresa el valor de Latitud en grados y minutos"""
         try:
-            lat = (self.NMEA_data['Lat'] + ' ' + self.NMEA_data['Lat_min'] + ' ' +\
-                self.NMEA_data['Lat_cuadrante'])
-            return lat
-        except AttributeError:
+            lat = self.NMEA_campos[3]
+            return lat[:2] + ' ' + lat[2:] + ' ' + self.NMEA_campos[4]
+        except TypeError:
             return None
 
     def Get_Lon_GradosMinutos(self):
         """Regresa el valor de longitud en grados y minutos"""
         try:
-            lon = (self.NMEA_data['Lon'] + ' ' + self.NMEA_data['Lon_min'] + ' ' +\
-                self.NMEA_data['Lon_cuadrante'])
-            return lon
-        except AttributeError:
+            lon = self.NMEA_campos[5]
+            return lon[:3] + ' ' + lon[3:] + ' ' + self.NMEA_campos[6]
+        except TypeError:
             return None
 
     def Get_Speed(self):
         """Regresa la velocidad"""
         try:
-            speed = self.NMEA_data['Speed']
-            return speed
-        except AttributeError:
-            return None 
\ No newline at end of file
+            return self.NMEA_campos[7]
+        except TypeError:
+            return None
@@ -0,0 +1,198 @@
+"""
+Reconstruccion de las estaciones de una campaña a partir de las capturas.
+
+Reproduce las capturas de todos los puertos (replay:// lo mas rapido posible),
+decodifica cada linea con los mismos canales que el motor de adquisicion y,
+para cada estacion del JSON de la campaña, vuelve a tomar los datos en los
+instantes registrados con hora GPS:
+    - Inicio / Fin: posicion y batimetria
+    - Superficie: datos de CTD y TSG y las diferencias alineadas (Alineacion)
+Cubierta, Fondo y Botellas no guardan hora y quedan como estan.
+
+Los datos se ubican en el tiempo con la hora de la PC con que se grabo cada
+bloque, que (a diferencia de monotonic) sigue creciendo entre sesiones.
+
+Uso (desde src/App, con el config.json de la campaña):
+    python -m app.Reconstruccion campaña.json Capturas/ -o reconstruida.json
+"""
+import argparse
+import calendar
+import copy
+import datetime
+import heapq
+import json
+import logging
+from collections import deque
+
+import serial
+
+from app.Adquisicion import CanalNMEA, CanalColumnas
+from app.Alineacion import Alineacion
+from app import Fragmentos
+from app.Muestras import a_json
+from app.RingBuffer import Almacen
+from app import protocolos  # noqa: F401
+
+# Segundos de datos posteriores a un instante que se esperan antes de reconstruirlo
+MARGEN = 30
+
+
+def hora_gps(fecha, hora):
+    """Segundos UTC de una fecha DDMMYY y una hora HH:MM:SS, o None si no son validas."""
+    try:
+        instante = datetime.datetime.strptime(str(fecha) + str(hora), '%d%m%y%H:%M:%S')
+    except ValueError:
+        return None
+    return calendar.timegm(instante.timetuple())
+
+
+def eventos(estructura):
+    """Instantes con hora GPS de cada estacion como (hora GPS, estacion, tipo, clave)."""
+    lista = list()
+    for nro, estacion in estructura['Estaciones'].items():
+        fecha = estacion['FechaHora']['Inicio']['FechaGMT']
+        inicio = None
+        for tipo in ('Inicio', 'Fin'):
+            t = hora_gps(estacion['FechaHora'][tipo]['FechaGMT'], estacion['FechaHora'][tipo]['HoraGMT'])
+            if t is not None:
+                lista.append((t, nro, tipo, None))
+                inicio = t if tipo == 'Inicio' else inicio
+        for clave, registro in estacion['Superficie'].items():
+            t = hora_gps(fecha, registro.get('Hora'))
+            if t is None:
+                continue
+            if inicio is not None and t < inicio:
+                # La estacion paso la medianoche
+                t += 86400
+            lista.append((t, nro, 'Superficie', clave))
+    return sorted(lista, key=lambda evento: evento[0])
+
+
+class Reconstruccion(object):
+    """
+    Reconstruye los datos con hora GPS de las estaciones a partir de las capturas.
+    Los parametros a ingresar son:
+        - cfg: diccionario de configuracion (config.json) con los puertos de la campaña
+        - capturas: archivo o directorio con las capturas de app.Captura
+        - tolerancia: segundos maximos entre el instante buscado y el dato usado
+    Funciones a utilizar:
+        - reconstruir: regresa una copia de la estructura con los datos reconstruidos
+    """
+
+    def __init__(self, cfg, capturas, tolerancia=5):
+        self.cfg = cfg
+        self.capturas = capturas
+        self.tolerancia = tolerancia
+        conf = cfg['Configuracion']
+        self.almacen = Almacen(cfg)
+        self.alineacion = Alineacion(self.almacen,
+                                     ventana=conf.get('Superficie', {}).get('Ventana', 10),
+                                     margen=conf['TSG']['Intervalo'] + 1)
+        # Ultimos valores decodificados, tal como los recibe la ventana
+        self.historia = {señal: deque(maxlen=8192) for señal in ('NMEA', 'DBS', 'CTD', 'TSG')}
+        self.canales = list()
+        nmea = conf['NMEA']['Status'] == '2'
+        bat = conf['Batimetria']['Status'] == '2'
+        if nmea:
+            comparte = bat and conf['Batimetria']['Port'] == conf['NMEA']['Port']
+            self.canales.append(CanalNMEA('NMEA', self._url('NMEA'), 9600, profundidad=comparte))
+            bat = bat and not comparte
+        if bat:
+            self.canales.append(CanalNMEA('Batimetria', self._url('Batimetria'), 9600,
+                                          posicion=False, profundidad=True))
+        for seccion in ('CTD', 'TSG'):
+            if conf[seccion]['Status'] == '2':
+                self.canales.append(CanalColumnas(seccion, self._url(seccion), 9600, 0, conf[seccion]['filas']))
+        self.reconstruidos = 0
+
+    def _url(self, seccion):
+        port = self.cfg['Configuracion'][seccion]['Port']
+        return f"replay://{self.capturas}?puerto={port}&velocidad=0"
+
+    @staticmethod
+    def _flujo(canal):
+        """Lineas del canal como (hora de grabacion, canal, lineas) hasta terminar la captura."""
+        while not canal.ser.terminado:
+            lineas = canal.read()
+            if lineas:
+                yield canal.ser.hora_captura, canal, lineas
+
+    def _cercano(self, señal, t):
+        """Valor de 'señal' mas cercano al instante t, o None si no hay ninguno dentro de la tolerancia."""
+        mejor = min(self.historia[señal], key=lambda item: abs(item[0] - t), default=None)
+        if mejor is None or abs(mejor[0] - t) > self.tolerancia:
+            return None
+        return mejor[1]
+
+    def _aplicar(self, estructura, t_gps, nro, tipo, clave):
+        t = self.almacen.reloj.a_mono(t_gps)
+        estacion = estructura['Estaciones'][nro]
+        if tipo in ('Inicio', 'Fin'):
+            posicion = self._cercano('NMEA', t)
+            if posicion is not None:
+                estacion['Posicion'][tipo]['Latitud'] = posicion['latD']
+                estacion['Posicion'][tipo]['Longitud'] = posicion['lonD']
+                self.reconstruidos += 1
+            profundidad = self._cercano('DBS', t)
+            if profundidad is not None:
+                estacion['Batimetria'][tipo] = str(profundidad)
+            return
+        registro = estacion['Superficie'][clave]
+        ctd, tsg = self._cercano('CTD', t), self._cercano('TSG', t)
+        if ctd is None and tsg is None:
+            return
+        if ctd is not None:
+            registro['CTD'] = a_json(ctd)
+        if tsg is not None:
+            registro['TSG'] = a_json(tsg)
+        registro.update(self.alineacion.comparar(t))
+        self.reconstruidos += 1
+
+    def reconstruir(self, estructura):
+        estructura = copy.deepcopy(estructura)
+        pendientes = deque(eventos(estructura))
+        flujos = list()
+        for canal in self.canales:
+            try:
+                canal.open()
+            except (serial.SerialException, OSError) as e:
+                logging.warning(f'{canal.nombre}: {e}')
+                continue
+            flujos.append(self._flujo(canal))
+        reloj = self.almacen.reloj
+        for t, canal, lineas in heapq.merge(*flujos, key=lambda item: item[0]):
+            for line in lineas:
+                for señal, valor in canal.decode(line, t):
+                    self.almacen.agregar(señal, valor, t)
+                    self.historia[señal].append((t, valor))
+            while pendientes and reloj.offset is not None and reloj.a_mono(pendientes[0][0]) + MARGEN <= t:
+                self._aplicar(estructura, *pendientes.popleft())
+        while pendientes and reloj.offset is not None:
+            self._aplicar(estructura, *pendientes.popleft())
+        for canal in self.canales:
+            canal.close()
+        return estructura
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('campaña', help='JSON de la campaña')
+    parser.add_argument('capturas', help='archivo o directorio de capturas')
+    parser.add_argument('-o', '--salida', required=True, help='JSON reconstruido')
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--tolerancia', type=float, default=5)
+    args = parser.parse_args(argv)
+
+    with open(args.config) as archivo:
+        cfg = json.load(archivo)
+    # La campaña puede estar en un solo JSON o por estaciones (app.Fragmentos)
+    estructura = Fragmentos.leer(args.campaña)
+    reconstruccion = Reconstruccion(cfg, args.capturas, args.tolerancia)
+    resultado = reconstruccion.reconstruir(estructura)
+    with open(args.salida, 'w') as archivo:
+        json.dump(resultado, archivo, indent=4)
+    print(f'{reconstruccion.reconstruidos} registros reconstruidos en {args.salida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Buffers circulares con marca de tiempo para los datos de cada instrumento.
+
+Cada RingBuffer guarda, en arreglos de numpy de tamaño fijo, las columnas
+numericas de las ultimas 'capacidad' muestras junto con el instante de llegada
+(time.monotonic) y la hora GPS estimada (segundos UTC). Como las muestras llegan
+en orden, el instante de llegada esta ordenado y la muestra mas cercana a un
+instante se encuentra por busqueda binaria (np.searchsorted), en O(log n).
+"""
+import calendar
+import datetime
+import warnings
+
+import numpy as np
+
+from app.Muestras import Muestra
+from app.Esquema import esquemas
+
+# Columnas numericas que se guardan de la posicion
+COLUMNAS_NMEA = ('latD', 'lonD', 'Velocidad')
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class RingBuffer(object):
+    """
+    Buffer circular de muestras numericas.
+    Los parametros a ingresar son:
+        - columnas: nombres de las variables
+        - capacidad: cantidad maxima de muestras (las mas viejas se descartan)
+    Funciones a utilizar:
+        - append: agrega una muestra (app.Muestras.Muestra o diccionario variable -> valor)
+        - extend: agrega de una vez las filas de un arreglo con las mismas columnas
+        - nearest: muestra mas cercana a un instante
+        - window / ultimos: muestras entre dos instantes o de los ultimos segundos
+        - media: promedio de los ultimos segundos
+    """
+
+    def __init__(self, columnas, capacidad=8192):
+        self.columnas = tuple(columnas)
+        self.capacidad = capacidad
+        self._col = {k: i for i, k in enumerate(self.columnas)}
+        self.datos = np.full((capacidad, len(self.columnas)), np.nan)
+        self.t_mono = np.full(capacidad, np.nan)
+        self.t_gps = np.full(capacidad, np.nan)
+        # Cantidad total de muestras agregadas
+        self._n = 0
+
+    def __len__(self):
+        return min(self._n, self.capacidad)
+
+    @property
+    def _inicio(self):
+        """Posicion en los arreglos de la muestra mas vieja."""
+        return self._n % self.capacidad if self._n > self.capacidad else 0
+
+    def append(self, valores, t_mono, t_gps=np.nan):
+        i = self._n % self.capacidad
+        fila = self.datos[i]
+        if isinstance(valores, Muestra):
+            # Los numeros ya vienen convertidos; con las mismas columnas se copian de una vez
+            if len(valores.numeros) == len(self.columnas) and valores.claves == self.columnas:
+                fila[:] = valores.numeros
+            else:
+                fila[:] = np.nan
+                for k, v in zip(valores.claves, valores.numeros):
+                    j = self._col.get(k)
+                    if j is not None:
+                        fila[j] = v
+        else:
+            fila[:] = np.nan
+            for k, v in valores.items():
+                j = self._col.get(k)
+                if j is not None:
+                    fila[j] = _numero(v)
+        self.t_mono[i] = t_mono
+        self.t_gps[i] = t_gps
+        self._n += 1
+
+    def extend(self, datos, t_mono, t_gps=np.nan):
+        """
+        Agrega las filas de 'datos' (arreglo (n, columnas) en el orden de 'columnas').
+        t_mono y t_gps pueden ser un valor para todas las filas o un arreglo por fila.
+        """
+        n = len(datos)
+        if not n:
+            return
+        t_mono = np.broadcast_to(t_mono, n)
+        t_gps = np.broadcast_to(t_gps, n)
+        if n > self.capacidad:
+            # Solo entran las ultimas; las anteriores se hubieran descartado igual
+            self._n += n - self.capacidad
+            datos, t_mono, t_gps = datos[-self.capacidad:], t_mono[-self.capacidad:], t_gps[-self.capacidad:]
+            n = self.capacidad
+        i = self._n % self.capacidad
+        # Hasta el final de los arreglos y el resto desde el principio
+        primero = min(n, self.capacidad - i)
+        for destino, origen in ((self.datos, datos), (self.t_mono, t_mono), (self.t_gps, t_gps)):
+            destino[i:i + primero] = origen[:primero]
+            destino[:n - primero] = origen[primero:]
+        self._n += n
+
+    def _indices(self, desde, hasta):
+        """Posiciones en los arreglos de las muestras desde..hasta (en orden de llegada)."""
+        return (self._inicio + np.arange(desde, hasta)) % self.capacidad
+
+    def _buscar(self, t, side='left'):
+        """Posicion (en orden de llegada) donde se insertaria el instante t."""
+        n = len(self)
+        inicio = self._inicio
+        if inicio == 0:
+            return int(np.searchsorted(self.t_mono[:n], t, side))
+        # Buffer lleno y girado: dos tramos ordenados, [inicio:] y luego [:inicio]
+        primero = self.t_mono[inicio:]
+        if t > primero[-1] or (side == 'right' and t == primero[-1]):
+            return len(primero) + int(np.searchsorted(self.t_mono[:inicio], t, side))
+        return int(np.searchsorted(primero, t, side))
+
+    def _muestra(self, i):
+        fila = self.datos[i]
+        muestra = {k: fila[j] for j, k in enumerate(self.columnas)}
+        muestra['t_mono'] = self.t_mono[i]
+        muestra['t_gps'] = self.t_gps[i]
+        return muestra
+
+    def latest(self):
+        if not self._n:
+            return None
+        return self._muestra((self._n - 1) % self.capacidad)
+
+    def nearest(self, t, tolerancia=None):
+        """
+        Regresa la muestra (diccionario con las columnas, t_mono y t_gps) mas
+        cercana al instante monotonic t, o None si no hay ninguna a menos de
+        'tolerancia' segundos.
+        """
+        n = len(self)
+        if not n:
+            return None
+        pos = self._buscar(t)
+        candidatos = [p for p in (pos - 1, pos) if 0 <= p < n]
+        i = min(self._indices(candidatos[0], candidatos[-1] + 1), key=lambda i: abs(self.t_mono[i] - t))
+        if tolerancia is not None and abs(self.t_mono[i] - t) > tolerancia:
+            return None
+        return self._muestra(i)
+
+    def window(self, t_ini, t_fin):
+        """Regresa (t_mono, t_gps, datos) de las muestras con t_ini <= t_mono <= t_fin."""
+        indices = self._indices(self._buscar(t_ini, 'left'), self._buscar(t_fin, 'right'))
+        return self.t_mono[indices], self.t_gps[indices], self.datos[indices]
+
+    def ultimos(self, segundos, ahora=None):
+        """Muestras de los ultimos 'segundos' hasta 'ahora' (por defecto la ultima muestra)."""
+        if ahora is None:
+            if not self._n:
+                ahora = 0.0
+            else:
+                ahora = self.t_mono[(self._n - 1) % self.capacidad]
+        return self.window(ahora - segundos, ahora)
+
+    def media(self, segundos, ahora=None):
+        """Promedio (ignorando NaN) de cada columna en los ultimos 'segundos'."""
+        _, _, datos = self.ultimos(segundos, ahora)
+        if not len(datos):
+            return {k: np.nan for k in self.columnas}
+        with warnings.catch_warnings():
+            # Columnas sin ningun dato: nanmean avisa y regresa NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            medias = np.nanmean(datos, axis=0)
+        return dict(zip(self.columnas, medias))
+
+
+class RelojGPS(object):
+    """
+    Relaciona el reloj monotonic de la PC con la hora GPS a partir de las
+    posiciones recibidas, para asignar hora GPS a los datos de los otros instrumentos.
+    """
+
+    def __init__(self):
+        self.offset = None
+
+    def actualizar(self, posicion, t_mono):
+        """Toma 'fecha' (DDMMYY) y 'hora' (HH:MM:SS) de la posicion emitida por el GPS."""
+        try:
+            fecha = datetime.datetime.strptime(posicion['fecha'] + posicion['hora'], '%d%m%y%H:%M:%S')
+        except (KeyError, TypeError, ValueError):
+            return
+        self.offset = calendar.timegm(fecha.timetuple()) - t_mono
+
+    def a_gps(self, t_mono):
+        return np.nan if self.offset is None else t_mono + self.offset
+
+    def a_mono(self, t_gps):
+        return np.nan if self.offset is None else t_gps - self.offset
+
+
+class Almacen(object):
+    """
+    Un RingBuffer por instrumento ('NMEA', 'DBS', 'CTD', 'TSG') y el reloj GPS.
+    Recibe lo mismo que las funciones onIntReady* de la ventana, con el
+    instante de llegada de cada dato.
+    """
+
+    def __init__(self, cfg, capacidad=8192):
+        self.esquemas = esquemas(cfg)
+        self.buffers = {
+            'NMEA': RingBuffer(COLUMNAS_NMEA, capacidad),
+            'DBS': RingBuffer(('Z',), capacidad),
+            'CTD': RingBuffer(self.esquemas['CTD'].claves, capacidad),
+            'TSG': RingBuffer(self.esquemas['TSG'].claves, capacidad),
+        }
+        self.reloj = RelojGPS()
+
+    def __getitem__(self, señal):
+        return self.buffers[señal]
+
+    def agregar(self, señal, valor, t_mono):
+        buffer = self.buffers.get(señal)
+        if buffer is None:
+            return
+        if señal == 'NMEA':
+            self.reloj.actualizar(valor, t_mono)
+        elif señal == 'DBS':
+            valor = {'Z': valor}
+        buffer.append(valor, t_mono, self.reloj.a_gps(t_mono))
+
+    def extender(self, señal, datos, t_mono):
+        """Agrega las filas de un app.Esquema.Lote (CTD o TSG) llegadas en el instante t_mono."""
+        buffer = self.buffers.get(señal)
+        if buffer is not None:
+            buffer.extend(datos, t_mono, self.reloj.a_gps(t_mono))
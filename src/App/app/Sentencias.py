@@ -0,0 +1,208 @@
+"""
+Decodificadores de sentencias NMEA 0183 por separacion de campos.
+
+Cada decodificador recibe la lista de campos de la sentencia (el primero es la
+direccion, por ejemplo 'GPRMC') y devuelve un diccionario con los valores ya
+convertidos a numeros. DECODIFICADORES relaciona el identificador de sentencia
+(sin el talker) con su decodificador.
+"""
+import datetime
+from functools import reduce
+from operator import xor
+
+INICIO = (ord('$'), ord('!'))
+
+
+def checksum(cuerpo):
+    """XOR de todos los bytes entre '$' y '*'."""
+    return reduce(xor, cuerpo, 0)
+
+
+def con_checksum(cuerpo):
+    """Arma una sentencia completa '$cuerpo*hh\\r\\n' a partir del cuerpo (str)."""
+    return f"${cuerpo}*{checksum(cuerpo.encode('ASCII')):02X}\r\n".encode('ASCII')
+
+
+def split_sentence(line, requerir_checksum=False):
+    """
+    Separa una sentencia NMEA en (talker, sentencia, campos).
+    Si la linea trae '*hh' se valida el checksum. Regresa None si la linea no
+    es una sentencia NMEA, si el checksum no coincide o si falta y se requiere.
+    """
+    if isinstance(line, str):
+        line = line.encode('ASCII', errors='replace')
+    line = line.strip()
+    if len(line) < 6 or line[0] not in INICIO:
+        return None
+    fin = line.rfind(b'*')
+    if fin > 0:
+        cuerpo = line[1:fin]
+        try:
+            esperado = int(line[fin + 1:fin + 3], 16)
+        except ValueError:
+            return None
+        if checksum(cuerpo) != esperado:
+            return None
+    elif requerir_checksum:
+        return None
+    else:
+        cuerpo = line[1:]
+    campos = cuerpo.decode('ASCII', errors='replace').split(',')
+    direccion = campos[0]
+    if direccion.startswith('P'):
+        # Sentencias propietarias: no tienen talker de dos letras
+        return 'P', direccion[1:], campos
+    return direccion[:2], direccion[2:], campos
+
+
+def formato_hora(segundos, sep=':'):
+    """Segundos desde la medianoche a 'HH:MM:SS'."""
+    if segundos is None:
+        return None
+    segundos = int(segundos)
+    return f"{segundos // 3600:02d}{sep}{segundos % 3600 // 60:02d}{sep}{segundos % 60:02d}"
+
+
+def formato_fecha(fecha, sep='/'):
+    """datetime.date a 'DD/MM/YY'."""
+    if fecha is None:
+        return None
+    return f"{fecha.day:02d}{sep}{fecha.month:02d}{sep}{fecha.year % 100:02d}"
+
+
+def _float(valor):
+    try:
+        return float(valor)
+    except ValueError:
+        return None
+
+
+def _int(valor):
+    try:
+        return int(valor)
+    except ValueError:
+        return None
+
+
+def _coordenada(valor, hemisferio, digitos):
+    """Convierte 'gggmm.mmmm' + hemisferio a grados decimales (negativo al S y W)."""
+    if not valor:
+        return None
+    try:
+        grados = int(valor[:digitos]) + float(valor[digitos:]) / 60
+    except ValueError:
+        return None
+    if hemisferio in ('S', 's', 'W', 'w'):
+        return -grados
+    return grados
+
+
+def _hora(valor):
+    """Convierte 'hhmmss.ss' a segundos desde la medianoche."""
+    if len(valor) < 6:
+        return None
+    try:
+        return int(valor[0:2]) * 3600 + int(valor[2:4]) * 60 + float(valor[4:])
+    except ValueError:
+        return None
+
+
+def _fecha(dia, mes, anio):
+    try:
+        anio = int(anio)
+        if anio < 100:
+            anio += 2000
+        return datetime.date(anio, int(mes), int(dia))
+    except ValueError:
+        return None
+
+
+def decode_RMC(campos):
+    """$--RMC,hhmmss.ss,A,llll.ll,a,yyyyy.yy,a,x.x,x.x,ddmmyy,x.x,a*hh"""
+    if len(campos) < 12:
+        return None
+    fecha = campos[9]
+    return {
+        'hora': _hora(campos[1]),
+        'estado': campos[2],
+        'lat': _coordenada(campos[3], campos[4], 2),
+        'lon': _coordenada(campos[5], campos[6], 3),
+        'velocidad': _float(campos[7]),
+        'rumbo': _float(campos[8]),
+        'fecha': _fecha(fecha[0:2], fecha[2:4], fecha[4:6]) if len(fecha) == 6 else None,
+    }
+
+
+def decode_GGA(campos):
+    """$--GGA,hhmmss.ss,llll.ll,a,yyyyy.yy,a,x,xx,x.x,x.x,M,x.x,M,x.x,xxxx*hh"""
+    if len(campos) < 15:
+        return None
+    return {
+        'hora': _hora(campos[1]),
+        'lat': _coordenada(campos[2], campos[3], 2),
+        'lon': _coordenada(campos[4], campos[5], 3),
+        'calidad': _int(campos[6]),
+        'satelites': _int(campos[7]),
+        'hdop': _float(campos[8]),
+        'altura': _float(campos[9]),
+    }
+
+
+def decode_VTG(campos):
+    """$--VTG,x.x,T,x.x,M,x.x,N,x.x,K*hh"""
+    if len(campos) < 9:
+        return None
+    return {
+        'rumbo': _float(campos[1]),
+        'velocidad': _float(campos[5]),
+    }
+
+
+def decode_ZDA(campos):
+    """$--ZDA,hhmmss.ss,xx,xx,xxxx,xx,xx*hh"""
+    if len(campos) < 7:
+        return None
+    return {
+        'hora': _hora(campos[1]),
+        'fecha': _fecha(campos[2], campos[3], campos[4]),
+    }
+
+
+def decode_HDT(campos):
+    """$--HDT,x.x,T*hh"""
+    if len(campos) < 3:
+        return None
+    return {
+        'rumbo_verdadero': _float(campos[1]),
+    }
+
+
+def decode_DBS(campos):
+    """$--DBS,x.x,f,x.x,M,x.x,F*hh  Profundidad bajo la superficie"""
+    if len(campos) < 7:
+        return None
+    return {
+        'profundidad_pies': _float(campos[1]),
+        'profundidad': _float(campos[3]),
+    }
+
+
+def decode_DBT(campos):
+    """$--DBT,x.x,f,x.x,M,x.x,F*hh  Profundidad bajo el transductor"""
+    if len(campos) < 7:
+        return None
+    return {
+        'profundidad_transductor': _float(campos[3]),
+    }
+
+
+# Tabla de decodificadores por identificador de sentencia
+DECODIFICADORES = {
+    'RMC': decode_RMC,
+    'GGA': decode_GGA,
+    'VTG': decode_VTG,
+    'ZDA': decode_ZDA,
+    'HDT': decode_HDT,
+    'DBS': decode_DBS,
+    'DBT': decode_DBT,
+}
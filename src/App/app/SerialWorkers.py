@@ -1,64 +1,81 @@
+import math
 import time
 import logging
+import numpy as np
 import serial
 from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
 
+from app.NMEA import NMEA
 from app.RMC import RMC
 from app.DBS import DBS
+from app.NMEA_Mux import NMEA_Mux
 from app.cfg import Cfg
+from app.Framer import LineFramer, LF, Timeout, to_bytes
+from app.Muestras import Muestra, BUENA, DUDOSA
+from app.Esquema import LOTE, compilar
 
-try:
-    unicode
-except (NameError, AttributeError):
-    unicode = str
-
-def to_bytes(seq):
-    """convierte una secuencia a tipo bytes"""
-    if isinstance(seq, bytes):
-        return seq
-    elif isinstance(seq, bytearray):
-        return bytes(seq)
-    elif isinstance(seq, memoryview):
-        return seq.tobytes()
-    elif isinstance(seq, unicode):
-        raise TypeError(
-            'unicode strings are not supported, please encode to bytes: {!r}'.format(seq))
-    else:
-        return bytes(bytearray(seq))
-
-LF = to_bytes([10])
-
-class Timeout(object):
-    """Abstracción para operaciones de tiempo de espera."""
-    if hasattr(time, 'monotonic'):
-        TIME = time.monotonic
-    else:
-        TIME = time.time
-
-    def __init__(self, duration):
-        self.is_infinite = (duration is None)
-        self.is_non_blocking = (duration == 0)
-        self.duration = duration
-        if duration is not None:
-            self.target_time = self.TIME() + duration
-        else:
-            self.target_time = None
+# Claves de la posicion, las que esperan Main y StationManager
+CLAVES_POSICION = ('latD', 'lonD', 'lat', 'lon', 'hora', 'fecha', 'Velocidad')
 
-    def expired(self):
-        return self.target_time is not None and self.time_left() <= 0
 
-    def time_left(self):
-        if self.is_non_blocking:
-            return 0
-        elif self.is_infinite:
-            return None
-        else:
-            delta = self.target_time - self.TIME()
-            if delta > self.duration:
-                self.target_time = self.TIME() + self.duration
-                return self.duration
-            else:
-                return max(0, delta)
+def posicion(nmea, t=None):
+    """Arma la Muestra de posicion a partir de un objeto RMC o NMEA_Mux."""
+    tokens = [
+        nmea.Get_Latitud_Grados(),
+        nmea.Get_Longitud_Grados(),
+        nmea.Get_Lat_GradosMinutos(),
+        nmea.Get_Lon_GradosMinutos(),
+        nmea.Get_Time(),
+        nmea.Get_Date(sep=''),
+        nmea.Get_Speed()
+    ]
+    muestra = Muestra(CLAVES_POSICION, tokens, t, calidad=BUENA)
+    if math.isnan(muestra.numeros[0]) or math.isnan(muestra.numeros[1]):
+        # Sin latitud o longitud
+        muestra.calidad = DUDOSA
+    return muestra
+
+
+class Scans(object):
+    """
+    Cuenta los scans recibidos y los perdidos a partir de la columna Scan
+    del esquema (app.Esquema) del instrumento.
+    Un salto en la numeracion suma los scans que faltan; si la numeracion
+    vuelve atras (el instrumento se reinicio) se toma como nuevo inicio.
+    """
+
+    def __init__(self, esquema):
+        self.columna = esquema.nombre('scan')
+        self.recibidos = 0
+        self.perdidos = 0
+        self.ultimo = None
+
+    def contar(self, dato):
+        self.recibidos += 1
+        scan = dato.numero(self.columna)
+        if math.isnan(scan):
+            # Sin columna Scan o no numerica
+            return
+        scan = int(scan)
+        if self.ultimo is not None and scan > self.ultimo + 1:
+            self.perdidos += scan - self.ultimo - 1
+        self.ultimo = scan
+
+    def contar_lote(self, lote):
+        """Igual que contar, para todos los scans de un app.Esquema.Lote."""
+        self.recibidos += len(lote)
+        scans = lote.columna('scan')
+        if scans is None:
+            return
+        scans = scans[~np.isnan(scans)].astype(np.int64)
+        if not len(scans):
+            return
+        if self.ultimo is not None:
+            scans = np.concatenate(([self.ultimo], scans))
+        saltos = np.diff(scans)
+        self.perdidos += int((saltos[saltos > 1] - 1).sum())
+        self.ultimo = int(scans[-1])
+
 
 class BaseSerialWorker(QObject):
     """Clase base para workers que leen de puertos serie."""
@@ -69,6 +86,49 @@ class BaseSerialWorker(QObject):
         super(BaseSerialWorker, self).__init__()
         self.working = True
         self.ser = None
+        self.framer = None
+        # Funcion que graba los bytes crudos del puerto (app.Captura)
+        self.captura = None
+        # Espera entre ciclos de lectura
+        self.pausa = 0.05
+        # Contadores que lee app.Metricas. Los de NMEA, DBS y NMEA_Mux los lleva el
+        # propio objeto y se leen con las propiedades lineas, bytes, errores y reconexiones
+        self.timeouts = 0
+        self._errores = 0
+        self._reconexiones = 0
+
+    @property
+    def lineas(self):
+        if isinstance(self.ser, NMEA):
+            return self.ser.sentencias
+        return self.scans.recibidos if hasattr(self, 'scans') else 0
+
+    @property
+    def bytes(self):
+        if isinstance(self.ser, NMEA):
+            return self.ser.bytes
+        return self.framer.bytes if self.framer is not None else 0
+
+    @property
+    def errores(self):
+        if isinstance(self.ser, NMEA):
+            return self.ser.errores
+        return self._errores
+
+    @property
+    def reconexiones(self):
+        if isinstance(self.ser, NMEA):
+            return self.ser.reconexiones
+        return self._reconexiones
+
+    def capturar(self, grabador):
+        """Graba todos los bytes que lleguen al puerto con un app.Captura.Grabador."""
+        self.captura = grabador.capturador(str(self.ser.port))
+        if hasattr(self.ser, 'captura'):
+            # NMEA, DBS y NMEA_Mux arman sus propias lineas
+            self.ser.captura = self.captura
+        if self.framer is not None:
+            self.framer.captura = self.captura
 
     def work(self):
         """Bucle principal de trabajo. Las subclases deben implementar _read_cycle."""
@@ -88,9 +148,16 @@ class BaseSerialWorker(QObject):
                 self._handle_serial_error(e)
             except Exception as e:
                 logging.error(f"Error inesperado en worker: {e}")
-            
-            time.sleep(0.05)
+
+            if self.pausa:
+                time.sleep(self.pausa)
         
+        if hasattr(self, 'scans'):
+            logging.info(f"Puerto {self.ser.port}: {self.scans.recibidos} scans, "
+                         f"{self.scans.perdidos} perdidos")
+        if self.ser and hasattr(self.ser, 'Get_Rate'):
+            logging.info(f"Puerto {self.ser.port}: {self.ser.Get_Rate():.2f} sentencias/s, "
+                         f"{self.ser.reconexiones} reconexiones")
         if self.ser and hasattr(self.ser, 'close'):
              self.ser.close()
         self.finished.emit()
@@ -100,6 +167,7 @@ class BaseSerialWorker(QObject):
 
     def _handle_timeout(self):
         # La implementación por defecto registra una advertencia
+        self.timeouts += 1
         if self.ser and hasattr(self.ser, 'port'):
              logging.warning(f"Timeout al intentar leer el puerto serie {str(self.ser.port)}.")
         else:
@@ -115,57 +183,31 @@ class BaseSerialWorker(QObject):
         Lee hasta encontrar una secuencia esperada ('\\n' por defecto), se supere el tamaño
         o hasta que ocurra un timeout.
         """
-        lenterm = len(expected)
-        line = bytearray()
-        timeout = Timeout(self.ser.timeout)
-        while True:
-            if hasattr(self.ser, 'is_open') and not self.ser.is_open:
-                self.ser.open()
-            c = self.ser.read(1)
-            if c:
-                line += c
-                if line[-lenterm:] == expected:
-                    break
-                if size is not None and len(line) >= size:
-                    break
-            else:
-                raise TimeoutError
-            if timeout.expired():
-                break
-        return bytes(line)
+        if hasattr(self.ser, 'is_open') and not self.ser.is_open:
+            self.ser.open()
+        if self.framer is None or self.framer.ser is not self.ser:
+            self.framer = LineFramer(self.ser, expected, captura=self.captura)
+        self.framer.expected = expected
+        return self.framer.readline(size)
 
 class NMEA_Worker(BaseSerialWorker):
-    intReady = pyqtSignal(dict)
+    intReady = pyqtSignal(object)
 
     def __init__(self, ser):
         super(NMEA_Worker, self).__init__()
         # La clase RMC maneja la conexión serial internamente o la envuelve
-        self.ser = RMC(port=ser.port, BR=ser.baudrate, timeout=2)
-        self.line = {
-            'latD': 'NaN', 'lonD': 'NaN', 'lat': 'NaN', 'lon': 'NaN',
-            'hora': 'NaN', 'fecha': 'NaN', 'Velocidad': 'NaN',
-        }
+        self.ser = RMC(port=ser.port, BR=ser.baudrate, timeout=2, persistent=True)
+        self.line = Muestra.vacia(CLAVES_POSICION)
 
     def _read_cycle(self):
         self.ser.Read()
-        line = {
-            'latD': self.ser.Get_Latitud_Grados(),
-            'lonD': self.ser.Get_Longitud_Grados(),
-            'lat': self.ser.Get_Lat_GradosMinutos(),
-            'lon': self.ser.Get_Lon_GradosMinutos(),
-            'hora': self.ser.Get_Time(),
-            'fecha': self.ser.Get_Date(sep=''),
-            'Velocidad': self.ser.Get_Speed()
-        }
+        line = posicion(self.ser)
         self.line = line
         self.intReady.emit(line)
 
     def _handle_timeout(self):
         super()._handle_timeout()
-        line = {
-            'latD': 'NaN', 'lonD': 'NaN', 'lat': 'NaN', 'lon': 'NaN',
-            'hora': 'NaN', 'fecha': 'NaN', 'Velocidad': 'NaN',
-        }
+        line = Muestra.vacia(CLAVES_POSICION)
         self.line = line
         self.intReady.emit(line)
 
@@ -174,7 +216,7 @@ class DBS_Worker(BaseSerialWorker):
 
     def __init__(self, ser):
         super(DBS_Worker, self).__init__()
-        self.ser = DBS(port=ser.port, BR=ser.baudrate, timeout=3)
+        self.ser = DBS(port=ser.port, BR=ser.baudrate, timeout=3, persistent=True)
         self.line = 'NaN'
 
     def _read_cycle(self):
@@ -187,9 +229,52 @@ class DBS_Worker(BaseSerialWorker):
         super()._handle_timeout()
         self.intReady.emit("NaN")
 
+class NMEA_Mux_Worker(BaseSerialWorker):
+    """
+    Worker unico para un puerto NMEA que transporta varias sentencias (RMC, GGA, VTG,
+    ZDA, HDT, DBS/DBT). Emite la posicion por intReady, con las mismas claves que
+    NMEA_Worker, una vez por fix (RMC o GGA, ver NMEA_Mux.fix_nuevo), y la
+    profundidad por depthReady, como DBS_Worker.
+    """
+    intReady = pyqtSignal(object)
+    depthReady = pyqtSignal(str)
+
+    PROFUNDIDAD = ('DBS', 'DBT')
+
+    def __init__(self, ser):
+        super(NMEA_Mux_Worker, self).__init__()
+        self.ser = NMEA_Mux(port=ser.port, BR=ser.baudrate, timeout=2)
+        self.line = Muestra.vacia(CLAVES_POSICION)
+        self.depth = 'NaN'
+
+    def _read_cycle(self):
+        leidas = self.ser.Read()
+        if self.ser.fix_nuevo(leidas):
+            line = posicion(self.ser)
+            self.line = line
+            self.intReady.emit(line)
+        if not leidas.isdisjoint(self.PROFUNDIDAD):
+            self.depth = self.ser.Get_Z_Metros()
+            self.depthReady.emit(self.depth)
+
+    def _handle_timeout(self):
+        super()._handle_timeout()
+        line = Muestra.vacia(CLAVES_POSICION)
+        self.line = line
+        self.intReady.emit(line)
+        self.depthReady.emit('NaN')
+
 class ConfiguredSerialWorker(BaseSerialWorker):
-    """Worker que necesita acceder a la configuración global (Cfg)."""
-    def __init__(self, ser, section_name):
+    """
+    Worker que necesita acceder a la configuración global (Cfg).
+    En modo streaming (por defecto) se procesan todos los scans en orden, sin
+    vaciar el buffer del puerto ni esperar entre lecturas. El ultimo scan queda
+    en 'latest' junto con su instante de llegada ('t_latest', monotonic) y en
+    'scans' la cuenta de recibidos y perdidos.
+    Con streaming=False se mantiene la lectura original: vaciar el buffer y
+    tomar la siguiente linea completa en cada ciclo.
+    """
+    def __init__(self, ser, section_name, streaming=True):
         super(ConfiguredSerialWorker, self).__init__()
         # Recrear el objeto serial con reglas de timeout específicas si es necesario, 
         # o usar el que se pasó. Punto clave: Main.pyw pasó un objeto serial.
@@ -197,27 +282,73 @@ class ConfiguredSerialWorker(BaseSerialWorker):
         # CTD: serial.Serial(..., timeout=5)
         # TSG: serial.Serial(..., timeout=ser.timeout)
         
-        self.ser = serial.Serial(port=ser.port, baudrate=ser.baudrate, timeout=ser.timeout)
+        # serial_for_url acepta tambien URL de pyserial (replay://, socket://, ...)
+        self.ser = serial.serial_for_url(str(ser.port), baudrate=ser.baudrate, timeout=ser.timeout)
             
         _Config = Cfg()
         self.cfg = _Config.GetCfg()
         self.section_name = section_name
         self.data_format()
+        self.streaming = streaming
+        self.latest = None
+        self.t_latest = None
+        if streaming:
+            self.pausa = 0
 
     def data_format(self):
-        self.format = dict()
-        for i, k in enumerate(self.cfg['Configuracion'][self.section_name]['filas']):
-            self.format[i] = k.split()[0]
+        # Esquema compilado de las columnas (compartido con el Almacen y StationManager)
+        self.esquema = compilar(self.cfg['Configuracion'][self.section_name]['filas'])
+        self.format = self.esquema.formato
+        self.claves = self.esquema.claves
+        self.scans = Scans(self.esquema)
 
     def _read_cycle(self):
-        dato = dict()
+        if self.streaming:
+            self._read_stream()
+        else:
+            self._read_latest()
+
+    def _read_stream(self):
+        if not self.ser.is_open:
+            self.ser.open()
+            if self.framer is not None:
+                self.framer.reset()
+                self._reconexiones += 1
+        if self.framer is None or self.framer.ser is not self.ser:
+            self.framer = LineFramer(self.ser, captura=self.captura)
+        lines = self.framer.read_lines()
+        # Todas las lineas de una lectura llegaron en el mismo bloque
+        t = Timeout.TIME()
+        if len(lines) >= LOTE:
+            # Lineas acumuladas (la lectura se demoro): se decodifican juntas
+            lote = self.esquema.lote(lines, t)
+            self._errores += lote.invalidas
+            if not len(lote):
+                return
+            self.scans.contar_lote(lote)
+            self.latest = lote.ultima
+            self.t_latest = t
+            self.intReady.emit(lote)
+            return
+        for line in lines:
+            try:
+                dato = self.esquema.decode(line, t)
+            except (UnicodeDecodeError, KeyError):
+                # Linea cortada o con mas columnas que las configuradas
+                self._errores += 1
+                continue
+            self.scans.contar(dato)
+            self.latest = dato
+            self.t_latest = t
+            self.intReady.emit(dato)
+
+    def _read_latest(self):
         self.ser.reset_input_buffer()
         self.ser.reset_input_buffer() # Doble reinicio en el original
+        if self.framer is not None:
+            self.framer.reset()
         
-        line = self.Read_until().decode('ASCII')
-        line = line.split()
-        for i, k in enumerate(line):
-            dato[self.format[i]] = k
+        dato = self.esquema.decode(self.Read_until())
         self.intReady.emit(dato)
 
     def _handle_timeout(self):
@@ -230,40 +361,26 @@ class ConfiguredSerialWorker(BaseSerialWorker):
         
         if self.section_name == 'CTD':
              self.ser.close()
-             self.intReady.emit("NaN")
         
-        # Emitir todas las claves como NaN
-        nan_dict = dict()
-        # Note: original code iterated over cfg keys to set them to NaN
-        # for i, k in enumerate(self.cfg['Configuracion'][self.section_name]['filas']):
-        #    self.format[k] = 'NaN'
-        # This looks like it was modifying self.format (the dict needed for mapping indices) 
-        # to have keys as values? Original code: self.format[k] = 'NaN'. 
-        # Wait, self.format is {index: name}. 
-        # Original code line 291: self.format[k] = 'NaN'. k is the key from config?
-        # Actually line 292: self.format[k] = 'NaN'.
-        # self.intReady.emit(self.format)
-        # This seems buggy in original or I misunderstood. simpler to emit a dict with all keys nan.
-        
-        # Intentemos replicar la emisión "segura" de NaN
-        # Necesitamos emitir un diccionario donde las claves sean los nombres de las variables
-        output = {}
-        # Releer las claves correctamente
-        for raw_k in self.cfg['Configuracion'][self.section_name]['filas']:
-             key_name = raw_k.split()[0]
-             output[key_name] = 'NaN'
-        
-        self.intReady.emit(output)
+        # El original emitia el diccionario de formato con sus valores en 'NaN':
+        # la Muestra vacia del esquema es lo mismo (todas las columnas en 'NaN')
+        self.intReady.emit(self.esquema.vacia())
 
 class CTD_Worker(ConfiguredSerialWorker):
-    intReady = pyqtSignal(dict)
-    def __init__(self, ser):
-         # Sobreescritura de timeout específica para CTD
-         ser.timeout = 5
-         super(CTD_Worker, self).__init__(ser, 'CTD')
+    """
+    Con rapido=True (Configuracion.CTD.Modo "rapido", la salida serie de Seasave
+    de un 911plus a 24 Hz) el puerto espera a lo sumo TIMEOUT_RAPIDO segundos:
+    un flujo continuo que se corta un segundo ya es una falla.
+    """
+    intReady = pyqtSignal(object)
+    TIMEOUT_RAPIDO = 1
+    def __init__(self, ser, streaming=True, rapido=False):
+         # Sobreescritura de timeout específica para CTD (la salida promediada llega cada pocos segundos)
+         ser.timeout = self.TIMEOUT_RAPIDO if rapido else 5
+         super(CTD_Worker, self).__init__(ser, 'CTD', streaming)
 
 class TSG_Worker(ConfiguredSerialWorker):
-    intReady = pyqtSignal(dict)
-    def __init__(self, ser):
+    intReady = pyqtSignal(object)
+    def __init__(self, ser, streaming=True):
          # Específico para TSG
-         super(TSG_Worker, self).__init__(ser, 'TSG')
+         super(TSG_Worker, self).__init__(ser, 'TSG', streaming)
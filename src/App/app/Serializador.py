@@ -0,0 +1,95 @@
+"""
+Formatos de los archivos de campaña (JSON, manifiesto y estaciones).
+
+Formatos (Configuracion.Formato en config.json):
+    - json: JSON con sangria de 4 espacios, como siempre (se puede leer y editar)
+    - compacto: JSON sin espacios, con el json de Python (la mitad de tamaño)
+    - orjson: JSON sin espacios con orjson, mucho mas rapido; si orjson no esta
+      instalado se usa 'compacto'. orjson escribe un float NaN como null; la
+      campaña guarda los NaN como texto ('NaN'), asi que no cambia nada
+    - binario: JSON compacto comprimido con gzip (el archivo mas chico)
+Todos se leen igual (leer / decodificar): el formato se reconoce por el
+contenido, asi una campaña puede cambiar de formato sin convertir los archivos
+ya escritos y los archivos siguen llamandose .json. Si orjson esta instalado
+tambien se usa para leer.
+"""
+import gzip
+import io
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATOS = ('json', 'compacto', 'orjson', 'binario')
+# Los archivos gzip empiezan con estos dos bytes; un JSON nunca
+GZIP = b'\x1f\x8b'
+# Compresion de 'binario': el nivel 1 ya logra casi todo el ahorro y es el mas rapido
+NIVEL = 1
+
+
+def formato(nombre):
+    """Formato que se usa para 'nombre' (el que se pidio, o su reemplazo si no se puede usar)."""
+    if nombre not in FORMATOS:
+        logging.error(f"Formato de campaña desconocido '{nombre}', se usa 'json'")
+        return 'json'
+    if nombre == 'orjson' and orjson is None:
+        logging.warning("orjson no esta instalado, se usa el formato 'compacto'")
+        return 'compacto'
+    return nombre
+
+
+def _compacto(datos):
+    if orjson is not None:
+        try:
+            return orjson.dumps(datos, option=orjson.OPT_NON_STR_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            # Algo que orjson no admite (enteros de mas de 64 bits, ...): lo escribe el json de Python
+            pass
+    return json.dumps(datos, separators=(',', ':')).encode()
+
+
+def codificar(datos, nombre='json'):
+    """Bytes de 'datos' en el formato 'nombre'."""
+    if nombre == 'json':
+        return json.dumps(datos, indent=4).encode()
+    if nombre == 'compacto':
+        return json.dumps(datos, separators=(',', ':')).encode()
+    if nombre == 'orjson':
+        return _compacto(datos)
+    if nombre == 'binario':
+        return gzip.compress(_compacto(datos), compresslevel=NIVEL, mtime=0)
+    raise ValueError(f'Formato desconocido: {nombre}')
+
+
+def escribir(archivo, datos, nombre='json'):
+    """Escribe 'datos' en un archivo abierto en modo binario."""
+    if nombre == 'json':
+        # Se escribe de a partes, sin armar todo el texto en memoria, como un archivo de texto
+        texto = io.TextIOWrapper(archivo, encoding='ascii')
+        json.dump(datos, texto, indent=4)
+        texto.flush()
+        texto.detach()
+    else:
+        archivo.write(codificar(datos, nombre))
+
+
+def decodificar(contenido):
+    """Datos de los bytes de un archivo escrito en cualquiera de los formatos."""
+    if contenido[:2] == GZIP:
+        contenido = gzip.decompress(contenido)
+    if orjson is not None:
+        try:
+            return orjson.loads(contenido)
+        except orjson.JSONDecodeError:
+            # NaN o Infinity, que escribe el json de Python y orjson no lee
+            pass
+    return json.loads(contenido)
+
+
+def leer(ruta):
+    """Datos de un archivo escrito en cualquiera de los formatos."""
+    with open(ruta, 'rb') as archivo:
+        return decodificar(archivo.read())
@@ -0,0 +1,373 @@
+"""
+Simulador de instrumentos sobre pseudo-terminales (solo Linux).
+
+Crea un pseudo-terminal por instrumento y escribe en el trafico que generaria
+a bordo:
+    - GPS: RMC y GGA de un buque navegando (y DBS si la ecosonda comparte el puerto)
+    - Ecosonda: DBS con la profundidad bajo el buque
+    - CTD: columnas ASCII de Sea-Bird segun Configuracion.CTD.filas, con la
+      presion bajando y subiendo en un lance y el contador de botellas
+      aumentando en la subida
+    - TSG: columnas segun Configuracion.TSG.filas
+Cada instrumento escribe a su tasa sin superar lo que permite su baud rate
+(10 bits por byte). Si la aplicacion no lee el puerto, las lineas que no
+entran se descartan enteras (nunca se envia media linea) y se cuentan en
+'descartadas'.
+
+Con --actualizar se escriben los puertos en config.json, asi la ventana
+(MainWindow.setAdquisicion) los abre sin cambios. Con --enlaces ademas se
+guarda el directorio de los enlaces en Configuracion.Simulador: la busqueda de
+instrumentos (Detectar) prueba esos enlaces; ningun otro pseudo-terminal.
+
+Uso (desde src/App):
+    python -m app.Simulador --actualizar
+    python -m app.Simulador --ctd-hz 96 --ctd-br 115200 --enlaces /tmp/sipo
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from app.Sentencias import con_checksum
+
+NUDO = 1852 / 3600
+
+
+class Buque(object):
+    """Estado compartido del buque: posicion, rumbo, velocidad y profundidad."""
+
+    def __init__(self, lat=-38.5, lon=-57.5, velocidad=10.0, rumbo=90.0, profundidad=200.0):
+        self.lat = lat
+        self.lon = lon
+        self.velocidad = velocidad
+        self.rumbo = rumbo
+        self.profundidad = profundidad
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def actualizar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            metros = self.velocidad * NUDO * (ahora - self._t)
+            self._t = ahora
+            self.lat += metros * math.cos(math.radians(self.rumbo)) / 111120
+            self.lon += metros * math.sin(math.radians(self.rumbo)) / (111120 * math.cos(math.radians(self.lat)))
+            self.profundidad = max(10.0, self.profundidad + random.gauss(0, 0.2))
+
+
+def grados_minutos(valor, hemisferios, ancho):
+    """Grados decimales a 'gggmm.mmmm,H' como en las sentencias NMEA."""
+    grados = int(abs(valor))
+    minutos = (abs(valor) - grados) * 60
+    return f"{grados:0{ancho}d}{minutos:07.4f},{hemisferios[valor < 0]}"
+
+
+class Instrumento(threading.Thread):
+    """
+    Escribe en un pseudo-terminal las lineas de un instrumento.
+    Los parametros a ingresar son:
+        - nombre: seccion de Configuracion que simula
+        - hz: lineas (o grupos de sentencias) por segundo
+        - BR: baud rate del puerto simulado
+        - buque: estado compartido del buque
+    Las subclases implementan lineas().
+    """
+
+    def __init__(self, nombre, hz, BR, buque):
+        threading.Thread.__init__(self, name=nombre, daemon=True)
+        self.nombre = nombre
+        self.periodo = 1.0 / hz
+        self.BR = int(BR)
+        self.buque = buque
+        self.maestro, self.esclavo = os.openpty()
+        # Modo crudo: sin eco ni edicion de linea hasta que la aplicacion abra el puerto
+        tty.setraw(self.esclavo)
+        os.set_blocking(self.maestro, False)
+        self.port = os.ttyname(self.esclavo)
+        self.activo = True
+        self.escritas = 0
+        self.descartadas = 0
+        self.saturado = False
+
+    def lineas(self):
+        raise NotImplementedError
+
+    def run(self):
+        proximo = time.monotonic()
+        while self.activo:
+            lineas = self.lineas()
+            datos = b''.join(lineas)
+            for linea in lineas:
+                if self.escribir(linea):
+                    self.escritas += 1
+                else:
+                    # Nadie lee el puerto y su buffer esta lleno
+                    self.descartadas += 1
+            # No mas rapido de lo que permite el baud rate
+            periodo = max(self.periodo, len(datos) * 10 / self.BR)
+            if periodo > self.periodo and not self.saturado:
+                self.saturado = True
+                logging.warning(f'{self.nombre}: {self.BR} baudios no alcanzan para '
+                                f'{1 / self.periodo:.1f} lineas/s, se envian {1 / periodo:.1f}')
+            proximo += periodo
+            espera = proximo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                proximo = time.monotonic()
+
+    def escribir(self, linea):
+        """
+        Escribe una linea entera en el pseudo-terminal. Regresa False, sin
+        escribir nada, si el buffer esta lleno. Si entra solo el principio, se
+        espera lugar para el resto: una linea cortada la leeria la aplicacion
+        como un error del instrumento.
+        """
+        try:
+            escritos = os.write(self.maestro, linea)
+        except BlockingIOError:
+            return False
+        while escritos < len(linea) and self.activo:
+            select.select([], [self.maestro], [], self.periodo)
+            try:
+                escritos += os.write(self.maestro, linea[escritos:])
+            except BlockingIOError:
+                pass
+        return True
+
+    def close(self):
+        self.activo = False
+        if self.is_alive():
+            self.join()
+        os.close(self.esclavo)
+        os.close(self.maestro)
+
+
+class GPS(Instrumento):
+    """RMC y GGA; con ecosonda=True tambien DBS por el mismo puerto."""
+
+    def __init__(self, nombre, hz, BR, buque, ecosonda=False):
+        Instrumento.__init__(self, nombre, hz, BR, buque)
+        self.ecosonda = ecosonda
+
+    def lineas(self):
+        self.buque.actualizar()
+        ahora = time.gmtime()
+        hora = time.strftime('%H%M%S', ahora) + '.00'
+        lat = grados_minutos(self.buque.lat, 'NS', 2)
+        lon = grados_minutos(self.buque.lon, 'EW', 3)
+        lineas = [
+            con_checksum(f"GPRMC,{hora},A,{lat},{lon},{self.buque.velocidad:05.1f},"
+                         f"{self.buque.rumbo:05.1f},{time.strftime('%d%m%y', ahora)},,"),
+            con_checksum(f"GPGGA,{hora},{lat},{lon},1,08,0.9,10.0,M,14.0,M,,"),
+        ]
+        if self.ecosonda:
+            lineas.append(Ecosonda.dbs(self.buque.profundidad))
+        return lineas
+
+
+class Ecosonda(Instrumento):
+    """DBS con la profundidad del buque."""
+
+    @staticmethod
+    def dbs(metros):
+        return con_checksum(f"SDDBS,{metros / 0.3048:06.1f},f,{metros:06.1f},M,{metros / 1.8288:06.1f},F")
+
+    def lineas(self):
+        self.buque.actualizar()
+        return [self.dbs(self.buque.profundidad)]
+
+
+class Columnas(Instrumento):
+    """
+    Salida ASCII de Sea-Bird: una columna por cada nombre de 'filas'. El valor
+    de cada columna se elige por el nombre (scan, pres, temp, cond, sal, bot,
+    lat, lon, ...); las columnas desconocidas se envian en 0.
+    """
+
+    def __init__(self, nombre, hz, BR, buque, filas):
+        Instrumento.__init__(self, nombre, hz, BR, buque)
+        self.filas = [fila.split()[0].lower() for fila in filas]
+        self.scan = 0
+        self.t0 = time.monotonic()
+
+    def presion(self):
+        return 3.0
+
+    def botella(self):
+        return 0
+
+    def valor(self, columna, presion):
+        if 'scan' in columna:
+            return f"{self.scan:8d}"
+        if 'bot' in columna:
+            return f"{self.botella():3d}"
+        if 'pres' in columna:
+            valor = presion
+        elif 'temp' in columna:
+            valor = max(2.0, 18.0 - 0.02 * presion) + ('38' in columna) * 0.01 + random.gauss(0, 0.002)
+        elif 'cond' in columna:
+            valor = 4.2 - 0.002 * presion + random.gauss(0, 0.0002)
+        elif 'sal' in columna:
+            valor = 33.9 + 0.001 * presion + random.gauss(0, 0.001)
+        elif 'dens' in columna:
+            valor = 1025.0 + 0.005 * presion
+        elif 'sound' in columna:
+            valor = 1500.0 + 0.016 * presion
+        elif 'lat' in columna:
+            valor = self.buque.lat
+        elif 'lon' in columna:
+            valor = self.buque.lon
+        elif 'julian' in columna:
+            valor = time.gmtime().tm_yday + (time.time() % 86400) / 86400
+        elif 'elapsed' in columna or 'time' in columna:
+            valor = time.monotonic() - self.t0
+        else:
+            valor = 0.0
+        return f"{valor:11.4f}"
+
+    def lineas(self):
+        self.scan += 1
+        presion = self.presion()
+        return [(' '.join(self.valor(columna, presion) for columna in self.filas) + '\r\n').encode('ASCII')]
+
+
+class CTD(Columnas):
+    """
+    Lance de CTD: baja a 'bajada' dbar/s hasta 'fondo' y sube a la misma
+    velocidad, disparando 'botellas' botellas repartidas en la subida.
+    """
+
+    def __init__(self, nombre, hz, BR, buque, filas, fondo=500.0, bajada=1.0, botellas=12):
+        Columnas.__init__(self, nombre, hz, BR, buque, filas)
+        self.fondo = fondo
+        self.bajada = bajada
+        self.disparos = [fondo * (1 - i / botellas) for i in range(botellas)]
+        self.disparadas = 0
+
+    def presion(self):
+        t = (time.monotonic() - self.t0) * self.bajada
+        ciclo = t % (2 * self.fondo)
+        subiendo = ciclo > self.fondo
+        presion = 2 * self.fondo - ciclo if subiendo else ciclo
+        if not subiendo:
+            self.disparadas = 0
+        elif self.disparadas < len(self.disparos) and presion <= self.disparos[self.disparadas]:
+            self.disparadas += 1
+        return presion + random.gauss(0, 0.01)
+
+    def botella(self):
+        return self.disparadas
+
+
+class Simulador(object):
+    """
+    Crea los instrumentos habilitados en la configuracion.
+    Los parametros a ingresar son:
+        - cfg: diccionario de configuracion (config.json), de donde se toman
+          las filas de CTD y TSG, las velocidades y si la ecosonda comparte el puerto del GPS
+        - hz: lineas por segundo de cada seccion ('NMEA', 'Batimetria', 'CTD', 'TSG')
+        - BR: baud rate de cada seccion (por defecto el de la configuracion)
+    Funciones a utilizar:
+        - start / stop: inicia y detiene todos los instrumentos
+        - config: copia de cfg con los puertos simulados
+    """
+
+    HZ = {'NMEA': 1.0, 'Batimetria': 1.0, 'CTD': 24.0, 'TSG': 1.0}
+
+    def __init__(self, cfg, hz=None, BR=None, enlaces=None, **lance):
+        self.cfg = cfg
+        conf = cfg['Configuracion']
+        hz = dict(self.HZ, **(hz or {}))
+        BR = {seccion: (BR or {}).get(seccion) or conf[seccion]['BR'] for seccion in self.HZ}
+        self.buque = Buque()
+        self.instrumentos = dict()
+        comparte = conf['Batimetria']['Port'] == conf['NMEA']['Port'] and conf['Batimetria']['Status'] == '2'
+        self.instrumentos['NMEA'] = GPS('NMEA', hz['NMEA'], BR['NMEA'], self.buque, ecosonda=comparte)
+        if not comparte:
+            self.instrumentos['Batimetria'] = Ecosonda('Batimetria', hz['Batimetria'], BR['Batimetria'], self.buque)
+        self.instrumentos['CTD'] = CTD('CTD', hz['CTD'], BR['CTD'], self.buque, conf['CTD']['filas'], **lance)
+        self.instrumentos['TSG'] = Columnas('TSG', hz['TSG'], BR['TSG'], self.buque, conf['TSG']['filas'])
+        self.puertos = {seccion: instrumento.port for seccion, instrumento in self.instrumentos.items()}
+        if comparte:
+            self.puertos['Batimetria'] = self.puertos['NMEA']
+        self.BR = BR
+        self.enlaces = enlaces
+        if enlaces:
+            # Nombres fijos para no cambiar config.json en cada corrida
+            os.makedirs(enlaces, exist_ok=True)
+            for seccion in list(self.puertos):
+                enlace = os.path.join(enlaces, seccion)
+                if os.path.lexists(enlace):
+                    os.remove(enlace)
+                os.symlink(self.puertos[seccion], enlace)
+                self.puertos[seccion] = enlace
+
+    def start(self):
+        for instrumento in self.instrumentos.values():
+            instrumento.start()
+
+    def stop(self):
+        for instrumento in self.instrumentos.values():
+            instrumento.close()
+
+    def config(self):
+        """Copia de cfg con los puertos simulados habilitados."""
+        cfg = json.loads(json.dumps(self.cfg))
+        for seccion, port in self.puertos.items():
+            cfg['Configuracion'][seccion]['Port'] = port
+            cfg['Configuracion'][seccion]['BR'] = str(self.BR[seccion])
+            cfg['Configuracion'][seccion]['Status'] = '2'
+        if self.enlaces:
+            cfg['Configuracion']['Simulador'] = os.path.abspath(self.enlaces)
+        return cfg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--actualizar', action='store_true', help='escribe los puertos simulados en config.json')
+    parser.add_argument('--enlaces', help='directorio donde crear enlaces fijos a los puertos')
+    parser.add_argument('--segundos', type=float, help='duracion (por defecto hasta Ctrl+C)')
+    for seccion, opcion in (('NMEA', 'gps'), ('Batimetria', 'dbs'), ('CTD', 'ctd'), ('TSG', 'tsg')):
+        parser.add_argument(f'--{opcion}-hz', type=float, default=Simulador.HZ[seccion])
+        parser.add_argument(f'--{opcion}-br', type=int)
+    parser.add_argument('--fondo', type=float, default=500, help='presion maxima del lance (dbar)')
+    parser.add_argument('--botellas', type=int, default=12)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.config) as archivo:
+        cfg = json.load(archivo)
+    opciones = (('NMEA', 'gps'), ('Batimetria', 'dbs'), ('CTD', 'ctd'), ('TSG', 'tsg'))
+    simulador = Simulador(cfg,
+                          hz={seccion: getattr(args, f'{opcion}_hz') for seccion, opcion in opciones},
+                          BR={seccion: getattr(args, f'{opcion}_br') for seccion, opcion in opciones},
+                          enlaces=args.enlaces, fondo=args.fondo, botellas=args.botellas)
+    if args.actualizar:
+        with open(args.config, 'w') as archivo:
+            json.dump(simulador.config(), archivo, indent=4)
+    for seccion, port in simulador.puertos.items():
+        print(f"{seccion:<12}{port:<20}{simulador.BR[seccion]:>8} baudios")
+    simulador.start()
+    try:
+        if args.segundos:
+            time.sleep(args.segundos)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    for seccion, instrumento in simulador.instrumentos.items():
+        print(f"{seccion:<12}{instrumento.escritas:>8} enviadas{instrumento.descartadas:>8} descartadas")
+    simulador.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,16 @@
 import os
-import json
+import copy
 import logging
 import shutil
 from app import utils
+from app.Framer import Timeout
+from app.Metricas import METRICAS
+from app.Muestras import a_json
+from app.Esquema import compilar
+from app.Diario import Diario, recuperar
+from app.Escritor import Escritor
+from app.BaseDatos import BaseDatos, ruta_base
+from app import Fragmentos, Serializador
 
 class StationManager:
     def __init__(self, cfg, estructura):
@@ -22,6 +30,18 @@ class StationManager:
         
         # Rutas y Archivos
         self.file_json = None
+        # Diario de la campaña (app.Diario): cada evento agrega un registro en lugar de reescribir el JSON
+        self.diario = None
+        # El JSON completo se escribe en segundo plano (app.Escritor), nunca desde la ventana,
+        # en el formato de Configuracion.Formato (app.Serializador)
+        self.escritor = Escritor(formato=Serializador.formato(cfg['Configuracion'].get('Formato', 'json')))
+        # Con Configuracion.Almacenamiento = "sqlite" los eventos van a una base (app.BaseDatos)
+        self.base = None
+        # Cambios guardados en la base desde la ultima escritura del JSON
+        self.pendientes = 0
+        # Campaña guardada por estaciones (app.Fragmentos) y estaciones a reescribir en el proximo guardado
+        self.fragmentos = False
+        self.sucias = set()
         self._ROOT_DIR = None
         self._hex_file = None
         self._xmlcon_file = None
@@ -35,7 +55,56 @@ class StationManager:
              path = os.path.dirname(file_json_path)
              
         file_name = os.path.basename(file_json_path)
-        self.file_json = os.path.join(path, file_name)
+        file_json = os.path.join(path, file_name)
+        if file_json == self.file_json:
+            return
+        self.close()
+        self.file_json = file_json
+        cada = self.cfg['Configuracion'].get('Diario', {}).get('Compactar', 200)
+        self.diario = Diario(self.file_json, cada)
+        # Con Almacenamiento = "estaciones" una campaña de un solo JSON se parte en el primer guardado
+        self.fragmentos = (Fragmentos.fragmentado(self.file_json)
+                           or self.cfg['Configuracion'].get('Almacenamiento', 'json') == 'estaciones')
+        self.sucias = set()
+        if self.fragmentos:
+            os.makedirs(Fragmentos.carpeta(self.file_json), exist_ok=True)
+            if not Fragmentos.fragmentado(self.file_json):
+                self.sucias.update(self.estructura['Estaciones'])
+        # Si el programa se corto, los registros que quedaron en el diario se pasan al JSON
+        recuperados = recuperar(self.file_json, self.estructura)
+        if self.cfg['Configuracion'].get('Almacenamiento', 'json') == 'sqlite':
+            recuperados = self.abrir_base(recuperados) or recuperados
+        if recuperados:
+            # No se sabe que estaciones tocaron los registros recuperados
+            self.sucias.update(self.estructura['Estaciones'])
+            self.save_json()
+
+    def _mtime_json(self):
+        try:
+            return os.stat(self.file_json).st_mtime_ns
+        except OSError:
+            return None
+
+    def abrir_base(self, importar=False):
+        """
+        Abre la base SQLite de la campaña. Si la base esta vacia o el JSON cambio
+        desde la ultima vez que se escribio desde la base, se importa el JSON; si
+        no, la base puede tener eventos que no llegaron al JSON (el programa se
+        corto) y la estructura se carga desde la base. Regresa True si la base
+        tenia cambios que no estaban en el JSON.
+        """
+        self.base = BaseDatos(ruta_base(self.file_json))
+        if importar or self.base.vacia() or self.base.meta('sincronizado') != self._mtime_json():
+            self.base.importar(self.estructura)
+            self.base.meta('sincronizado', self._mtime_json())
+            return False
+        datos = self.base.exportar()
+        if datos == self.estructura:
+            return False
+        logging.info(f'{self.base.ruta}: se recuperaron cambios que no estaban en {self.file_json}')
+        self.estructura.clear()
+        self.estructura.update(datos)
+        return True
 
     def init_vars(self):
         """Inicializa variables de rutas basadas en la configuración."""
@@ -77,15 +146,33 @@ class StationManager:
         self.init_vars()
 
     def stop_station(self):
-        """Finaliza la estación actual."""
+        """Finaliza la estación actual y pasa el diario al JSON."""
         self.statusAdq = False
+        self.save_json()
+
+    def close(self):
+        """Compacta lo que quede en el diario y lo cierra (al salir o al cambiar de campaña)."""
+        if self.diario is None:
+            return
+        if self.diario.registros or self.pendientes:
+            self.save_json()
+        self.escritor.flush()
+        self.diario.close()
+        if self.base is not None:
+            self.base.close()
+            self.base = None
 
     def station_exists(self, nro_estacion):
         """Verifica si la estación ya existe en la estructura."""
         return nro_estacion in self.estructura['Estaciones']
 
     def save_json(self):
-        """Guarda la estructura actual en el archivo JSON."""
+        """
+        Pide escribir la estructura completa en el archivo JSON y cierra el tramo
+        del diario (compactacion). La escritura la hace el Escritor en su hilo.
+        En una campaña por estaciones se escriben solo las estaciones que
+        cambiaron y el manifiesto.
+        """
         if not self.file_json:
             logging.error("No se ha definido file_json para guardar.")
             return
@@ -94,12 +181,80 @@ class StationManager:
         # Asegurarse de que self.nro_estacion es válido
         if self.nro_estacion and self.estacion:
              self.estructura['Estaciones'].update(self.estacion)
+             self.sucias.add(self.nro_estacion)
 
+        inicio = Timeout.TIME()
+        diario = self.diario
         try:
-            with open(self.file_json, 'w+') as archivo:
-                json.dump(self.estructura, archivo, indent=4)
+            tramo = diario.cerrar_tramo()
+        except OSError as e:
+            # El diario sigue entero; se borra cuando una compactacion pueda cerrar el tramo
+            logging.error(f"Error al cerrar el tramo del diario: {e}")
+            tramo = None
+        base, ruta = self.base, self.file_json
+        self.pendientes = 0
+
+        def despues():
+            diario.tramo_guardado(tramo)
+            if base is not None:
+                # La base y el JSON vuelven a tener lo mismo
+                base.meta('sincronizado', os.stat(ruta).st_mtime_ns)
+        datos = self.instantanea()
+        if self.fragmentos:
+            for nro in self.sucias:
+                if nro in datos['Estaciones']:
+                    self.escritor.guardar(Fragmentos.ruta_estacion(self.file_json, nro), datos['Estaciones'][nro])
+            self.sucias.clear()
+            # El manifiesto se pide al final: el Escritor lo escribe despues de las estaciones
+            datos = Fragmentos.manifiesto(datos)
+        self.escritor.guardar(self.file_json, datos, despues=despues)
+        METRICAS.observar('compactacion', Timeout.TIME() - inicio)
+
+    def instantanea(self):
+        """
+        Copia de la estructura para el Escritor. Solo la estacion actual cambia
+        mientras se escribe; del resto alcanza con copiar los diccionarios de arriba.
+        """
+        datos = dict(self.estructura)
+        datos['Estaciones'] = dict(self.estructura['Estaciones'])
+        if self.nro_estacion in datos['Estaciones']:
+            datos['Estaciones'][self.nro_estacion] = copy.deepcopy(datos['Estaciones'][self.nro_estacion])
+        return datos
+
+    def registrar(self, *cambios):
+        """
+        Guarda en el diario (o en la base SQLite) cambios de la estacion actual,
+        cada uno como (ruta dentro de la estacion, valor). El costo no depende
+        del tamaño de la campaña; con el diario, cada 'Compactar' registros se
+        reescribe el JSON completo. Con la base, el JSON se escribe al terminar
+        la estacion y al cerrar.
+        """
+        if not self.file_json:
+            logging.error("No se ha definido file_json para guardar.")
+            return
+
+        self.estructura['Estaciones'].update(self.estacion)
+        self.sucias.add(self.nro_estacion)
+        inicio = Timeout.TIME()
+        cambios = [(('Estaciones', self.nro_estacion) + tuple(ruta), valor) for ruta, valor in cambios]
+        try:
+            if self.base is not None:
+                self.base.aplicar(cambios)
+                self.pendientes += 1
+            else:
+                self.diario.registrar(cambios)
         except Exception as e:
-            logging.error(f"Error al guardar JSON: {e}")
+            # Sin diario se guarda todo el JSON, como antes
+            logging.error(f"Error al escribir el diario: {e}")
+            if self.base is not None:
+                # Sin base se sigue con el diario; al volver a abrir la campaña la base se importa del JSON
+                self.base.close()
+                self.base = None
+            self.save_json()
+            return
+        METRICAS.observar('guardado', Timeout.TIME() - inicio)
+        if self.base is None and self.diario.pendiente:
+            self.save_json()
 
     def W_Pos(self, nmea_data, dbs_data, is_start=True):
         """Registra la posición y datos iniciales/finales."""
@@ -137,47 +292,53 @@ class StationManager:
             station_entry['FechaHora']['Fin']['HoraGMT'] = nmea_data.get('hora', 'NaN')
             station_entry['FechaHora']['Fin']['FechaGMT'] = nmea_data.get('fecha', 'NaN')
             station_entry['Batimetria']['Fin'] = str(dbs_data)
-            
-        self.save_json()
+
+        if is_start:
+            # La estacion entera (nueva o reemplazada)
+            self.registrar(((), station_entry))
+        else:
+            self.registrar(*(((grupo, 'Fin'), station_entry[grupo]['Fin'])
+                             for grupo in ('Posicion', 'FechaHora', 'Batimetria')))
 
     def W_CTD(self, ctd_data, loc):
         """Registra dato de CTD en Cubierta o Fondo."""
         # loc debe ser 'Cubierta' o 'Fondo'
         pos = self.countCub if loc == 'Cubierta' else self.countFdo
-        self.estacion[self.nro_estacion][loc][str(pos)] = ctd_data
-        self.save_json()
+        valor = a_json(ctd_data)
+        self.estacion[self.nro_estacion][loc][str(pos)] = valor
+        self.registrar(((loc, str(pos)), valor))
         
         if loc == 'Cubierta':
             self.countCub += 1
         else:
              self.countFdo += 1
 
-    def W_TSGvsCTD(self, ctd_data, tsg_data, nmea_data):
-        """Registra comparación TSG vs CTD en Superficie."""
-        self.estacion[self.nro_estacion]['Superficie'][str(self.countSup)] = {
+    def W_TSGvsCTD(self, ctd_data, tsg_data, nmea_data, alineacion=None):
+        """
+        Registra comparación TSG vs CTD en Superficie. Si se indica 'alineacion'
+        (resultado de Alineacion.comparar) se agregan deltaT, deltaS y el error
+        de alineacion.
+        """
+        registro = {
             'Hora': nmea_data.get('hora', 'NaN'),
-            'CTD': ctd_data,
-            'TSG': tsg_data,
+            'CTD': a_json(ctd_data),
+            'TSG': a_json(tsg_data),
         }
+        if alineacion is not None:
+            registro.update(alineacion)
+        self.estacion[self.nro_estacion]['Superficie'][str(self.countSup)] = registro
+        self.registrar((('Superficie', str(self.countSup)), registro))
         self.countSup += 1
-        self.save_json()
 
     def W_Bott(self, ctd_data):
         """Salva el registro del CTD al disparar una botella."""
         try:
-            bot_idx = ctd_data.get('Bot', 'NaN') # Asumiendo que 'Bot' es la clave correcta
-            # NOTA: En el código original era self.CTD_str['Bot']. Ajustar si la clave es diferente.
-            # En Main.pyw: self.CTD_str['bot'] = i (minúscula) pero self.estacion...[...][self.CTD_str['Bot']] (Mayúscula?)
-            # Revisando Main.pyw linea 827: self.CTD_str['bot'] = i
-            # linea 1032: self.estacion...['Botellas'][self.CTD_str['Bot']]
-            # Parece haber inconsistencia mayúscula/minúscula en el original.
-            # Asumiré que ctd_data viene con las claves correctas.
-            
-            # Corrección para robustez: buscar case-insensitive o asegurar clave
-            key_bot = 'Bot' if 'Bot' in ctd_data else 'bot'
-            if key_bot in ctd_data:
-                 self.estacion[self.nro_estacion]['Botellas'][ctd_data[key_bot]] = ctd_data
-                 self.save_json()
+            # La columna del contador de botellas sale del esquema del CTD (app.Esquema)
+            key_bot = compilar(self.cfg['Configuracion']['CTD']['filas']).nombre('bot')
+            if key_bot is not None and key_bot in ctd_data:
+                 valor = a_json(ctd_data)
+                 self.estacion[self.nro_estacion]['Botellas'][ctd_data[key_bot]] = valor
+                 self.registrar((('Botellas', ctd_data[key_bot]), valor))
         except Exception as e:
             logging.error(f"Error en W_Bott: {e}")
 
@@ -185,7 +346,7 @@ class StationManager:
         """Guarda el valor de SkipOver."""
         try:
             self.estacion[self.nro_estacion]['Skipover'] = skip_over_value
-            self.save_json()
+            self.registrar((('Skipover',), skip_over_value))
         except:
             pass
 
@@ -193,6 +354,6 @@ class StationManager:
         """Agrega comentario a la estación."""
         try:
              self.estacion[self.nro_estacion]['Comentarios'] = comentario
-             self.save_json()
+             self.registrar((('Comentarios',), comentario))
         except Exception as e:
              logging.error(f"Error guardando comentario: {e}")
@@ -1,6 +1,7 @@
 import json
 import os
 from app.utils import cfg
+from app import Serializador
 
 class Cfg():
     def __init__(self):
@@ -14,9 +15,8 @@ class Cfg():
         return self._file
 
     def GetCfg(self):
-        # Cargo archivo cfg como un diccionario
-        with open(self._file, 'r') as archivo:
-            _config = json.load(archivo)
+        # Cargo archivo cfg como un diccionario (en cualquier formato de app.Serializador)
+        _config = Serializador.leer(self._file)
         return _config
 
     def SetCfg(self, cfg):
@@ -0,0 +1,8 @@
+"""
+Protocolos propios para serial.serial_for_url:
+    - replay://ruta?puerto=COM3&velocidad=1 reproduce una captura de app.Captura
+"""
+import serial
+
+if __name__ not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append(__name__)
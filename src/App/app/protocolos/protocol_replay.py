@@ -0,0 +1,213 @@
+"""
+Puerto serie que reproduce una captura de app.Captura.
+
+Se abre con serial.serial_for_url, asi sirve en lugar del puerto real en los
+workers (NMEA, DBS, CTD, TSG) y en el motor de adquisicion:
+
+    replay://<archivo o directorio de capturas>?puerto=<puerto grabado>&velocidad=<N>
+
+    - puerto: nombre del puerto tal como se grabo (COM3, /dev/ttyUSB0, ...).
+      Sin puerto se reproducen los bloques de todos los puertos.
+    - velocidad: 1 respeta los tiempos originales (por defecto), N los acelera
+      N veces y 0 entrega los bloques lo mas rapido posible, de a uno por
+      lectura de in_waiting para conservar los cortes originales.
+    - pausa: segundos maximos de espera entre dos bloques (60 por defecto). Los
+      saltos mayores, o hacia atras, son cortes entre sesiones de captura y no
+      se esperan.
+
+Al terminar la captura el puerto queda sin datos, como un instrumento que deja
+de transmitir ('terminado' pasa a True). Lo que se escribe al puerto se descarta.
+"""
+import glob
+import itertools
+import os
+import time
+from urllib.parse import parse_qs
+
+from serial.serialutil import SerialBase, SerialException, PortNotOpenError
+
+from app.Captura import EXTENSION, leer
+from app.Framer import Timeout
+
+
+def archivos(ruta):
+    """Archivos de captura de 'ruta' (un archivo o un directorio) en orden de grabacion."""
+    if os.path.isdir(ruta):
+        encontrados = glob.glob(os.path.join(ruta, '*' + EXTENSION)) + \
+            glob.glob(os.path.join(ruta, '*' + EXTENSION + '.gz'))
+        return sorted(encontrados, key=lambda nombre: nombre[:-3] if nombre.endswith('.gz') else nombre)
+    if os.path.exists(ruta):
+        return [ruta]
+    return []
+
+
+class Serial(SerialBase):
+    """Puerto serie que entrega los bytes de una captura con sus tiempos originales."""
+
+    def __init__(self, *args, **kwargs):
+        self.ruta = None
+        self.puerto = None
+        self.velocidad = 1.0
+        self.pausa = 60.0
+        # Instante monotonic y hora de la PC en que se grabo el ultimo bloque entregado
+        self.t_captura = None
+        self.hora_captura = None
+        self._bloques = None
+        self._proximo = None
+        self._buffer = bytearray()
+        self._t0 = 0.0
+        self._r0 = 0.0
+        super(Serial, self).__init__(*args, **kwargs)
+
+    def open(self):
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        self.from_url(self.port)
+        rutas = archivos(self.ruta)
+        if not rutas:
+            raise SerialException(f'No hay capturas en {self.ruta}')
+        self._bloques = self._leer(rutas)
+        self._buffer = bytearray()
+        self._proximo = next(self._bloques, None)
+        self._t0 = self._proximo[0] if self._proximo is not None else 0.0
+        self._r0 = time.monotonic()
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+        self._bloques = None
+        super(Serial, self).close()
+
+    def from_url(self, url):
+        """Separa ruta, puerto, velocidad y pausa de replay://ruta?opciones."""
+        if not url.startswith('replay://'):
+            raise SerialException(f'Se esperaba "replay://ruta?puerto=...&velocidad=...": {url!r}')
+        self.ruta, _, opciones = url[len('replay://'):].partition('?')
+        for opcion, valores in parse_qs(opciones).items():
+            try:
+                if opcion == 'puerto':
+                    self.puerto = valores[0]
+                elif opcion == 'velocidad':
+                    self.velocidad = float(valores[0])
+                elif opcion == 'pausa':
+                    self.pausa = float(valores[0])
+                else:
+                    raise ValueError(f'opcion desconocida: {opcion!r}')
+            except ValueError as e:
+                raise SerialException(f'URL de reproduccion invalida {url!r}: {e}')
+
+    def _leer(self, rutas):
+        """Bloques del puerto elegido como (tiempo de reproduccion, monotonic, hora, bytes)."""
+        reloj = None
+        anterior = None
+        for port, t_mono, hora, data in itertools.chain.from_iterable(leer(ruta) for ruta in rutas):
+            if self.puerto is not None and port != self.puerto:
+                continue
+            if reloj is None:
+                reloj = t_mono
+            else:
+                salto = t_mono - anterior
+                reloj += salto if 0 <= salto <= self.pausa else 0
+            anterior = t_mono
+            yield reloj, t_mono, hora, data
+
+    def _cargar(self, hasta):
+        """
+        Pasa al buffer los bloques cuyo momento ya llego (con velocidad 0,
+        hasta tener 'hasta' bytes). Regresa los segundos hasta el proximo
+        bloque o None si la captura termino.
+        """
+        ahora = time.monotonic()
+        while self._proximo is not None:
+            reloj, t_mono, hora, data = self._proximo
+            if self.velocidad:
+                espera = self._r0 + (reloj - self._t0) / self.velocidad - ahora
+                if espera > 0:
+                    return espera
+            elif len(self._buffer) >= hasta:
+                return 0
+            self._buffer += data
+            self.t_captura = t_mono
+            self.hora_captura = hora
+            self._proximo = next(self._bloques, None)
+        return None
+
+    @property
+    def terminado(self):
+        """La captura ya se entrego completa."""
+        return self._proximo is None and not self._buffer
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        self._cargar(1)
+        return len(self._buffer)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise PortNotOpenError()
+        timeout = Timeout(self._timeout)
+        while len(self._buffer) < size and self.is_open:
+            espera = self._cargar(size)
+            if len(self._buffer) >= size or timeout.expired():
+                break
+            resto = timeout.time_left()
+            if espera is None:
+                # Fin de la captura: se espera el timeout como con un instrumento apagado
+                espera = 0.1 if resto is None else resto
+            elif resto is not None:
+                espera = min(espera, resto)
+            time.sleep(espera)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def write(self, data):
+        if not self.is_open:
+            raise PortNotOpenError()
+        return len(data)
+
+    def reset_input_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+        del self._buffer[:]
+
+    def reset_output_buffer(self):
+        if not self.is_open:
+            raise PortNotOpenError()
+
+    @property
+    def out_waiting(self):
+        return 0
+
+    def _reconfigure_port(self):
+        # La velocidad del puerto no cambia los tiempos de la captura
+        pass
+
+    def _update_break_state(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    def _update_dtr_state(self):
+        pass
+
+    @property
+    def cts(self):
+        return True
+
+    @property
+    def dsr(self):
+        return True
+
+    @property
+    def ri(self):
+        return False
+
+    @property
+    def cd(self):
+        return True
@@ -1,5 +1,7 @@
 import os
+import glob
 from app.xmlcon_rd import xmlcon_rd
+from app import Serializador
 import xml.etree.ElementTree as ET
 
 
@@ -109,6 +111,26 @@ def validate_import_json(dic, modelo=None):
     return True
 
 
+def buscar_campanias(directorio_base):
+    """
+    Busca los archivos json de campañas (con la estructura de un import) dentro
+    de directorio_base y sus subcarpetas, sin entrar en Varios, CNV ni HEX ni en
+    las carpetas Estaciones de las campañas guardadas por estacion.
+    Regresa las rutas en orden inverso al encontrado.
+    """
+    # Patrón para buscar archivos JSON en todas las subcarpetas
+    patron_json = os.path.join(directorio_base, '**', '*.json')
+    archivos = glob.glob(patron_json, recursive=True)
+    archivos = [archivo for archivo in archivos if not any(c in archivo for c in ('Varios', 'CNV', 'HEX'))
+                and os.path.basename(os.path.dirname(archivo)) != 'Estaciones']
+    # Elimino cualquier archivo json que no tenga la estructura de un import
+    validos = list()
+    for archivo in archivos:
+        if validate_import_json(Serializador.leer(archivo)):
+            validos.append(archivo)
+    return list(reversed(validos))
+
+
 # Estructura de carpetas a incluir dentro de una campaña nueva
 exp_path = {
     "virgenes": "Virgenes",
@@ -160,6 +182,7 @@ def Estacion():
         'Cubierta': {},
         'Superficie': {},
         'Fondo': {},
+        'Botellas': {},
         'Comentarios': ''
     }
     return estacion
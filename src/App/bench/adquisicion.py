@@ -0,0 +1,223 @@
+"""
+Benchmark de adquisicion: un QThread por instrumento vs motor asyncio en un solo hilo.
+
+Crea un pseudo-terminal por instrumento (solo Linux) y escribe GPS (RMC), ecosonda
+(DBS), CTD y TSG a su tasa. Cada linea lleva un numero de secuencia (la hora en
+RMC, la profundidad en DBS y el Scan en CTD/TSG), asi se mide la latencia desde
+que se escribe la linea hasta que llega a la funcion conectada en el hilo
+principal. Se informan lineas entregadas, latencia p50/p99, CPU e hilos.
+
+Uso (desde src/App):
+    python -m bench.adquisicion
+    python -m bench.adquisicion --segundos 10 --ctd-hz 24
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import serial
+from PyQt5.QtCore import QCoreApplication, QThread, QTimer
+
+from app.Sentencias import con_checksum
+from app.utils import cfg as modelo_cfg
+
+FILAS_CTD = ["Scan", " Pres", " Temp", " Cond", " Sal", " Bot"]
+FILAS_TSG = ["Scan", " Temp", " Cond", " Sal"]
+
+
+def linea_rmc(seq):
+    return con_checksum('GPRMC,%02d%02d%02d.00,A,3830.0000,S,05730.0000,W,010.0,090.0,010124,,' % (
+        seq // 3600 % 24, seq // 60 % 60, seq % 60))
+
+
+def linea_dbs(seq):
+    return con_checksum('SDDBS,0000.0,f,%06.1f,M,0000.0,F' % seq)
+
+
+def linea_ctd(seq):
+    return b'%8d %9.3f %8.4f %8.5f %8.4f %3d\r\n' % (seq, 10.5, 15.123, 4.1234, 33.9, 0)
+
+
+def linea_tsg(seq):
+    return b'%8d %8.4f %8.5f %8.4f\r\n' % (seq, 15.1, 4.12, 33.9)
+
+
+# Recupera la secuencia a partir del valor entregado a la ventana
+def seq_nmea(valor):
+    h, m, s = (int(x) for x in valor['hora'].split(':'))
+    return h * 3600 + m * 60 + s
+
+
+def seq_dbs(valor):
+    return int(float(valor))
+
+
+def seq_columnas(valor):
+    return int(valor['Scan'])
+
+
+class Emisor(threading.Thread):
+    """Escribe una linea 'hz' veces por segundo y guarda el instante de envio de cada secuencia."""
+
+    def __init__(self, maestro, hz, linea):
+        threading.Thread.__init__(self, daemon=True)
+        self.maestro = maestro
+        self.periodo = 1.0 / hz
+        self.linea = linea
+        self.enviado = dict()
+        self.activo = True
+
+    def run(self):
+        seq = 1
+        proximo = time.monotonic()
+        while self.activo:
+            self.enviado[seq] = time.monotonic()
+            os.write(self.maestro, self.linea(seq))
+            seq += 1
+            proximo += self.periodo
+            espera = proximo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+
+
+class Receptor(object):
+    """Funcion conectada a la señal de un instrumento: calcula la latencia de cada dato."""
+
+    def __init__(self, emisor, seq):
+        self.emisor = emisor
+        self.seq = seq
+        self.latencias = list()
+
+    def __call__(self, valor):
+        ahora = time.monotonic()
+        try:
+            enviado = self.emisor.enviado[self.seq(valor)]
+        except (KeyError, TypeError, ValueError, AttributeError):
+            # NaN por timeout
+            return
+        self.latencias.append(ahora - enviado)
+
+
+def correr(app, segundos):
+    QTimer.singleShot(int(segundos * 1000), app.quit)
+    c0 = time.process_time()
+    t0 = time.monotonic()
+    hilos = 0
+
+    def contar():
+        # Hilos del sistema operativo, sin contar los emisores del benchmark
+        nonlocal hilos
+        with open('/proc/self/status') as estado:
+            total = next(int(l.split()[1]) for l in estado if l.startswith('Threads:'))
+        hilos = max(hilos, total - sum(isinstance(h, Emisor) for h in threading.enumerate()))
+    reloj = QTimer()
+    reloj.timeout.connect(contar)
+    reloj.start(200)
+    app.exec_()
+    reloj.stop()
+    return (time.process_time() - c0) / (time.monotonic() - t0), hilos
+
+
+def con_hilos(app, puertos, receptores, segundos):
+    from app.SerialWorkers import NMEA_Mux_Worker, DBS_Worker, CTD_Worker, TSG_Worker
+    workers = list()
+    for clase, nombre in ((NMEA_Mux_Worker, 'NMEA'), (DBS_Worker, 'DBS'), (CTD_Worker, 'CTD'), (TSG_Worker, 'TSG')):
+        ser = serial.Serial()
+        ser.port, ser.baudrate, ser.timeout = puertos[nombre], 9600, 2
+        worker = clase(ser)
+        hilo = QThread()
+        worker.moveToThread(hilo)
+        hilo.started.connect(worker.work)
+        worker.intReady.connect(receptores[nombre])
+        workers.append((worker, hilo))
+    for worker, hilo in workers:
+        hilo.start()
+    cpu, hilos = correr(app, segundos)
+    for worker, hilo in workers:
+        worker.working = False
+    for worker, hilo in workers:
+        hilo.quit()
+        hilo.wait()
+    return cpu, hilos
+
+
+def con_motor(app, puertos, receptores, segundos):
+    from app.Adquisicion import Motor, PuenteQt, CanalNMEA, CanalColumnas
+    motor = Motor()
+    motor.agregar(CanalNMEA('NMEA', puertos['NMEA'], 9600))
+    motor.agregar(CanalNMEA('Batimetria', puertos['DBS'], 9600, timeout=3, posicion=False, profundidad=True))
+    motor.agregar(CanalColumnas('CTD', puertos['CTD'], 9600, 5, FILAS_CTD))
+    motor.agregar(CanalColumnas('TSG', puertos['TSG'], 9600, 3, FILAS_TSG))
+    # Sin limite de entregas (hz=0): como con_hilos, cada dato va a la ventana apenas llega
+    puente = PuenteQt(motor, hz=0)
+    for nombre, receptor in receptores.items():
+        puente.conectar(nombre, receptor)
+    motor.start()
+    cpu, hilos = correr(app, segundos)
+    motor.stop()
+    return cpu, hilos
+
+
+def percentil(valores, p):
+    if not valores:
+        return float('nan')
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p / 100 * len(valores)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--segundos', type=float, default=5)
+    parser.add_argument('--gps-hz', type=float, default=5)
+    parser.add_argument('--dbs-hz', type=float, default=2)
+    parser.add_argument('--ctd-hz', type=float, default=24)
+    parser.add_argument('--tsg-hz', type=float, default=1)
+    args = parser.parse_args(argv)
+
+    app = QCoreApplication(sys.argv[:1])
+    # Los workers de CTD y TSG leen config.json del directorio de trabajo
+    directorio = tempfile.mkdtemp()
+    cfg = modelo_cfg()
+    cfg['Configuracion']['CTD']['filas'] = FILAS_CTD
+    cfg['Configuracion']['TSG']['filas'] = FILAS_TSG
+    with open(os.path.join(directorio, 'config.json'), 'w') as archivo:
+        json.dump(cfg, archivo)
+    os.chdir(directorio)
+
+    fuentes = (('NMEA', args.gps_hz, linea_rmc, seq_nmea), ('DBS', args.dbs_hz, linea_dbs, seq_dbs),
+               ('CTD', args.ctd_hz, linea_ctd, seq_columnas), ('TSG', args.tsg_hz, linea_tsg, seq_columnas))
+    print(f"{'diseño':<10}{'instrumento':<13}{'enviadas':>9}{'entregadas':>12}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'CPU':>8}{'hilos':>7}")
+    for diseño, correr_diseño in (('QThread', con_hilos), ('asyncio', con_motor)):
+        emisores, puertos, receptores, esclavos = dict(), dict(), dict(), list()
+        for nombre, hz, linea, seq in fuentes:
+            maestro, esclavo = os.openpty()
+            esclavos.append((maestro, esclavo))
+            puertos[nombre] = os.ttyname(esclavo)
+            emisores[nombre] = Emisor(maestro, hz, linea)
+            receptores[nombre] = Receptor(emisores[nombre], seq)
+        for emisor in emisores.values():
+            emisor.start()
+        cpu, hilos = correr_diseño(app, puertos, receptores, args.segundos)
+        for emisor in emisores.values():
+            emisor.activo = False
+            emisor.join()
+        for nombre, receptor in receptores.items():
+            lat = receptor.latencias
+            print(f"{diseño:<10}{nombre:<13}{len(emisores[nombre].enviado):>9}{len(lat):>12}"
+                  f"{1000 * percentil(lat, 50):>9.2f}{1000 * percentil(lat, 99):>9.2f}"
+                  f"{100 * cpu:>7.1f}%{hilos:>7}")
+        print(f"{diseño:<10}{'mediana':<13}{'':>9}{'':>12}"
+              f"{1000 * statistics.median(x for r in receptores.values() for x in r.latencias):>9.2f}")
+        for maestro, esclavo in esclavos:
+            os.close(esclavo)
+            os.close(maestro)
+
+
+if __name__ == '__main__':
+    main()
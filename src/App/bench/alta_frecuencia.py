@@ -0,0 +1,77 @@
+"""
+Benchmark del modo rapido del CTD (911plus a 24 Hz) con la cola acotada.
+
+Simula un lance profundo de 'horas' horas: cada scan se decodifica en un
+CanalColumnas y se publica en una Cola acotada que se vacia al Almacen a
+'hz' veces por segundo, como el PuenteQt. A mitad del lance la ventana deja
+de vaciar la cola durante 'traba' segundos. El tiempo es simulado, asi el
+lance completo corre a la velocidad de la PC. Para cada politica reporta
+scans por segundo, memoria maxima (tracemalloc), scans descartados y los que
+llegaron al almacen, y verifica que no se pierda ni se cuente dos veces ningun scan.
+
+Uso (desde src/App):
+    python -m bench.alta_frecuencia
+    python -m bench.alta_frecuencia --horas 3 --traba 1200 --limite 20000
+"""
+import argparse
+import time
+import tracemalloc
+
+from app import utils
+from app.Adquisicion import CanalColumnas, Cola, DESCARTAR, DIEZMAR
+from app.RingBuffer import Almacen
+from bench.suite import FILAS_CTD, FILAS_TSG, linea_ctd
+
+HZ_911 = 24
+
+
+def lance(politica, scans, limite, hz, traba):
+    cfg = utils.cfg()
+    cfg['Configuracion']['CTD']['filas'] = FILAS_CTD
+    cfg['Configuracion']['TSG']['filas'] = FILAS_TSG
+    almacen = Almacen(cfg)
+    canal = CanalColumnas('CTD', 'loop://', 9600, 1, FILAS_CTD)
+    cola = Cola(limite, politica)
+    # Scans entre dos vaciados de la ventana y scans en que la ventana no vacia
+    cada = max(1, HZ_911 // hz)
+    trabado = range(scans // 2, scans // 2 + traba * HZ_911)
+    guardados = 0
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for i in range(scans):
+        t = i / HZ_911
+        for señal, valor in canal.decode(linea_ctd(i), t):
+            cola._publicar(señal, valor, t)
+        if i % cada == 0 and i not in trabado:
+            for señal, valor, t in cola.vaciar():
+                almacen.agregar(señal, valor, t)
+                guardados += 1
+    for señal, valor, t in cola.vaciar():
+        almacen.agregar(señal, valor, t)
+        guardados += 1
+    segundos = time.perf_counter() - t0
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico, cola.descartados, guardados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--horas', type=float, default=3)
+    parser.add_argument('--traba', type=int, default=1200, help='segundos sin vaciar la cola')
+    parser.add_argument('--limite', type=int, default=20000, help='scans pendientes como maximo')
+    parser.add_argument('--hz', type=int, default=10, help='vaciados por segundo de la ventana')
+    args = parser.parse_args(argv)
+
+    scans = int(args.horas * 3600 * HZ_911)
+    print(f"{scans} scans ({args.horas} h a {HZ_911} Hz), ventana trabada {args.traba} s "
+          f"({args.traba * HZ_911} scans), limite {args.limite}")
+    print(f"{'politica':<11}{'scans/s':>10}{'MB max':>8}{'descartados':>13}{'guardados':>11}  verificacion")
+    for politica in (DESCARTAR, DIEZMAR):
+        segundos, pico, descartados, guardados = lance(politica, scans, args.limite, args.hz, args.traba)
+        cuenta = 'completa' if descartados + guardados == scans else 'DISTINTA'
+        print(f"{politica:<11}{scans / segundos:>10.0f}{pico / 2 ** 20:>8.1f}{descartados:>13}{guardados:>11}  {cuenta}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark de la captura de bytes crudos en el camino de lectura.
+
+Arma lineas con LineFramer sobre un puerto simulado en memoria, sin captura y
+con un app.Captura.Grabador real (archivos en un directorio temporal, rotacion
+chica para que tambien trabaje el hilo de compresion). Reporta el costo por
+bloque leido en el hilo de lectura y el porcentaje de CPU que agrega la captura
+a un puerto a 115200 baud (11520 bytes/s), incluida la compresion.
+
+Uso (desde src/App):
+    python -m bench.captura
+    python -m bench.captura --lineas 200000 --bloque 64
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.Captura import Grabador, leer
+from app.Framer import LineFramer
+from bench.framer import PuertoMemoria, generar_datos
+
+BYTES_115200 = 115200 / 10
+
+
+def medir(datos, bloque, grabador=None):
+    ser = PuertoMemoria(datos, bloque)
+    framer = LineFramer(ser)
+    if grabador is not None:
+        framer.captura = grabador.capturador('/dev/ttyBENCH')
+    bloques = 0
+    c0 = time.process_time()
+    t0 = time.perf_counter()
+    while ser.in_waiting:
+        framer.feed(framer.read_chunk())
+        bloques += 1
+    t_lectura = time.perf_counter() - t0
+    if grabador is not None:
+        # La compresion de los archivos rotados tambien es costo de la captura
+        grabador.close()
+    cpu = time.process_time() - c0
+    return bloques, t_lectura, cpu
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--lineas', type=int, default=100000)
+    parser.add_argument('--bloque', type=int, default=32, help='bytes por lectura del puerto')
+    parser.add_argument('--rotar', type=float, default=1, help='MB por archivo de captura')
+    args = parser.parse_args(argv)
+
+    datos = generar_datos(args.lineas)
+    print(f"{len(datos)} bytes en bloques de {args.bloque} "
+          f"({len(datos) / BYTES_115200:.0f} s de un puerto a 115200 baud)")
+    print(f"{'captura':<10}{'us/bloque':>11}{'MB/s':>9}{'CPU a 115200':>14}")
+    resultados = dict()
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in ('no', 'si'):
+            grabador = None
+            if nombre == 'si':
+                grabador = Grabador(directorio, max_bytes=int(args.rotar * 2 ** 20), copias=None)
+            bloques, t_lectura, cpu = medir(datos, args.bloque, grabador)
+            resultados[nombre] = (t_lectura, cpu)
+            print(f"{nombre:<10}{1e6 * t_lectura / bloques:>11.2f}{len(datos) / t_lectura / 2 ** 20:>9.1f}"
+                  f"{100 * cpu / len(datos) * BYTES_115200:>13.3f}%")
+        archivos = sorted(os.listdir(directorio))
+        grabado = sum(len(b) for archivo in archivos for _, _, _, b in leer(os.path.join(directorio, archivo)))
+        comprimido = sum(os.path.getsize(os.path.join(directorio, archivo)) for archivo in archivos)
+    extra = resultados['si'][1] - resultados['no'][1]
+    print(f"captura: {len(archivos)} archivos, {comprimido / 2 ** 20:.2f} MB comprimidos, "
+          f"{'completa' if grabado == len(datos) else f'INCOMPLETA ({grabado} de {len(datos)} bytes)'}")
+    print(f"CPU agregada por la captura a 115200 baud: {100 * extra / len(datos) * BYTES_115200:.3f}%")
+
+
+if __name__ == '__main__':
+    main()
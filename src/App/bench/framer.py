@@ -0,0 +1,117 @@
+"""
+Benchmark del armado de lineas del puerto serie.
+
+Compara el Read_until original (lectura byte a byte) contra LineFramer
+(lectura de a bloques con in_waiting) sobre un puerto simulado en memoria.
+Reporta bytes/s y el porcentaje de CPU que consumiria un puerto a cada baud rate.
+
+Uso (desde src/App):
+    python -m bench.framer
+    python -m bench.framer --lineas 20000 --bloque 32
+"""
+import argparse
+import time
+
+from app.Framer import LineFramer, LF, Timeout
+
+
+class PuertoMemoria(object):
+    """Puerto serie en memoria que entrega los datos en bloques de 'bloque' bytes."""
+
+    def __init__(self, datos, bloque=16, timeout=1):
+        self._datos = datos
+        self._pos = 0
+        self.bloque = bloque
+        self.timeout = timeout
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return min(self.bloque, len(self._datos) - self._pos)
+
+    def read(self, size=1):
+        dato = self._datos[self._pos:self._pos + size]
+        self._pos += len(dato)
+        return dato
+
+
+def read_until_original(ser, expected=LF, size=None):
+    """Copia del Read_until byte a byte que usaban NMEA y BaseSerialWorker."""
+    lenterm = len(expected)
+    line = bytearray()
+    timeout = Timeout(ser.timeout)
+    while True:
+        c = ser.read(1)
+        if c:
+            line += c
+            if line[-lenterm:] == expected:
+                break
+            if size is not None and len(line) >= size:
+                break
+        else:
+            raise TimeoutError
+        if timeout.expired():
+            break
+    return bytes(line)
+
+
+def generar_datos(lineas):
+    """Mezcla de sentencias NMEA y scans de CTD como los que llegan por los puertos."""
+    muestras = [
+        b'$GPRMC,123519,A,4807.038,S,01131.000,W,022.4,084.4,230394,003.1,W*65\r\n',
+        b'     1234    12.345   15.1234   4.123456   34.5678   0\r\n',
+        b'$SDDBS,0153.2,f,0046.7,M,0025.5,F*33\r\n',
+    ]
+    return b''.join(muestras[i % len(muestras)] for i in range(lineas))
+
+
+def read_framer(ser):
+    """Lectura con LineFramer, un framer por puerto como en los workers."""
+    framer = getattr(ser, '_framer', None)
+    if framer is None:
+        framer = ser._framer = LineFramer(ser)
+    return framer.readline()
+
+
+def medir(funcion, datos, bloque):
+    ser = PuertoMemoria(datos, bloque)
+    lineas = 0
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    try:
+        while True:
+            funcion(ser)
+            lineas += 1
+    except TimeoutError:
+        pass
+    cpu = time.process_time() - c0
+    pared = time.perf_counter() - t0
+    return lineas, pared, cpu
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--lineas', type=int, default=20000)
+    parser.add_argument('--bloque', type=int, default=16,
+                        help='bytes disponibles en in_waiting por lectura')
+    parser.add_argument('--baud', type=int, nargs='+', default=[4800, 9600, 19200])
+    args = parser.parse_args(argv)
+
+    datos = generar_datos(args.lineas)
+    candidatos = {
+        'byte a byte': read_until_original,
+        'LineFramer': read_framer,
+    }
+    print(f"{len(datos)} bytes, {args.lineas} lineas, bloque {args.bloque} bytes")
+    print(f"{'metodo':<14}{'lineas':>8}{'bytes/s':>14}{'CPU us/byte':>14}" +
+          ''.join(f"{'CPU@' + str(b):>12}" for b in args.baud))
+    for nombre, funcion in candidatos.items():
+        lineas, pared, cpu = medir(funcion, datos, args.bloque)
+        por_byte = cpu / len(datos)
+        # Un puerto serie 8N1 transfiere baud/10 bytes por segundo
+        carga = ''.join(f"{100 * por_byte * b / 10:>11.3f}%" for b in args.baud)
+        print(f"{nombre:<14}{lineas:>8}{len(datos) / pared:>14,.0f}{por_byte * 1e6:>14.3f}{carga}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark de la decodificacion en lote de scans de CTD y TSG.
+
+Compara, sobre los mismos scans, el camino de a una linea (Esquema.decode,
+Scans.contar y RingBuffer.append) con el camino en lote (Esquema.lote,
+Scans.contar_lote y RingBuffer.extend) que usan el Motor y los workers cuando
+se juntan lineas. Las lineas se procesan en tandas de 'tanda' lineas, como las
+que entrega el framer despues de una demora. Verifica que los dos caminos
+guarden los mismos valores y cuenten los mismos scans perdidos.
+
+Uso (desde src/App):
+    python -m bench.lote
+    python -m bench.lote --scans 100000 1000000 --tanda 4096
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.Esquema import compilar
+from app.RingBuffer import RingBuffer
+from app.SerialWorkers import Scans
+from bench.suite import FILAS_CTD, FILAS_TSG, linea_ctd, linea_tsg
+
+INSTRUMENTOS = {'CTD': (FILAS_CTD, linea_ctd), 'TSG': (FILAS_TSG, linea_tsg)}
+
+
+def generar(linea, scans, saltos=1000):
+    """
+    Lineas con, cada 'saltos' scans, una linea con una columna de mas (error,
+    su scan se pierde) y la siguiente cortada (le faltan columnas, queda DUDOSA).
+    """
+    lineas = list()
+    for i in range(scans):
+        if i % saltos == saltos - 1:
+            lineas.append(linea(i).rstrip() + b' 1\r\n')
+            continue
+        if i % saltos == 0 and i:
+            lineas.append(linea(i)[:9] + b'\r\n')
+            continue
+        lineas.append(linea(i))
+    return lineas
+
+
+def por_linea(esquema, tandas, capacidad):
+    scans = Scans(esquema)
+    buffer = RingBuffer(esquema.claves, capacidad)
+    errores = 0
+    for t, tanda in enumerate(tandas):
+        for line in tanda:
+            try:
+                dato = esquema.decode(line, t)
+            except (UnicodeDecodeError, KeyError):
+                errores += 1
+                continue
+            scans.contar(dato)
+            buffer.append(dato, t)
+    return scans, buffer, errores
+
+
+def en_lote(esquema, tandas, capacidad):
+    scans = Scans(esquema)
+    buffer = RingBuffer(esquema.claves, capacidad)
+    errores = 0
+    for t, tanda in enumerate(tandas):
+        lote = esquema.lote(tanda, t)
+        errores += lote.invalidas
+        scans.contar_lote(lote)
+        buffer.extend(lote.datos, t)
+    return scans, buffer, errores
+
+
+def medir(funcion, *args):
+    t0 = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - t0, resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--scans', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--tanda', type=int, default=4096, help='lineas por lectura del framer')
+    parser.add_argument('--capacidad', type=int, default=8192, help='muestras del RingBuffer')
+    args = parser.parse_args(argv)
+
+    print(f"{'':<5}{'scans':>9}{'linea/s':>12}{'lote/s':>12}{'veces':>8}  verificacion")
+    for nombre, (filas, linea) in INSTRUMENTOS.items():
+        esquema = compilar(filas)
+        for cantidad in args.scans:
+            lineas = generar(linea, cantidad)
+            tandas = [lineas[i:i + args.tanda] for i in range(0, len(lineas), args.tanda)]
+            t_linea, (scans_l, buffer_l, errores_l) = medir(por_linea, esquema, tandas, args.capacidad)
+            t_lote, (scans_b, buffer_b, errores_b) = medir(en_lote, esquema, tandas, args.capacidad)
+            iguales = (np.array_equal(buffer_l.datos, buffer_b.datos, equal_nan=True)
+                       and scans_l.perdidos == scans_b.perdidos and errores_l == errores_b)
+            verificacion = 'iguales' if iguales else 'DISTINTOS'
+            print(f"{nombre:<5}{cantidad:>9}{cantidad / t_linea:>12.0f}{cantidad / t_lote:>12.0f}"
+                  f"{t_linea / t_lote:>8.1f}  {verificacion} ({scans_b.perdidos} perdidos, {errores_b} errores)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Micro-benchmark del decodificador NMEA: expresiones regulares vs separacion de campos.
+
+Recorre un corpus de lineas y compara, para RMC y DBS, las lineas/s de cada
+metodo y cuantas lineas acepta o rechaza correctamente. El corpus sintetico
+mezcla sentencias validas con lineas de checksum alterado, cortadas o con ruido,
+como las que aparecen al conectar un puerto en medio de una transmision.
+Con --corpus se usa un archivo grabado (una sentencia por linea); en ese caso
+se toma como referencia la validacion del checksum.
+
+Uso (desde src/App):
+    python -m bench.nmea_decoder
+    python -m bench.nmea_decoder --corpus grabacion.txt
+"""
+import argparse
+import random
+import re
+import time
+
+from app.RMC import RMC
+from app.DBS import DBS
+from app.Sentencias import con_checksum, split_sentence
+
+# Expresiones regulares que usaban RMC y DBS antes del decodificador por campos
+EXPREG_RMC = "\\$??(?P<sentencia>.*?)[\\,|\\, ](?P<hour>\\d{1,2})(?P<min>\\d{1,2})(?P<sec>\\d{1,2})" +\
+    "[\\.(?P<msec>\\d{1,3})|\\][\\,|\\, ](?P<status>.*?)[\\,|\\, ](?P<Lat>\\d{1,2})(?P<Lat_min>\\d{1,2}[\\.|\\,]" +\
+    "\\d{1,6})[\\,|\\, ](?P<Lat_cuadrante>[N|n|S|s])[\\,|\\, ](?P<Lon>\\d{1,3})(?P<Lon_min>\\d{1,2}[\\.|\\,]" +\
+    "\\d{1,6})[\\,|\\, ](?P<Lon_cuadrante>[W|w|E|e])[\\,|\\, ](?P<Speed>\\d{1,3}\\.\\d{1,2})[\\,|\\, ](?P<Dir>" +\
+    "\\d{1,3}\\.\\d{1,2})[\\,|\\, ](?P<dia>\\d{1,2})(?P<Mes>\\d{1,2})(?P<Año>\\d{1,4})[\\,|\\, ](?P<value>.*?)\\r?\\n"
+EXPREG_DBS = '\\$??(?P<sentencia>.*?)[\\,|\\, ](?P<ZF>\\d{1,})[\\.|\\. ](?P<ZFdec>\\d{1,})[\\,|\\, ]' +\
+    '(?P<ZunF>[f])[\\,|\\, ](?P<ZM>\\d{1,})[\\.|\\. ](?P<ZMdec>\\d{1,})[\\,|\\, ](?P<ZunM>[M])[\\,|\\, ]' +\
+    '(?P<ZFa>\\d{1,})[\\.|\\. ](?P<ZFadec>\\d{1,})[\\,|\\, ](?P<ZunFa>[F])' +\
+    '(?P<value>.*?)\\r?\\n?'
+
+
+def _rmc(azar):
+    lat = azar.uniform(0, 60)
+    lon = azar.uniform(0, 70)
+    return ('GPRMC,%02d%02d%02d.00,A,%02d%07.4f,S,%03d%07.4f,W,%05.1f,%05.1f,%02d%02d%02d,,' % (
+        azar.randrange(24), azar.randrange(60), azar.randrange(60),
+        int(lat), (lat % 1) * 60, int(lon), (lon % 1) * 60,
+        azar.uniform(0, 15), azar.uniform(0, 360),
+        azar.randrange(1, 29), azar.randrange(1, 13), azar.randrange(20, 30)))
+
+
+def _dbs(azar):
+    z = azar.uniform(5, 5000)
+    return 'SDDBS,%06.1f,f,%06.1f,M,%06.1f,F' % (z * 3.2808, z, z * 0.5468)
+
+
+OTRAS = (
+    lambda azar: 'GPGGA,123519,4807.038,S,01131.000,W,1,08,0.9,545.4,M,46.9,M,,',
+    lambda azar: 'GPVTG,054.7,T,034.4,M,005.5,N,010.2,K',
+    lambda azar: 'HEHDT,%05.1f,T' % azar.uniform(0, 360),
+    lambda azar: 'GPZDA,201530.00,04,07,2024,00,00',
+)
+
+
+def _corromper(linea, azar):
+    """Altera una linea valida de alguna de las formas que se ven en un puerto serie."""
+    tipo = azar.randrange(3)
+    if tipo == 0:
+        # Un digito cambiado: el checksum ya no coincide
+        pos = [i for i, c in enumerate(linea[:linea.index(b'*')]) if 48 <= c <= 57]
+        i = azar.choice(pos)
+        return linea[:i] + bytes([48 + (linea[i] - 47) % 10]) + linea[i + 1:]
+    elif tipo == 1:
+        # Linea cortada: se perdio el final y se pego el inicio de la siguiente
+        return linea[:azar.randrange(10, len(linea) - 6)] + b'\r\n'
+    else:
+        # Ruido de conexion antes del inicio de la sentencia
+        return bytes(azar.randrange(32, 127) for _ in range(azar.randrange(1, 6))) + linea[1:]
+
+
+def generar_corpus(lineas, semilla=1):
+    """Regresa una lista de (linea, tipo) donde tipo es 'RMC', 'DBS', 'otra' o 'invalida'."""
+    azar = random.Random(semilla)
+    corpus = list()
+    for _ in range(lineas):
+        r = azar.random()
+        if r < 0.3:
+            linea, tipo = con_checksum(_rmc(azar)), 'RMC'
+        elif r < 0.5:
+            linea, tipo = con_checksum(_dbs(azar)), 'DBS'
+        else:
+            linea, tipo = con_checksum(azar.choice(OTRAS)(azar)), 'otra'
+        if azar.random() < 0.1:
+            linea, tipo = _corromper(linea, azar), 'invalida'
+        corpus.append((linea, tipo))
+    return corpus
+
+
+def cargar_corpus(archivo):
+    """Corpus grabado: la referencia es la validacion del checksum."""
+    corpus = list()
+    with open(archivo, 'rb') as f:
+        for linea in f:
+            partes = split_sentence(linea, requerir_checksum=True)
+            tipo = partes[1] if partes is not None else 'invalida'
+            corpus.append((linea, tipo))
+    return corpus
+
+
+def por_regex(expreg):
+    def decodificar(linea):
+        # Igual que el Read original: compila y busca dos veces la linea aceptada
+        patron = re.compile(expreg)
+        dato = linea.decode('ASCII', errors='replace')
+        if re.search(patron, dato) is None:
+            return None
+        return re.search(patron, dato)
+    return decodificar
+
+
+def medir(decodificar, corpus, sentencia):
+    aceptadas = falsas_aceptadas = falsas_rechazadas = 0
+    t0 = time.perf_counter()
+    resultados = [decodificar(linea) is not None for linea, _ in corpus]
+    pared = time.perf_counter() - t0
+    for aceptada, (_, tipo) in zip(resultados, corpus):
+        esperada = (tipo == sentencia)
+        aceptadas += aceptada
+        if aceptada and not esperada:
+            falsas_aceptadas += 1
+        elif esperada and not aceptada:
+            falsas_rechazadas += 1
+    exactitud = 1 - (falsas_aceptadas + falsas_rechazadas) / len(corpus)
+    return len(corpus) / pared, aceptadas, falsas_aceptadas, falsas_rechazadas, exactitud
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--lineas', type=int, default=50000)
+    parser.add_argument('--corpus', help='archivo con sentencias grabadas')
+    args = parser.parse_args(argv)
+
+    corpus = cargar_corpus(args.corpus) if args.corpus else generar_corpus(args.lineas)
+    print(f"{len(corpus)} lineas, {sum(t == 'invalida' for _, t in corpus)} invalidas")
+    print(f"{'sentencia':<10}{'metodo':<10}{'lineas/s':>12}{'aceptadas':>11}"
+          f"{'falsas +':>10}{'falsas -':>10}{'exactitud':>11}")
+    metodos = (
+        ('RMC', 'regex', por_regex(EXPREG_RMC)),
+        ('RMC', 'campos', RMC().Decode),
+        ('DBS', 'regex', por_regex(EXPREG_DBS)),
+        ('DBS', 'campos', DBS().Decode),
+    )
+    for sentencia, nombre, decodificar in metodos:
+        tasa, aceptadas, fa, fr, exactitud = medir(decodificar, corpus, sentencia)
+        print(f"{sentencia:<10}{nombre:<10}{tasa:>12,.0f}{aceptadas:>11}{fa:>10}{fr:>10}{100 * exactitud:>10.2f}%")
+
+
+if __name__ == '__main__':
+    main()
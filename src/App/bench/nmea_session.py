@@ -0,0 +1,85 @@
+"""
+Benchmark de sesiones NMEA: abrir el puerto en cada lectura vs sesion persistente.
+
+Crea un pseudo-terminal (solo Linux), escribe sentencias RMC/GGA/DBS a la tasa
+indicada y mide cuantas sentencias por segundo obtiene RMC.Read() y DBS.Read()
+en cada modo.
+
+Uso (desde src/App):
+    python -m bench.nmea_session
+    python -m bench.nmea_session --hz 10 --segundos 5
+"""
+import argparse
+import os
+import threading
+import time
+
+from app.RMC import RMC
+from app.DBS import DBS
+from app.Sentencias import con_checksum
+
+RMC_LINEA = con_checksum('GPRMC,123519.00,A,4807.038,S,01131.000,W,022.4,084.4,230394,003.1,W')
+GGA_LINEA = con_checksum('GPGGA,123519,4807.038,S,01131.000,W,1,08,0.9,545.4,M,46.9,M,,')
+DBS_LINEA = con_checksum('SDDBS,0153.2,f,0046.7,M,0025.5,F')
+
+
+class Emisor(threading.Thread):
+    """Escribe un ciclo RMC+GGA+DBS 'hz' veces por segundo en el maestro del pty."""
+
+    def __init__(self, maestro, hz):
+        threading.Thread.__init__(self, daemon=True)
+        self.maestro = maestro
+        self.periodo = 1.0 / hz
+        self.activo = True
+        self.ciclos = 0
+
+    def run(self):
+        proximo = time.monotonic()
+        while self.activo:
+            os.write(self.maestro, RMC_LINEA + GGA_LINEA + DBS_LINEA)
+            self.ciclos += 1
+            proximo += self.periodo
+            espera = proximo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+
+
+def medir(clase, puerto, persistent, segundos):
+    lector = clase(port=puerto, timeout=1, persistent=persistent)
+    fin = time.monotonic() + segundos
+    c0 = time.process_time()
+    while time.monotonic() < fin:
+        try:
+            lector.Read()
+        except TimeoutError:
+            pass
+    cpu = time.process_time() - c0
+    tasa = lector.Get_Rate()
+    lector.close()
+    return tasa, cpu / segundos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--hz', type=float, default=10, help='ciclos RMC+GGA+DBS por segundo')
+    parser.add_argument('--segundos', type=float, default=3)
+    args = parser.parse_args(argv)
+
+    maestro, esclavo = os.openpty()
+    puerto = os.ttyname(esclavo)
+    emisor = Emisor(maestro, args.hz)
+    emisor.start()
+    print(f"Puerto {puerto}, fuente {args.hz:.1f} sentencias/s por tipo")
+    print(f"{'sentencia':<10}{'modo':<14}{'sentencias/s':>14}{'CPU':>8}")
+    try:
+        for clase in (RMC, DBS):
+            for persistent, modo in ((False, 'abrir/cerrar'), (True, 'persistente')):
+                tasa, cpu = medir(clase, puerto, persistent, args.segundos)
+                print(f"{clase.__name__:<10}{modo:<14}{tasa:>14.2f}{100 * cpu:>7.1f}%")
+    finally:
+        emisor.activo = False
+        os.close(esclavo)
+
+
+if __name__ == '__main__':
+    main()
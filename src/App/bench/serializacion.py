@@ -0,0 +1,60 @@
+"""
+Benchmark de los formatos de los archivos de campaña (app.Serializador).
+
+Para campañas sinteticas de 50, 500 y 5000 estaciones (las de bench.suite)
+mide, en cada formato, el tiempo de codificar la campaña completa, el de
+decodificarla (con el reconocimiento automatico del formato) y el tamaño del
+archivo. Verifica que lo decodificado sea igual a la campaña original. Los
+tiempos son el mejor de 'repeticiones' intentos.
+
+Uso (desde src/App):
+    python -m bench.serializacion
+    python -m bench.serializacion --estaciones 50 500 5000 --repeticiones 3
+    python -m bench.serializacion --formatos json orjson
+"""
+import argparse
+import time
+
+from app import Serializador
+from bench.suite import campaña
+
+
+def mejor(funcion, repeticiones):
+    """Regresa (mejor tiempo, resultado) de llamar 'repeticiones' veces a funcion."""
+    tiempos = list()
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--estaciones', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--formatos', nargs='+', choices=Serializador.FORMATOS, default=list(Serializador.FORMATOS))
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if Serializador.orjson is None:
+        print("orjson no esta instalado: 'orjson' y 'binario' usan el json de Python")
+    print(f"{'estaciones':>10}  {'formato':<10}{'codificar ms':>14}{'decodificar ms':>16}{'MB':>9}"
+          f"{'vs json':>9}  verificacion")
+    for estaciones in args.estaciones:
+        datos = campaña(estaciones)
+        # Tamaño del primer formato (json con sangria, si no se elige otro)
+        referencia = None
+        for nombre in args.formatos:
+            formato = Serializador.formato(nombre)
+            t_cod, contenido = mejor(lambda: Serializador.codificar(datos, formato), args.repeticiones)
+            t_dec, leido = mejor(lambda: Serializador.decodificar(contenido), args.repeticiones)
+            if referencia is None:
+                referencia = len(contenido)
+            relacion = f'{len(contenido) / referencia:>8.2f}x'
+            verificacion = 'iguales' if leido == datos else 'DISTINTOS'
+            print(f"{estaciones:>10}  {nombre:<10}{t_cod * 1e3:>14.1f}{t_dec * 1e3:>16.1f}"
+                  f"{len(contenido) / 1e6:>9.2f}{relacion}  {verificacion}")
+
+
+if __name__ == '__main__':
+    main()
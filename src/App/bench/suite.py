@@ -0,0 +1,440 @@
+"""
+Suite de benchmarks del decodificado y de los archivos de campaña.
+
+Corre cada caso repetidas veces y reporta operaciones por segundo, latencia
+p50/p99 de cada llamada y el pico de memoria (tracemalloc) de una llamada. Los
+resultados se pueden guardar en JSON y comparar contra una base guardada: un
+caso con menos operaciones/s o mas memoria que la base (mas alla del umbral)
+es una regresion y el programa sale con codigo 1.
+
+Casos: RMC y DBS (Decode), columnas de ConfiguredSerialWorker, el agregado de
+scans CTD al Almacen (desde Muestras y desde diccionarios de textos), save_json de
+StationManager con 10/100/1000 estaciones (en un solo JSON y por estaciones), un evento de CTD en el diario y en la
+base SQLite, un disparo de botella (W_Bott) en la base, la consulta de las botellas de una estacion en la
+base, xmlcon_rd, buscar_campanias (la
+busqueda de Frm_Inicio.cargar_campanias) y la exportacion de una estacion a la
+planilla con app.Planilla.exportar (la misma que llama click_btn_Exportar: lee
+el EstNNNN.txt, carga la plantilla, llena las celdas y la guarda).
+
+Uso (desde src/App):
+    python -m bench.suite
+    python -m bench.suite --guardar base.json
+    python -m bench.suite --base base.json --umbral 0.2
+    python -m bench.suite --filtro save_json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from app import utils
+from app.DBS import DBS
+from app.Esquema import compilar
+from app.RMC import RMC
+from app.RingBuffer import Almacen
+from app.SerialWorkers import posicion
+from app.StationManager import StationManager
+from app.Diario import Diario
+from app.BaseDatos import BaseDatos
+from app import Fragmentos
+from app import Planilla
+from app.xmlcon_rd import xmlcon_rd
+from bench.nmea_decoder import generar_corpus
+
+# nombre -> (preparar, operaciones por llamada)
+CASOS = dict()
+
+FILAS_CTD = ["Scan", " Pres", " Temp", " Cond", " Sal", " Bot"]
+FILAS_TSG = ["ScanCount", "  JulianDays", "  Longitude", "  Latitude", "  Temperature",
+             "  Conductivity", "  Salinity", "  Density", "  TemperatureSBE38"]
+
+
+def caso(nombre, operaciones=1):
+    """Registra la funcion que prepara un caso. preparar(directorio) regresa la funcion a medir."""
+    def registrar(preparar):
+        CASOS[nombre] = (preparar, operaciones)
+        return preparar
+    return registrar
+
+
+def linea_ctd(scan):
+    return b'%8d %11.4f %11.4f %11.4f %11.4f %3d\r\n' % (scan, scan * 0.1, 15.1234, 4.1234, 33.9876, scan // 500)
+
+
+def linea_tsg(scan):
+    return (b'%8d' % scan) + b''.join(b' %11.4f' % v for v in (291.5, -57.5, -38.5, 15.2, 4.2, 34.1, 1025.3, 15.21)) + b'\r\n'
+
+
+def estacion(nro):
+    """Estacion completa como las que guarda StationManager."""
+    ctd = compilar(FILAS_CTD).decode(linea_ctd(int(nro)))
+    tsg = compilar(FILAS_TSG).decode(linea_tsg(int(nro)))
+    datos = utils.Estacion()
+    datos['NroEstacion'] = nro
+    datos['Posicion'] = {'Inicio': {'Latitud': '-38.51234', 'Longitud': '-57.51234'},
+                         'Fin': {'Latitud': '-38.52345', 'Longitud': '-57.52345'}}
+    datos['FechaHora'] = {'Inicio': {'FechaGMT': '010124', 'HoraGMT': '10:00:00'},
+                          'Fin': {'FechaGMT': '010124', 'HoraGMT': '11:30:00'}}
+    datos['Batimetria'] = {'Inicio': '153.2', 'Fin': '151.8'}
+    for grupo in ('Primarios', 'Secundarios', 'Auxiliares'):
+        for sensor in ('TemperatureSensor', 'ConductivitySensor', 'PressureSensor', 'OxygenSensor'):
+            datos['Instrumento']['Sensores'][grupo][sensor] = {'SerialNumber': '1234', 'CalibrationDate': '01-Jan-24'}
+    for i in range(2):
+        datos['Cubierta'][str(i)] = dict(ctd)
+        datos['Fondo'][str(i)] = dict(ctd)
+        datos['Superficie'][str(i)] = {'Hora': '10:05:00', 'CTD': dict(ctd), 'TSG': dict(tsg),
+                                       'ventana': 10, 'deltaT': '0.0123', 'deltaS': '0.0045',
+                                       'errorAlineacion': '0.5', 'puntos': 240}
+    return datos
+
+
+def campaña(estaciones):
+    return {
+        'Expedicion': {'Id': 0, 'Buque': 'VA', 'Anio': 2024, 'Numero': 6},
+        'Instrumento': {'Id': 0, 'Siglas': 'SBE911_01'},
+        'Archivos': {'Configuracion': ['*.xmlcon', '*.xml']},
+        'Estaciones': {str(i).zfill(4): estacion(str(i).zfill(4)) for i in range(1, estaciones + 1)},
+    }
+
+
+def xmlcon_911():
+    """xmlcon de un SBE 911plus con sensores primarios, secundarios y auxiliares."""
+    coeficientes = ''.join(f'<C{i}>{i * 1.234e-3:.6e}</C{i}>' for i in range(12))
+    sensores = ('TemperatureSensor', 'ConductivitySensor', 'PressureSensor', 'TemperatureSensor',
+                'ConductivitySensor', 'OxygenSensor', 'FluoroWetlabECO_AFL_FL_Sensor', 'TransChelseaSensor',
+                'PAR_BiosphericalLicorChelsea_Sensor', 'AltimeterSensor', 'NotInUse', 'NotInUse', 'NotInUse')
+    cuerpo = ''.join(
+        f'<Sensor index="{i}"><{s} SensorID="{i}"><SerialNumber>{1000 + i}</SerialNumber>'
+        f'<CalibrationDate>01-Jan-24</CalibrationDate>{coeficientes}</{s}></Sensor>' if s != 'NotInUse' else
+        f'<Sensor index="{i}"><NotInUse SensorID="27"><OutputCalibration /></NotInUse></Sensor>'
+        for i, s in enumerate(sensores))
+    return ('<?xml version="1.0" encoding="UTF-8"?><SBE_InstrumentConfiguration SB_ConfigCTD_FileVersion="7.26">'
+            '<Instrument SensorID="Dummy"><Name>SBE 911plus/917plus CTD</Name>'
+            f'<SensorArray Size="{len(sensores)}">{cuerpo}</SensorArray></Instrument></SBE_InstrumentConfiguration>')
+
+
+@caso('rmc', operaciones=1000)
+def preparar_rmc(directorio):
+    lineas = [linea for linea, _ in generar_corpus(1000, semilla=1)]
+    rmc = RMC()
+
+    def correr():
+        for linea in lineas:
+            if rmc.Decode(linea) is not None:
+                posicion(rmc)
+    return correr
+
+
+@caso('dbs', operaciones=1000)
+def preparar_dbs(directorio):
+    lineas = [linea for linea, _ in generar_corpus(1000, semilla=2)]
+    dbs = DBS()
+
+    def correr():
+        for linea in lineas:
+            if dbs.Decode(linea) is not None:
+                dbs.Get_Z_Metros()
+    return correr
+
+
+@caso('columnas_ctd', operaciones=1000)
+def preparar_columnas_ctd(directorio):
+    lineas = [linea_ctd(i) for i in range(1000)]
+    esquema = compilar(FILAS_CTD)
+    return lambda: [esquema.decode(linea) for linea in lineas]
+
+
+@caso('columnas_tsg', operaciones=1000)
+def preparar_columnas_tsg(directorio):
+    lineas = [linea_tsg(i) for i in range(1000)]
+    esquema = compilar(FILAS_TSG)
+    return lambda: [esquema.decode(linea) for linea in lineas]
+
+
+@caso('lote_ctd', operaciones=1000)
+def preparar_lote_ctd(directorio):
+    lineas = [linea_ctd(i) for i in range(1000)]
+    esquema = compilar(FILAS_CTD)
+    return lambda: esquema.decode_lote(lineas)
+
+
+@caso('lote_tsg', operaciones=1000)
+def preparar_lote_tsg(directorio):
+    lineas = [linea_tsg(i) for i in range(1000)]
+    esquema = compilar(FILAS_TSG)
+    return lambda: esquema.decode_lote(lineas)
+
+
+def preparar_almacen(muestras):
+    def preparar(directorio):
+        cfg = utils.cfg()
+        cfg['Configuracion']['CTD']['filas'] = FILAS_CTD
+        cfg['Configuracion']['TSG']['filas'] = FILAS_TSG
+        almacen = Almacen(cfg)
+        esquema = compilar(FILAS_CTD)
+        datos = [esquema.decode(linea_ctd(i), float(i)) for i in range(1000)]
+        if not muestras:
+            datos = [dict(dato) for dato in datos]
+
+        def correr():
+            for i, dato in enumerate(datos):
+                almacen.agregar('CTD', dato, float(i))
+        return correr
+    return preparar
+
+
+caso('almacen_ctd', operaciones=1000)(preparar_almacen(True))
+caso('almacen_ctd_textos', operaciones=1000)(preparar_almacen(False))
+
+
+def botellas(manager, nro, cantidad=12):
+    """Dispara las botellas de una estacion de la campaña con StationManager.W_Bott, como la aplicacion."""
+    manager.nro_estacion = nro
+    manager.estacion = {nro: manager.estructura['Estaciones'][nro]}
+    esquema = compilar(FILAS_CTD)
+    for bot in range(1, cantidad + 1):
+        # La columna Bot de linea_ctd es scan // 500
+        manager.W_Bott(esquema.decode(linea_ctd(bot * 500 + int(nro))))
+
+
+def manager_campaña(directorio, estaciones):
+    """StationManager con una campaña sintetica; las botellas se disparan con W_Bott."""
+    manager = StationManager(utils.cfg(), campaña(estaciones))
+    manager.file_json = os.path.join(directorio, f'campaña_{estaciones}.json')
+    manager.diario = Diario(manager.file_json, cada=10 ** 9)
+    for nro in list(manager.estructura['Estaciones']):
+        botellas(manager, nro)
+    return manager
+
+
+def preparar_save_json(estaciones):
+    """Compactacion completa: el pedido desde la ventana y la escritura del Escritor."""
+    def preparar(directorio):
+        manager = manager_campaña(directorio, estaciones)
+
+        def correr():
+            manager.save_json()
+            manager.escritor.flush()
+        return correr
+    return preparar
+
+
+def preparar_save_json_estaciones(estaciones):
+    """Guardado de una campaña por estaciones: la estacion actual y el manifiesto."""
+    def preparar(directorio):
+        manager = manager_campaña(directorio, estaciones)
+        Fragmentos.escribir(manager.file_json, manager.estructura)
+        manager.fragmentos = True
+        manager.start_station('9999')
+
+        def correr():
+            manager.save_json()
+            manager.escritor.flush()
+        return correr
+    return preparar
+
+
+def preparar_evento(estaciones):
+    """Un dato de CTD en el fondo: un registro en el diario de la campaña."""
+    def preparar(directorio):
+        manager = manager_campaña(directorio, estaciones)
+        manager.start_station('9999')
+        ctd = compilar(FILAS_CTD).decode(linea_ctd(1234))
+        return lambda: manager.W_CTD(ctd, 'Fondo')
+    return preparar
+
+
+def preparar_evento_sqlite(estaciones):
+    """Un dato de CTD en el fondo: una fila en la base SQLite de la campaña."""
+    def preparar(directorio):
+        manager = manager_campaña(directorio, estaciones)
+        manager.base = BaseDatos(os.path.join(directorio, f'campaña_{estaciones}.sqlite'))
+        manager.base.importar(manager.estructura)
+        manager.start_station('9999')
+        ctd = compilar(FILAS_CTD).decode(linea_ctd(1234))
+        return lambda: manager.W_CTD(ctd, 'Fondo')
+    return preparar
+
+
+def manager_sqlite(directorio, estaciones):
+    """StationManager con la campaña en una base SQLite; las botellas llegan a la base por W_Bott."""
+    manager = StationManager(utils.cfg(), campaña(estaciones))
+    manager.file_json = os.path.join(directorio, f'campaña_{estaciones}.json')
+    manager.base = BaseDatos(os.path.join(directorio, f'campaña_{estaciones}.sqlite'))
+    manager.base.importar(manager.estructura)
+    return manager
+
+
+def preparar_botella_sqlite(estaciones):
+    """Un disparo de botella (StationManager.W_Bott): una fila en la base SQLite."""
+    def preparar(directorio):
+        manager = manager_sqlite(directorio, estaciones)
+        manager.start_station('9999')
+        ctd = compilar(FILAS_CTD).decode(linea_ctd(1234))
+        return lambda: manager.W_Bott(ctd)
+    return preparar
+
+
+def preparar_botellas_sqlite(estaciones):
+    """Botellas de una estacion, consultadas en la base sin cargar la campaña."""
+    def preparar(directorio):
+        manager = manager_sqlite(directorio, estaciones)
+        for nro in list(manager.estructura['Estaciones']):
+            botellas(manager, nro)
+        base = manager.base
+        nro = str(estaciones // 2).zfill(4)
+        return lambda: base.muestras('Botellas', nro)
+    return preparar
+
+
+for _n in (10, 100, 1000):
+    caso(f'save_json_{_n}')(preparar_save_json(_n))
+    caso(f'save_json_estaciones_{_n}')(preparar_save_json_estaciones(_n))
+    caso(f'evento_{_n}')(preparar_evento(_n))
+    caso(f'evento_sqlite_{_n}')(preparar_evento_sqlite(_n))
+    caso(f'botella_sqlite_{_n}')(preparar_botella_sqlite(_n))
+    caso(f'botellas_sqlite_{_n}')(preparar_botellas_sqlite(_n))
+
+
+@caso('xmlcon')
+def preparar_xmlcon(directorio):
+    xml = xmlcon_911()
+    return lambda: xmlcon_rd(xml_str=xml).GetSensors()
+
+
+@caso('buscar_campanias')
+def preparar_buscar_campanias(directorio):
+    base = os.path.join(directorio, 'Estructura')
+    modelo = campaña(0)
+    for i in range(40):
+        carpeta = os.path.join(base, 'VA' if i % 2 else 'MA', str(2020 + i % 5), str(i).zfill(3))
+        for sub in ('Varios', 'CNV', os.path.join('Termosal', 'HEX')):
+            os.makedirs(os.path.join(carpeta, sub))
+            for k in range(5):
+                with open(os.path.join(carpeta, sub, f'{k}.json'), 'w') as archivo:
+                    json.dump({'otro': k}, archivo)
+        with open(os.path.join(carpeta, f'camp{i}.json'), 'w') as archivo:
+            json.dump(modelo, archivo)
+        # Un json que no es de campaña junto a cada una
+        with open(os.path.join(carpeta, 'notas.json'), 'w') as archivo:
+            json.dump({'Notas': []}, archivo)
+    return lambda: utils.buscar_campanias(base)
+
+
+def archivo_est(datos, ruta):
+    """Escribe el EstNNNN.txt de una estacion, con las lineas que lee click_btn_Exportar."""
+    lineas = list()
+    for punto in ('Inicio', 'Fin'):
+        fecha, hora = datos['FechaHora'][punto]['FechaGMT'], datos['FechaHora'][punto]['HoraGMT']
+        lineas.append(['NMEA', fecha, datos['Posicion'][punto]['Latitud'], datos['Posicion'][punto]['Longitud'],
+                       hora, fecha, datos['Batimetria'][punto]])
+    for loc, etiqueta in (('Cubierta', 'Cub'), ('Fondo', 'Fdo')):
+        for ctd in datos[loc].values():
+            lineas.append([etiqueta, ctd['Scan'], '10:00:00', '0', ctd['Pres'], ctd['Temp'], ctd['Cond'], ctd['Sal']])
+    for sup in datos['Superficie'].values():
+        ctd, tsg = sup['CTD'], sup['TSG']
+        lineas.append(['Sup', ctd['Scan'], sup['Hora'], '0', ctd['Pres'], ctd['Temp'], ctd['Cond'], ctd['Sal'],
+                       tsg['ScanCount'], tsg['Temperature'], tsg['Salinity'], sup['ventana'],
+                       sup['deltaT'], sup['deltaS']])
+    for bot, ctd in datos['Botellas'].items():
+        lineas.append(['Bott', ctd['Scan'], '10:00:00', '0', ctd['Pres'], ctd['Temp'], ctd['Cond'], bot])
+    with open(ruta, 'w') as archivo:
+        archivo.writelines(','.join(str(v) for v in linea) + '\n' for linea in lineas)
+
+
+@caso('exportar')
+def preparar_exportar(directorio):
+    import openpyxl
+    plantilla = os.path.join(directorio, 'Planilla_V1.xlsx')
+    libro = openpyxl.Workbook()
+    libro.active.title = 'Hoja1'
+    libro.save(plantilla)
+    est = os.path.join(directorio, 'Est0001.txt')
+    manager = manager_campaña(directorio, 1)
+    archivo_est(manager.estructura['Estaciones']['0001'], est)
+    return lambda: Planilla.exportar(plantilla, est, os.path.join(directorio, '0001.xlsx'), 'VA202406')
+
+
+def medir(funcion, operaciones, segundos, minimo=5):
+    """Regresa ops/s, latencias p50/p99 (ms) de cada llamada, pico de memoria (KB) y llamadas."""
+    funcion()
+    tiempos = list()
+    inicio = time.perf_counter()
+    while len(tiempos) < minimo or time.perf_counter() - inicio < segundos:
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    tiempos.sort()
+    # La memoria se mide aparte porque tracemalloc hace mas lenta la ejecucion
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ops_s': operaciones * len(tiempos) / sum(tiempos),
+        'p50_ms': 1000 * statistics.median(tiempos),
+        'p99_ms': 1000 * tiempos[min(len(tiempos) - 1, int(0.99 * len(tiempos)))],
+        'memoria_kb': pico / 1024,
+        'llamadas': len(tiempos),
+    }
+
+
+def comparar(resultados, base, umbral):
+    """Regresa la lista de (caso, motivo) de los casos que empeoraron respecto de la base."""
+    regresiones = list()
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if anterior is None:
+            continue
+        if actual['ops_s'] < anterior['ops_s'] * (1 - umbral):
+            regresiones.append((nombre, f"ops/s {anterior['ops_s']:,.0f} -> {actual['ops_s']:,.0f}"))
+        # Diferencias de memoria menores a 64 KB son ruido del interprete
+        if actual['memoria_kb'] > anterior['memoria_kb'] * (1 + umbral) + 64:
+            regresiones.append((nombre, f"memoria {anterior['memoria_kb']:,.0f} KB -> {actual['memoria_kb']:,.0f} KB"))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--segundos', type=float, default=1, help='tiempo de medicion de cada caso')
+    parser.add_argument('--filtro', help='solo los casos que contienen este texto')
+    parser.add_argument('--guardar', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--base', help='resultados JSON guardados contra los que comparar')
+    parser.add_argument('--umbral', type=float, default=0.2, help='empeoramiento tolerado (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    base = dict()
+    if args.base:
+        with open(args.base) as archivo:
+            base = json.load(archivo)['casos']
+    resultados = dict()
+    directorio = tempfile.mkdtemp()
+    print(f"{'caso':<26}{'ops/s':>14}{'p50 ms':>10}{'p99 ms':>10}{'memoria KB':>12}{'vs base':>10}")
+    try:
+        for nombre, (preparar, operaciones) in CASOS.items():
+            if args.filtro and args.filtro not in nombre:
+                continue
+            r = resultados[nombre] = medir(preparar(directorio), operaciones, args.segundos)
+            relacion = f"{r['ops_s'] / base[nombre]['ops_s']:>9.2f}x" if nombre in base else ''
+            print(f"{nombre:<26}{r['ops_s']:>14,.0f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                  f"{r['memoria_kb']:>12,.0f}{relacion:>10}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    if args.guardar:
+        with open(args.guardar, 'w') as archivo:
+            json.dump({'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                       'plataforma': platform.platform(), 'casos': resultados}, archivo, indent=4)
+    regresiones = comparar(resultados, base, args.umbral)
+    for nombre, motivo in regresiones:
+        print(f"REGRESION {nombre}: {motivo}")
+    return 1 if regresiones else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
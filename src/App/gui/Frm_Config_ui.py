@@ -20,6 +20,9 @@ class Ui_Frm_Config(object):
         self.btn_Salir = QtWidgets.QPushButton(Frm_Config)
         self.btn_Salir.setGeometry(QtCore.QRect(505, 380, 75, 23))
         self.btn_Salir.setObjectName("btn_Salir")
+        self.btn_Detectar = QtWidgets.QPushButton(Frm_Config)
+        self.btn_Detectar.setGeometry(QtCore.QRect(345, 380, 75, 23))
+        self.btn_Detectar.setObjectName("btn_Detectar")
         self.btn_Guardar = QtWidgets.QPushButton(Frm_Config)
         self.btn_Guardar.setGeometry(QtCore.QRect(425, 380, 75, 23))
         self.btn_Guardar.setObjectName("btn_Guardar")
@@ -559,6 +562,7 @@ class Ui_Frm_Config(object):
         _translate = QtCore.QCoreApplication.translate
         Frm_Config.setWindowTitle(_translate("Frm_Config", "Configuracion"))
         self.btn_Salir.setText(_translate("Frm_Config", "Salir"))
+        self.btn_Detectar.setText(_translate("Frm_Config", "Detectar"))
         self.btn_Guardar.setText(_translate("Frm_Config", "Guardar"))
         self.lbl_Titulo.setText(_translate("Frm_Config", "Configuración"))
         self.lbl_Titulo_2.setText(_translate(
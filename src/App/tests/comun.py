@@ -0,0 +1,71 @@
+"""Campaña de prueba y eventos de una estacion como los registra la ventana."""
+import json
+
+from app import Fragmentos, utils
+from app.Esquema import compilar
+from app.StationManager import StationManager
+
+FILAS_CTD = ['Scan', 'Pres', 'Temp', 'Cond', 'Sal', 'Bot']
+FILAS_TSG = ['ScanCount', 'Temperature', 'Conductivity', 'Salinity']
+
+
+def campaña(estaciones=3):
+    estructura = {
+        'Expedicion': {'Id': 0, 'Buque': 'VA', 'Anio': 2024, 'Numero': 6},
+        'Instrumento': {'Id': 0, 'Siglas': 'SBE911_01'},
+        'Archivos': {'Configuracion': ['*.xmlcon']},
+        'Estaciones': dict(),
+    }
+    for i in range(1, estaciones + 1):
+        nro = str(i).zfill(4)
+        estacion = utils.Estacion()
+        estacion['NroEstacion'] = nro
+        estacion['Comentarios'] = f'estacion {i}'
+        estructura['Estaciones'][nro] = estacion
+    return estructura
+
+
+def escribir(ruta, estructura):
+    with open(ruta, 'w') as archivo:
+        json.dump(estructura, archivo, indent=4)
+
+
+def leer(ruta):
+    with open(ruta) as archivo:
+        return json.load(archivo)
+
+
+def cfg(almacenamiento='json'):
+    configuracion = utils.cfg()
+    configuracion['Configuracion']['CTD']['filas'] = FILAS_CTD
+    configuracion['Configuracion']['Almacenamiento'] = almacenamiento
+    return configuracion
+
+
+def manager(ruta, almacenamiento='json'):
+    """StationManager de la campaña guardada en 'ruta' (en un JSON o por estaciones), como la abre la ventana."""
+    sm = StationManager(cfg(almacenamiento), Fragmentos.leer(ruta))
+    sm.set_working_dir(ruta)
+    return sm
+
+
+def ctd(scan, bot=0):
+    return compilar(FILAS_CTD).decode(b'%d %.1f 15.1234 4.1234 33.9876 %d' % (scan, scan / 10, bot))
+
+
+def tsg(scan):
+    return compilar(FILAS_TSG).decode(b'%d 15.2 4.2 34.1' % scan)
+
+
+def estacion(sm, nro):
+    """Una estacion completa: posicion, cubierta, superficie, fondo, botellas y comentario."""
+    sm.start_station(nro)
+    nmea = {'latD': '-38.5', 'lonD': '-57.5', 'hora': '10:00:00', 'fecha': '010124'}
+    sm.W_Pos(nmea, '153.2', is_start=True)
+    sm.W_CTD(ctd(1), 'Cubierta')
+    sm.W_TSGvsCTD(ctd(2), tsg(2), nmea, {'deltaT': '0.01', 'deltaS': '0.02'})
+    sm.W_CTD(ctd(3), 'Fondo')
+    for bot in (1, 2, 3):
+        sm.W_Bott(ctd(100 + bot, bot))
+    sm.add_comment('sin novedad')
+    sm.W_Pos(dict(nmea, hora='11:30:00'), '151.8', is_start=False)
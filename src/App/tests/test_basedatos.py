@@ -0,0 +1,68 @@
+"""
+Campaña en SQLite (app.BaseDatos): los eventos de StationManager llegan a la
+base y exportar() devuelve la misma estructura que tiene la ventana.
+"""
+import pytest
+
+from app.BaseDatos import BaseDatos, ruta_base
+from tests.comun import campaña, escribir, estacion, leer, manager
+
+
+@pytest.fixture(autouse=True)
+def sin_directorio_de_campaña(monkeypatch):
+    monkeypatch.delenv('OF_BUQUE_NROCAMP', raising=False)
+
+
+def test_importar_exportar_sin_cambios(tmp_path):
+    base = BaseDatos(str(tmp_path / 'c.sqlite'))
+    estructura = campaña()
+    base.importar(estructura)
+    assert base.exportar() == estructura
+    base.close()
+
+
+def test_eventos_de_una_estacion_llegan_a_la_base(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir(ruta, campaña())
+    sm = manager(ruta, 'sqlite')
+    # Una estacion existente que se vuelve a hacer y una nueva
+    estacion(sm, '0002')
+    estacion(sm, '0004')
+    base = sm.base
+    assert base.exportar() == sm.estructura
+    assert [clave for _, clave, _ in base.muestras('Botellas', '0004')] == ['1', '2', '3']
+    sm.stop_station()
+    sm.close()
+    # Al cerrar, el JSON tiene lo mismo que la base
+    assert leer(ruta) == BaseDatos(ruta_base(ruta)).exportar()
+
+
+def test_abrir_base_recupera_lo_que_no_llego_al_json(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir(ruta, campaña())
+    sm = manager(ruta, 'sqlite')
+    estacion(sm, '0004')
+    esperado = sm.estructura
+    # Corte: los eventos estan en la base pero el JSON no se volvio a escribir
+    assert '0004' not in leer(ruta)['Estaciones']
+
+    otro = manager(ruta, 'sqlite')
+    assert otro.estructura == esperado
+    otro.close()
+    # Recuperado y guardado: el JSON ya tiene la estacion
+    assert leer(ruta) == esperado
+    sm.base.close()
+
+
+def test_abrir_base_importa_un_json_editado(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir(ruta, campaña())
+    manager(ruta, 'sqlite').close()
+    # El JSON se edito a mano despues de la ultima escritura desde la base
+    editada = campaña()
+    editada['Estaciones']['0001']['Comentarios'] = 'editado'
+    escribir(ruta, editada)
+    sm = manager(ruta, 'sqlite')
+    assert sm.estructura == editada
+    assert sm.base.exportar() == editada
+    sm.close()
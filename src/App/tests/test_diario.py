@@ -0,0 +1,146 @@
+"""
+Diario de la campaña (app.Diario) y escritura en segundo plano (app.Escritor):
+recuperacion despues de un corte y compactacion con guardados que se juntan.
+"""
+import json
+import os
+
+from app import Diario as diario
+from app.Diario import Diario, recuperar, ruta_anterior, ruta_diario
+from app.Escritor import Escritor
+
+
+def campaña():
+    return {'Expedicion': {'Id': 0}, 'Estaciones': {'0001': {'Cubierta': {}, 'Comentarios': ''}}}
+
+
+def escribir_campaña(ruta, estructura):
+    with open(ruta, 'w') as archivo:
+        json.dump(estructura, archivo)
+
+
+def test_recupera_con_la_ultima_linea_cortada(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir_campaña(ruta, campaña())
+    d = Diario(ruta)
+    d.registrar([(('Estaciones', '0001', 'Cubierta', '0'), {'Pres': '1.0'})])
+    d.registrar([(('Estaciones', '0001', 'Comentarios'), 'ok')])
+    d.close()
+    # Corte mientras se escribia el tercer registro
+    with open(ruta_diario(ruta), 'ab') as archivo:
+        archivo.write(b'{"n": 3, "t": 0, "cambios": [[["Estaciones", "0001", "Sk')
+
+    estructura = campaña()
+    assert recuperar(ruta, estructura) == 2
+    assert estructura['Estaciones']['0001']['Cubierta'] == {'0': {'Pres': '1.0'}}
+    assert estructura['Estaciones']['0001']['Comentarios'] == 'ok'
+
+    # Al abrir de nuevo se corta la linea incompleta y el siguiente registro queda entero
+    d = Diario(ruta)
+    assert d.n == 2
+    d.registrar([(('Estaciones', '0001', 'Skipover'), 10)])
+    d.close()
+    assert [r['n'] for r in diario.leer(ruta_diario(ruta))] == [1, 2, 3]
+    estructura = campaña()
+    assert recuperar(ruta, estructura) == 3
+    assert estructura['Estaciones']['0001']['Skipover'] == 10
+
+
+def test_recupera_los_dos_tramos_en_orden(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir_campaña(ruta, campaña())
+    d = Diario(ruta)
+    d.registrar([(('Estaciones', '0001', 'Comentarios'), 'primero')])
+    d.registrar([(('Estaciones', '0001', 'Cubierta', '0'), {'Pres': '1.0'})])
+    # Compactacion pedida, pero el JSON nunca se llego a escribir
+    d.cerrar_tramo()
+    d.registrar([(('Estaciones', '0001', 'Comentarios'), 'segundo')])
+    d.close()
+    assert os.path.exists(ruta_anterior(ruta)) and os.path.exists(ruta_diario(ruta))
+
+    estructura = diario.cargar(ruta)
+    # El tramo nuevo se aplica despues del anterior
+    assert estructura['Estaciones']['0001']['Comentarios'] == 'segundo'
+    assert estructura['Estaciones']['0001']['Cubierta'] == {'0': {'Pres': '1.0'}}
+    # Aplicar los registros otra vez (corte entre el reemplazo del JSON y el borrado del tramo) no cambia nada
+    assert recuperar(ruta, estructura) == 3
+    assert estructura == diario.cargar(ruta)
+
+
+def test_cerrar_tramo_con_el_anterior_pendiente_los_junta(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir_campaña(ruta, campaña())
+    d = Diario(ruta)
+    d.registrar([(('Estaciones', '0001', 'Comentarios'), 'a')])
+    primero = d.cerrar_tramo()
+    d.registrar([(('Estaciones', '0001', 'Comentarios'), 'b')])
+    segundo = d.cerrar_tramo()
+    assert [r['n'] for r in diario.leer(ruta_anterior(ruta))] == [1, 2]
+    # El JSON del primer tramo no incluye el segundo: no se borra nada
+    d.tramo_guardado(primero)
+    assert os.path.exists(ruta_anterior(ruta))
+    d.tramo_guardado(segundo)
+    assert not os.path.exists(ruta_anterior(ruta))
+
+
+def test_escritor_junta_pedidos_y_llama_despues_una_vez_escrito(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escritor = Escritor(retardo=60, maximo=60)
+    llamadas = list()
+    try:
+        escritor.guardar(ruta, {'version': 1}, despues=lambda: llamadas.append(1))
+        # Reemplaza al anterior antes de que se escriba
+        escritor.guardar(ruta, {'version': 2}, despues=lambda: llamadas.append(2))
+        assert not os.path.exists(ruta) and not llamadas
+        escritor.flush()
+    finally:
+        escritor.close()
+    with open(ruta) as archivo:
+        assert json.load(archivo) == {'version': 2}
+    assert escritor.lineas == 1
+    assert llamadas == [2]
+
+
+def test_guardado_reemplazado_antes_de_escribir_borra_el_tramo(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    estructura = campaña()
+    escribir_campaña(ruta, estructura)
+    d = Diario(ruta)
+    escritor = Escritor(retardo=60, maximo=60)
+    try:
+        for comentario in ('a', 'b'):
+            cambios = [(('Estaciones', '0001', 'Comentarios'), comentario)]
+            d.registrar(cambios)
+            diario.aplicar(estructura, cambios)
+            tramo = d.cerrar_tramo()
+            escritor.guardar(ruta, json.loads(json.dumps(estructura)),
+                             despues=lambda tramo=tramo: d.tramo_guardado(tramo))
+        # Hasta que se escribe, los dos tramos estan en el diario anterior
+        assert len(diario.leer(ruta_anterior(ruta))) == 2
+        escritor.flush()
+    finally:
+        escritor.close()
+        d.close()
+    assert not os.path.exists(ruta_anterior(ruta))
+    assert diario.cargar(ruta) == estructura
+
+
+def test_escritor_no_da_por_guardado_un_grupo_con_un_error(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir_campaña(ruta, campaña())
+    d = Diario(ruta)
+    d.registrar([(('Estaciones', '0001', 'Comentarios'), 'a')])
+    tramo = d.cerrar_tramo()
+    escritor = Escritor(retardo=60, maximo=60)
+    try:
+        # Una estacion que no se puede escribir (su carpeta no existe) y el manifiesto
+        escritor.guardar(str(tmp_path / 'falta' / '0001.json'), {'NroEstacion': '0001'})
+        escritor.guardar(ruta, campaña(), despues=lambda: d.tramo_guardado(tramo))
+        escritor.flush()
+    finally:
+        escritor.close()
+        d.close()
+    assert escritor.errores == 1
+    # El tramo sigue en disco: al volver a abrir se recupera
+    assert os.path.exists(ruta_anterior(ruta))
+    assert diario.cargar(ruta)['Estaciones']['0001']['Comentarios'] == 'a'
@@ -0,0 +1,73 @@
+"""
+Campaña por estaciones (app.Fragmentos): partir un JSON con registros
+pendientes en el diario y guardar solo las estaciones que cambiaron.
+"""
+import os
+
+import pytest
+
+from app import Fragmentos
+from app.Diario import Diario, ruta_diario
+from tests.comun import campaña, escribir, leer, manager
+
+
+@pytest.fixture(autouse=True)
+def sin_directorio_de_campaña(monkeypatch):
+    monkeypatch.delenv('OF_BUQUE_NROCAMP', raising=False)
+
+
+def archivos(ruta):
+    """Inodo de cada archivo de la campaña: os.replace (una escritura) lo cambia."""
+    rutas = [ruta] + [os.path.join(Fragmentos.carpeta(ruta), nombre)
+                      for nombre in os.listdir(Fragmentos.carpeta(ruta))]
+    return {r: os.stat(r).st_ino for r in rutas}
+
+
+def test_partir_y_guardar_solo_la_estacion_que_cambio(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir(ruta, campaña(5))
+    # Registros que todavia no llegaron al JSON
+    diario = Diario(ruta)
+    diario.registrar([(('Estaciones', '0003', 'Skipover'), 120)])
+    diario.close()
+
+    assert Fragmentos.partir(ruta) == 5
+    assert Fragmentos.partir(ruta) is None
+    assert not os.path.exists(ruta_diario(ruta))
+    assert os.path.exists(ruta + Fragmentos.RESPALDO)
+    manifiesto = leer(ruta)
+    assert Fragmentos.es_manifiesto(manifiesto)
+    assert manifiesto['Estaciones']['0003'] == {'Archivo': 'Estaciones/0003.json',
+                                                'FechaHora': {'FechaGMT': '', 'HoraGMT': ''},
+                                                'Posicion': {'Latitud': '', 'Longitud': ''}}
+    esperado = campaña(5)
+    esperado['Estaciones']['0003']['Skipover'] = 120
+    assert Fragmentos.leer(ruta) == esperado
+
+    sm = manager(ruta)
+    assert sm.fragmentos and sm.estructura == esperado
+    antes = archivos(ruta)
+    # Un comentario en una estacion ya hecha y el guardado de la campaña
+    sm.nro_estacion = '0002'
+    sm.estacion = {'0002': sm.estructura['Estaciones']['0002']}
+    sm.add_comment('revisada')
+    sm.save_json()
+    sm.escritor.flush()
+    despues = archivos(ruta)
+    reescritos = {r for r in antes if antes[r] != despues[r]}
+    assert reescritos == {ruta, Fragmentos.ruta_estacion(ruta, '0002')}
+
+    esperado['Estaciones']['0002']['Comentarios'] = 'revisada'
+    assert Fragmentos.leer(ruta) == esperado
+    sm.close()
+
+
+def test_almacenamiento_estaciones_parte_en_el_primer_guardado(tmp_path):
+    ruta = str(tmp_path / 'VA202406.json')
+    escribir(ruta, campaña(3))
+    sm = manager(ruta, 'estaciones')
+    sm.save_json()
+    sm.close()
+    assert Fragmentos.fragmentado(ruta)
+    assert sorted(os.listdir(Fragmentos.carpeta(ruta))) == ['0001.json', '0002.json', '0003.json']
+    assert Fragmentos.leer(ruta) == campaña(3)